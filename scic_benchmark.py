@@ -0,0 +1,274 @@
+"""
+Benchmarks for scic_data_cleanup
+- synthetic masterlist generator (built from the real vocabulary constants)
+- micro-benchmarks for every extract_* step
+- end-to-end rows/second at several file sizes
+- columnar mode (scic_columnar) vs the row loop on the same in-memory rows
+Results are written as JSON, so runs from different versions can be compared (--compare)
+
+Usage:
+    python scic_benchmark.py --sizes 10000 100000 1000000 --output bench_results.json
+    python scic_benchmark.py --compare bench_results_old.json --output bench_results.json
+"""
+from string import punctuation
+import subprocess
+import argparse
+import platform
+import tempfile
+import datetime
+import random
+import json
+import time
+import csv
+import os
+
+import scic_data_cleanup as scic
+
+benchmark_categories = ["ANCHOR BOLT", "WIRE", "ELECTRICAL WIRE", "LAMP", "FLOODLIGHT ASSY", "BULB", "PIPE",
+                        "STEEL PLATE", "CIRCUIT BREAKER", "CAPACITOR", "MOTOR", "BOLT", "CABLE TIE", "SWITCH"]
+benchmark_filler = ["ASSY", "HEAVY DUTY", "WITH 2 NUTS AND 1 FLAT WASHER", "STAINLESS", "GALVANIZED", "TYPE", "FOR",
+                    "SET", "BEND", "THREAD", "A307", "L", "+", "450 BHN", "(SPARE)", "OUTDOOR", "ROUND", "X"]
+benchmark_colors = ["RED", "BLACK", "LIGHT BLUE", "DARK GREEN", "WHITE", "GREY", "YELLOW"]
+benchmark_property_values = ["12", "8-97024293-0", "AB123", "40", "3R", "1092629700", "14AWG"]
+
+
+def random_number(rng):
+    """
+    Random quantity: mixed fraction (1 1/2), fraction (3/8), decimal (12.5) or whole number
+    """
+    kind = rng.random()
+    if kind < 0.15:
+        return f"{rng.randint(1, 5)} {rng.randint(1, 3)}/{rng.choice([2, 4, 8])}"
+    if kind < 0.3:
+        return f"{rng.randint(1, 7)}/{rng.choice([2, 4, 8, 16])}"
+    if kind < 0.45:
+        return f"{rng.randint(1, 500)}.{rng.randint(0, 9)}"
+    return str(rng.randint(1, 1000))
+
+
+def random_description(rng, category):
+    """
+    Random Item Description built from the real vocabularies (units_others, units_dia, wire_types,
+    keywords_known, all_properties) plus DIA/THK forms, colors and filler words
+    """
+    units = [a_unit for a_prop in scic.units_others for a_unit in a_prop["unit"]]
+    keywords = [a_value for a_categ in scic.keywords_known.values() for a_value in a_categ]
+
+    parts = []
+    if rng.random() < 0.7:
+        parts.append(category)
+    for _ in range(rng.randint(1, 7)):
+        kind = rng.random()
+        if kind < 0.3:
+            parts.append(random_number(rng) + rng.choice(["", " "]) + rng.choice(units).upper())
+        elif kind < 0.4:
+            parts.append(rng.choice(scic.all_properties).upper() + " " + rng.choice(benchmark_property_values))
+        elif kind < 0.47:
+            dia_value = random_number(rng) + rng.choice(["", " "]) + rng.choice(scic.units_dia).upper()
+            parts.append(rng.choice([dia_value + " DIA", "DIA " + dia_value]))
+        elif kind < 0.52:
+            thk_value = random_number(rng) + rng.choice(["MM", " MM", "IN"])
+            parts.append(rng.choice([thk_value + " THK", "THK " + thk_value]))
+        elif kind < 0.6:
+            parts.append(rng.choice(keywords))
+        elif kind < 0.67:
+            parts.append(rng.choice(scic.wire_types))
+        elif kind < 0.73:
+            parts.append(rng.choice(benchmark_colors))
+        elif kind < 0.78:
+            parts.append(random_number(rng) + "MM X " + random_number(rng) + rng.choice(["MM", "FT"]))
+        else:
+            parts.append(rng.choice(benchmark_filler))
+    description = " ".join(parts)
+    if rng.random() < 0.2:
+        description = description.replace(" ", ", ", 1)
+    return description
+
+
+def generate_rows(row_count, seed=0, duplicate_rate=0.3):
+    """
+    Yields synthetic masterlist rows (No., Item Category, Item Description, UOM)
+    duplicate_rate is the share of rows repeating an earlier (category, description) pair, as in the real masterlists
+    """
+    rng = random.Random(seed)
+    seen = []
+    for index in range(row_count):
+        if seen and rng.random() < duplicate_rate:
+            category, description = rng.choice(seen)
+        else:
+            category = rng.choice(benchmark_categories)
+            description = random_description(rng, category)
+            if len(seen) < 10000:
+                seen.append((category, description))
+        yield {"No.": f"ITM{index:07d}", "Item Category": category, "Item Description": description, "UOM": rng.choice(["PC", "M", "SET"])}
+
+
+def write_masterlist(file_path, row_count, seed=0, duplicate_rate=0.3):
+    with open(file_path, 'w', newline='', encoding='utf-8') as output_file:
+        csv_writer = csv.DictWriter(output_file, fieldnames=["No.", "Item Category", "Item Description", "UOM"])
+        csv_writer.writeheader()
+        for row in generate_rows(row_count, seed, duplicate_rate):
+            csv_writer.writerow(row)
+
+
+def best_time(function, repeat=3):
+    """
+    Best wall-clock time (seconds) of repeat calls
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def micro_benchmarks(description_count=5000, seed=0, repeat=3):
+    """
+    Times each extraction step over the same synthetic descriptions
+    Every step gets the text the previous steps left behind (as in the row loop)
+    """
+    extractor = scic.get_extractor()
+    rows = list(generate_rows(description_count, seed, duplicate_rate=0))
+    steps = ["extract_properties", "extract_diameter", "extract_thickness", "extract_units",
+             "extract_color_name", "extract_wire_type", "extract_keywords"]
+
+    # inputs of every step, from one pass through the chain
+    step_inputs = {a_step: [] for a_step in steps}
+    for row in rows:
+        total_descr = scic.normalize_description(row["Item Description"]).strip().strip(punctuation)
+        for a_step in steps:
+            step_inputs[a_step].append(total_descr)
+            total_descr = getattr(extractor, a_step)(total_descr)[1]
+
+    results = {}
+    for a_step in steps:
+        method = getattr(extractor, a_step)
+        inputs = step_inputs[a_step]
+        seconds = best_time(lambda: [method(a_text) for a_text in inputs], repeat)
+        results[a_step] = {"calls": len(inputs), "seconds": seconds, "us_per_call": seconds / len(inputs) * 1e6}
+
+    keyed_rows = [(row["Item Category"], scic.normalize_description(row["Item Description"])) for row in rows]
+    seconds = best_time(lambda: [scic.extract_fields(category, total_descr, extractor) for category, total_descr in keyed_rows], repeat)
+    results["extract_fields"] = {"calls": len(rows), "seconds": seconds, "us_per_call": seconds / len(rows) * 1e6}
+    stream_extractor = scic.StreamExtractor()
+    seconds = best_time(lambda: [stream_extractor.extract_fields(category, total_descr) for category, total_descr in keyed_rows], repeat)
+    results["extract_fields_stream"] = {"calls": len(rows), "seconds": seconds, "us_per_call": seconds / len(rows) * 1e6}
+    seconds = best_time(lambda: [scic.process_row(dict(row), extractor) for row in rows], repeat)
+    results["process_row"] = {"calls": len(rows), "seconds": seconds, "us_per_call": seconds / len(rows) * 1e6}
+    return results
+
+
+def end_to_end_benchmarks(sizes, workers=1, seed=0, duplicate_rate=0.3, cache_size=100000):
+    """
+    Generates a masterlist of each size and times a full file-to-file run
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for row_count in sizes:
+            input_path = os.path.join(work_dir, f"masterlist_{row_count}.csv")
+            output_path = os.path.join(work_dir, f"extracted_{row_count}.csv")
+            write_masterlist(input_path, row_count, seed, duplicate_rate)
+            start = time.perf_counter()
+            scic.run(input_path, output_path, workers=workers, cache_size=cache_size)
+            seconds = time.perf_counter() - start
+            results.append({"rows": row_count, "workers": workers, "cache_size": cache_size, "duplicate_rate": duplicate_rate,
+                            "seconds": seconds, "rows_per_second": row_count / seconds if seconds else None})
+            os.remove(input_path)
+            os.remove(output_path)
+    return results
+
+
+def columnar_benchmark(row_count, seed=0, duplicate_rate=0.3, cache_size=100000):
+    """
+    Times the columnar mode (scic_columnar.extract_table) against the row loop on the same in-memory rows
+    Needs pandas
+    """
+    import pandas as pd
+    import scic_columnar
+
+    rows = list(generate_rows(row_count, seed, duplicate_rate))
+    frame = pd.DataFrame(rows)
+    timings = {
+        "row_loop": best_time(lambda: list(scic.extract_many(rows)), repeat=1),
+        "row_loop_cached": best_time(lambda: list(scic.extract_many(rows, cache=scic.ExtractionCache(scic.get_extractor().vocabulary_hash, maxsize=cache_size))), repeat=1),
+        "columnar": best_time(lambda: scic_columnar.extract_table(frame), repeat=1),
+    }
+    return {"rows": row_count, "duplicate_rate": duplicate_rate,
+            "rows_per_second": {mode: row_count / seconds for mode, seconds in timings.items()}}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(old_results, new_results):
+    """
+    Prints the speed ratio (new vs old; > 1 is faster) for every benchmark present in both result files
+    """
+    for a_step, new_entry in new_results.get("micro", {}).items():
+        old_entry = old_results.get("micro", {}).get(a_step)
+        if old_entry:
+            print(f"{a_step:24s} {old_entry['us_per_call']:10.1f} us -> {new_entry['us_per_call']:10.1f} us  x{old_entry['us_per_call'] / new_entry['us_per_call']:.2f}")
+    old_runs = {(entry["rows"], entry["workers"]): entry for entry in old_results.get("end_to_end", [])}
+    for new_entry in new_results.get("end_to_end", []):
+        old_entry = old_runs.get((new_entry["rows"], new_entry["workers"]))
+        if old_entry:
+            print(f"{new_entry['rows']:>9d} rows ({new_entry['workers']} workers) {old_entry['rows_per_second']:10.0f} -> {new_entry['rows_per_second']:10.0f} rows/s  x{new_entry['rows_per_second'] / old_entry['rows_per_second']:.2f}")
+    old_columnar = old_results.get("columnar") or {}
+    new_columnar = new_results.get("columnar") or {}
+    for mode, new_speed in new_columnar.get("rows_per_second", {}).items():
+        old_speed = old_columnar.get("rows_per_second", {}).get(mode)
+        if old_speed and old_columnar.get("rows") == new_columnar.get("rows"):
+            print(f"{mode:24s} {old_speed:10.0f} -> {new_speed:10.0f} rows/s  x{new_speed / old_speed:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the masterlist extraction")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000, 1000000], help="end-to-end row counts")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache-size", type=int, default=100000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--micro-count", type=int, default=5000, help="descriptions per micro-benchmark (0 = skip)")
+    parser.add_argument("--columnar-rows", type=int, default=0, help="rows for the columnar vs row loop comparison (needs pandas, 0 = skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    extractor = scic.get_extractor()
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "engine_version": extractor.engine_version,
+        "vocabulary_hash": extractor.vocabulary_hash,
+        "micro": micro_benchmarks(args.micro_count, args.seed) if args.micro_count > 0 else {},
+        "end_to_end": end_to_end_benchmarks(args.sizes, args.workers, args.seed, args.duplicate_rate, args.cache_size),
+        "columnar": columnar_benchmark(args.columnar_rows, args.seed, args.duplicate_rate, args.cache_size) if args.columnar_rows > 0 else None,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    for a_step, entry in results["micro"].items():
+        print(f"{a_step:24s} {entry['us_per_call']:10.1f} us/call")
+    for entry in results["end_to_end"]:
+        print(f"{entry['rows']:>9d} rows: {entry['rows_per_second']:10.0f} rows/s ({entry['seconds']:.2f} s)")
+    if results["columnar"]:
+        for mode, speed in results["columnar"]["rows_per_second"].items():
+            print(f"{mode:24s} {speed:10.0f} rows/s ({args.columnar_rows} rows in memory)")
+    print("Benchmark results saved to:", args.output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as compare_file:
+            compare_results(json.load(compare_file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Column-at-a-time extraction over a pandas DataFrame or an Arrow table (masterlist already loaded in memory)
+This is "dedup + broadcast", not vectorized extraction: the extraction chain itself still runs row by row,
+in Python, but only once per distinct (Item Category, description) pair
+- the Item Description column is normalized with vectorized string operations
+- (Item Category, description) pairs are factorized, so the extraction chain runs once per distinct pair
+- every output column is built by broadcasting the per-pair results back over the rows
+The result has the same columns (and values) as the CSV path: see scic_data_cleanup.output_columns, or only the
+columns of the extractor's column plan (see DescriptionExtractor.select_columns), as in a run with columns
+
+Usage:
+    import scic_columnar
+    extracted = scic_columnar.extract_table(masterlist_frame)
+"""
+from string import punctuation
+
+import scic_data_cleanup as scic
+
+key_separator = "\x1f"  # joins category and description into one factorization key
+
+
+def normalize_column(descriptions):
+    """
+    Vectorized scic_data_cleanup.normalize_description over a pandas Series
+    """
+    total_descr = descriptions.fillna('').astype(str).str.strip().str.strip(punctuation)
+    # replace all colons AND commas AND semicolons AND periods with spaces
+    for separator in [": ", ",", ". ", ";", "(", ")"]:
+        total_descr = total_descr.str.replace(separator, " ", regex=False)
+    return total_descr
+
+
+def extract_table(table, extractor=None, cache=None):
+    """
+    Extracts every row of a pandas DataFrame or pyarrow Table, returns the same type with the output columns
+    When the source columns overlap the extracted columns (e.g. an existing "brand" column), extracted values are
+    merged row by row as in the CSV path; otherwise the per-pair results are broadcast column-wise
+    As in the CSV path, missing (NaN/None) Item Category and Item Description values are empty strings, and a column
+    name found twice in the output (an overlapping or repeated source column) gets the same values in both places:
+    those of the last source column of that name, as csv.DictReader keeps
+    With a column plan (extractor.select_columns), only its columns are returned, in its order
+    """
+    import numpy as np
+    import pandas as pd
+
+    is_arrow = not isinstance(table, pd.DataFrame)
+    frame = table.to_pandas() if is_arrow else table
+    if extractor is None:
+        extractor = scic.get_extractor()
+
+    source_columns = [str(a_column) for a_column in frame.columns]
+    column_plan = extractor.column_plan
+    columns = scic.select_output_columns(source_columns, column_plan.columns if column_plan is not None else None, extractor)
+    if frame.columns.duplicated().any():
+        frame = frame.loc[:, ~frame.columns.duplicated(keep='last')]
+    categories = frame["Item Category"].fillna('').astype(str)
+    descriptions = normalize_column(frame["Item Description"])
+    codes, unique_keys = pd.factorize(categories + key_separator + descriptions)
+
+    # ! extract once per distinct (category, description) pair
+    unique_fields = []
+    for a_key in unique_keys:
+        category, total_descr = a_key.split(key_separator, 1)
+        fields = cache.get((category, total_descr)) if cache is not None else None
+        if fields is None:
+            fields = scic.extract_fields(category, total_descr, extractor)
+            if cache is not None:
+                cache.put((category, total_descr), fields)
+        unique_fields.append(fields)
+
+    unique_columns = list(dict.fromkeys(columns))
+    extracted_columns = [a_column for a_column in unique_columns if a_column not in source_columns]
+    overlapping = set(source_columns) & set(['extracted'] + scic.new_columns + scic.all_properties + scic.units_others_list + scic.keyword_confidence_columns(extractor))
+
+    if overlapping:
+        # ! source columns take part in the merge: apply row by row
+        rows = []
+        for record, code in zip(frame.astype(object).where(frame.notna(), '').to_dict('records'), codes):
+            rows.append(scic.apply_fields(record, unique_fields[code], extractor))
+        result = pd.DataFrame(rows, columns=unique_columns).fillna('')[columns]
+    else:
+        # ! broadcast the per-pair rows over the whole column
+        unique_rows = [scic.apply_fields({"Item Category": category}, fields, extractor)
+                       for category, fields in zip((a_key.split(key_separator, 1)[0] for a_key in unique_keys), unique_fields)]
+        result = frame.copy()
+        result["Item Category"] = categories
+        result["Item Description"] = frame["Item Description"].fillna('')
+        for a_column in extracted_columns:
+            values = np.array([a_row.get(a_column, '') for a_row in unique_rows], dtype=object)
+            result[a_column] = values[codes]
+        result = result[columns]
+
+    if is_arrow:
+        import pyarrow as pa
+        if len(unique_columns) < len(columns):
+            # ! Table.from_pandas refuses repeated column names, Arrow tables do not
+            return pa.Table.from_arrays([pa.Array.from_pandas(result.iloc[:, index]) for index in range(len(columns))], names=columns)
+        return pa.Table.from_pandas(result, preserve_index=False)
+    return result
@@ -1,205 +1,2106 @@
 from string import punctuation
+from collections import OrderedDict, deque
+from itertools import islice
+import time
+import sys
+import datetime
+import os
+import hashlib
+import json
 import csv
+import io
+import codecs
+import glob
 import re
 
-def extract_properties(input_text):
+def is_word_boundary(text, position):
     """
-    Extract all extractable properties, which follow the following format in the description:
-        <property> <value>
+    Same as a regex \\b at position
+    """
+    before = position > 0 and (text[position - 1].isalnum() or text[position - 1] == '_')
+    after = position < len(text) and (text[position].isalnum() or text[position] == '_')
+    return before != after
+
+def find_literal(text, value):
+    """
+    Position of the first case-insensitive occurrence of value in text (taken literally), or -1
+    """
+    if text.isascii() and value.isascii():
+        return text.lower().find(value.lower())
+    match = re.search(re.escape(value), text, re.IGNORECASE)
+    return match.start() if match else -1
+
+def remove_first(text, value, replacement=''):
+    """
+    Removes the first case-insensitive occurrence of value, like re.sub(value, replacement, text, 1, flags=re.IGNORECASE)
+    but with value taken literally (values such as "lbs/ft." or "3.2MM" are not regex patterns)
+    """
+    start = find_literal(text, value)
+    if start < 0:
+        return text
+    return text[:start] + replacement + text[start + len(value):]
+
+def remove_spans(text, spans, replacement=''):
+    """
+    Removes every (start, end) span (non-overlapping, in text order) of text
+    """
+    for start, end in reversed(spans):
+        text = text[:start] + replacement + text[end:]
+    return text
+
+class VocabularyTrie:
+    """
+    Case-insensitive trie of vocabulary values (wire types, keywords, units), matched literally
+    Matching walks the trie from the candidate positions of the description only,
+    so its cost depends on the description length and not on the vocabulary size; the longest value wins
+    The trie is a plain nested dict (see to_dict), so it can be saved as JSON and loaded without rebuilding it
+    """
+    def __init__(self, values=(), root=None):
+        self.root = {} if root is None else root
+        self.start_pattern = None
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        node = self.root
+        for char in value.lower():
+            node = node.setdefault(char, {})
+        node[""] = 1    # a value ends here
+        self.start_pattern = None
+
+    def to_dict(self):
+        return self.root
+
+    def longest(self, text, position, accept=None):
+        """
+        End of the longest value starting at position for which accept(text, end) holds, -1 if there is none
+        """
+        node = self.root
+        best = -1
+        for end in range(position + 1, len(text) + 1):
+            for char in text[end - 1].lower():
+                node = node.get(char)
+                if node is None:
+                    return best
+            if "" in node and (accept is None or accept(text, end)):
+                best = end
+        return best
+
+    def findall(self, text):
+        """
+        Whole-word matches, left to right (like re.findall(r'\\b(?:value|...)\\b', text, re.IGNORECASE), longest value first)
+        """
+        if self.start_pattern is None:
+            # word boundaries followed by the first character of a value
+            first_chars = ''.join(re.escape(char) for char in self.root if char != "")
+            self.start_pattern = re.compile(r'\b(?=[' + first_chars + '])' if first_chars else r'(?!)', re.IGNORECASE)
+        matches = []
+        position = 0
+        for boundary in self.start_pattern.finditer(text):
+            start = boundary.start()
+            if start < position:
+                continue
+            end = self.longest(text, start, is_word_boundary)
+            if end > start:
+                matches.append(text[start:end])
+                position = end
+        return matches
+
+    def pattern(self, node=None):
+        """
+        Regex source matching the values of the trie (longest first, then backtracking to the shorter ones),
+        to embed the vocabulary in a larger pattern
+        """
+        node = self.root if node is None else node
+        branches = [re.escape(char) + self.pattern(child) for char, child in node.items() if char != ""]
+        if not branches:
+            return ''
+        source = '(?:' + '|'.join(branches) + ')'
+        return source + '?' if "" in node else source
+
+
+def edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 as soon as it is known to be over limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+class FuzzyVocabularyIndex:
+    """
+    Trigram index of vocabulary values (e.g. brands), for misspelled and variant spellings
+    Values and description text are compared on their key: lowercase letters and digits only,
+    so "Phelps-Dodge", "PHELPS DODGE" and "PhelpsDodge" have the same key
+    A window of description tokens matches a value when similarity = 1 - edit distance / longer key length >= threshold
+    Only the values sharing enough trigrams with the window (an edit removes at most 3 of them) and of a close length
+    get their edit distance computed, so the cost does not grow with the vocabulary size;
+    the result of every window key is remembered (up to memo_size keys), since the same words come back row after row
+    A single token only matches approximately if its key has single_token_min_length characters or more:
+    a short word one edit away from a value is usually another word (PHILLIPS screws, not Philips)
+    Like VocabularyTrie, the index is a plain dict (see to_dict), saved as JSON with the tries
+    """
+    key_pattern = re.compile(r'[^0-9a-z]+')
+    token_pattern = re.compile(r'\S+')
+    memo_size = 100000
+    single_token_min_length = 9
+
+    def __init__(self, values=(), threshold=0.85, min_length=5, data=None):
+        self.threshold = threshold
+        self.min_length = min_length
+        self.data = self.build(values) if data is None else data
+        self.values = self.data["values"]
+        self.keys = [self.key(value) for value in self.values]
+        self.grams = self.data["grams"]     # trigram -> ids of the values having it
+        self.max_words = self.data["max_words"]
+        self.gram_counts = [len(self.key_grams(key)) for key in self.keys]
+        self.exact = {key: index for index, key in enumerate(self.keys)}
+        # longest key a window can have and still match a value
+        self.max_window_length = int(max(map(len, self.keys), default=0) / threshold) if threshold > 0 else float('inf')
+        self.memo = {}
+
+    @classmethod
+    def key(cls, text):
+        return cls.key_pattern.sub('', text.lower())
+
+    @staticmethod
+    def key_grams(key):
+        return {key[i:i + 3] for i in range(len(key) - 2)}
+
+    def build(self, values):
+        values = list(dict.fromkeys(values))
+        grams = {}
+        for index, value in enumerate(values):
+            for gram in self.key_grams(self.key(value)):
+                grams.setdefault(gram, []).append(index)
+        # one more word than the longest value, for values split in two ("PANA SONIC")
+        max_words = max((len(value.split()) for value in values), default=0) + 1
+        return {"values": values, "grams": grams, "max_words": max_words}
+
+    def to_dict(self):
+        return self.data
+
+    def best(self, key):
+        """
+        (value, similarity) of the most similar value to key, None if none reaches the threshold
+        """
+        if key in self.memo:
+            return self.memo[key]
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        best = self.memo[key] = self.search(key)
+        return best
+
+    def search(self, key):
+        index = self.exact.get(key)
+        if index is not None:
+            return self.values[index], 1.0
+        shared = {}
+        for gram in self.key_grams(key):
+            for index in self.grams.get(gram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        best = None
+        for index, count in shared.items():
+            value_key = self.keys[index]
+            longer = max(len(key), len(value_key))
+            limit = int((1 - self.threshold) * longer + 1e-9)
+            if count < self.gram_counts[index] - 3 * limit or abs(len(key) - len(value_key)) > limit:
+                continue
+            distance = edit_distance(key, value_key, limit)
+            if distance <= limit:
+                similarity = 1 - distance / longer
+                if best is None or similarity > best[1]:
+                    best = (self.values[index], similarity)
+        return best
+
+    def find(self, text):
+        """
+        Non-overlapping approximate matches in text, left to right: (start, end, value, similarity)
+        At every token, the window of tokens (up to max_words) most similar to a value wins, the shortest one on a tie;
+        it is skipped if the window starting at the next token matches at least as well
+        (so a neighbouring token, e.g. the "L" of "Mcgill L" or the "12" of "12 TELEMICANIQUE", is not swallowed)
+        """
+        words = self.token_pattern.findall(text)
+        keys = [self.key(a_word) for a_word in words]
+        matches = []
+        spans = None
+        position = 0
+        found = self.best_window(keys, position)
+        while position < len(words):
+            following = self.best_window(keys, position + 1)
+            if found is None or (following is not None and following[1][1] >= found[1][1]):
+                position += 1
+                found = following
+                continue
+            last, best = found
+            if spans is None:
+                spans = [match.span() for match in self.token_pattern.finditer(text)]
+            matches.append((spans[position][0], spans[last][1], best[0], best[1]))
+            position = last + 1
+            found = self.best_window(keys, position)
+        return matches
+
+    def best_window(self, keys, position):
+        """
+        (last token, (value, similarity)) of the best window of keys starting at position, None if none matches
+        """
+        found = None
+        length = 0
+        for last in range(position, min(len(keys), position + self.max_words)):
+            length += len(keys[last])
+            if length > self.max_window_length:
+                break
+            if length < self.min_length:
+                continue
+            best = self.best(''.join(keys[position:last + 1]))
+            if best is not None and best[1] < 1 and last == position and length < self.single_token_min_length:
+                continue
+            if best is not None and (found is None or best[1] > found[1][1]):
+                found = (last, best)
+        return found
+
+
+class CategoryPlan:
     """
-    properties_dict = {}
+    Precompiled handling of one Item Category: the patterns stripping its words from the description,
+    and the extraction stages to skip for it (from category_settings)
+    Plain words (letters/digits only) are stripped by a single combined pattern;
+    words with punctuation (e.g. "W/", "-") keep one pattern per word, applied in order,
+    since removing one of them can join or split the words the next one matches
+    """
+    __slots__ = ("category", "strip_patterns", "skip")
+    plain_word_pattern = re.compile(r'\w+')
 
-    for prop in all_properties:
-        # Create a regular expression pattern for the current property
-        if prop=="gauge":
-            pattern = re.compile(rf'\b{re.escape(prop)}\s*(\d+\w*)\b', re.IGNORECASE)
+    def __init__(self, category, settings=None, skip=()):
+        self.category = category
+        words = [e for e in category.split(" ") if e not in ('',None)]
+        if words and all(self.plain_word_pattern.fullmatch(a_word) for a_word in words):
+            word_groups = [words]
         else:
-            pattern = re.compile(rf'\b{re.escape(prop)}\s*(\S+)\b', re.IGNORECASE)
+            word_groups = [[a_word] for a_word in words]
+        self.strip_patterns = [
+            re.compile(r'\b(?:' + '|'.join(re.escape(a_word) for a_word in group) + r')\b', re.IGNORECASE)
+            for group in word_groups
+        ]
+        self.skip = frozenset((settings or {}).get("skip", ())) | frozenset(skip)
 
-        # Search for the pattern in the input text
-        match = pattern.search(input_text)
+    def strip_category(self, description):
+        for pattern in self.strip_patterns:
+            description = pattern.sub('', description).strip()
+        return description
 
-        if match:
-            # Store the match in the properties dictionary
-            properties_dict[prop] = match.group(1)
+class ColumnPlan:
+    """
+    Minimal extraction plan for a subset of the output columns (see DescriptionExtractor.select_columns):
+    the stages whose results can reach the selected columns, and the assembled columns to build
+    (configuration, size, and info for style/info/extracted)
+    Every stage sees the text left by the stages before it, so a needed stage needs all the stages before it too:
+    only the stages after the last needed one are skipped, and the selected columns keep the values of a full run
+    """
+    __slots__ = ("columns", "stages", "skip", "assemble")
+    # assembled columns reading the leftover text need every stage
+    info_columns = ("configuration", "style", "info", "extracted")
 
-            # Remove the found property and its value from the input text
-            input_text = re.sub(rf'\b{re.escape(prop)}\s*{re.escape(properties_dict[prop])}\b', '', input_text, flags=re.IGNORECASE).strip()
+    def __init__(self, columns, extractor):
+        self.columns = list(columns)
+        keyword_columns = set(extractor.keywords_known) | {confidence_column_name(a_categ) for a_categ in extractor.fuzzy_thresholds}
+        needed = set()
+        self.assemble = set()
+        for a_column in self.columns:
+            if a_column in self.info_columns:
+                needed.update(extractor.skippable_stages)
+                self.assemble.add("configuration" if a_column == "configuration" else "info")
+            elif a_column == "size":
+                needed.update(("diameter", "thickness", "units"))
+                self.assemble.add("size")
+            else:
+                if a_column in extractor.all_properties:
+                    needed.add("properties")
+                if a_column in extractor.units_others_list:
+                    needed.add("units")
+                if a_column in keyword_columns:
+                    needed.add("keywords")
+                if a_column in ("diameter", "thickness", "color", "wire type"):
+                    needed.add(a_column)
+        last = max((extractor.skippable_stages.index(stage) for stage in needed), default=-1)
+        self.stages = extractor.skippable_stages[:last + 1]
+        self.skip = frozenset(extractor.skippable_stages[last + 1:])
 
-    return properties_dict, input_text.strip().strip(punctuation)
+    def describe(self):
+        skipped = [stage for stage in DescriptionExtractor.skippable_stages if stage in self.skip]
+        return (f"Column plan: {len(self.columns)} columns, stages {', '.join(self.stages) or 'none'}"
+                + (f" (skipped: {', '.join(skipped)})" if skipped else "")
+                + (f", assembles {', '.join(sorted(self.assemble))}" if self.assemble else ""))
 
-def extract_diameter(description):
+
+class DescriptionExtractor:
     """
-    Extracts the diameter from the description, based on the keyword "DIA"
-    Contains a helper function is_valid_diameter_value
-    Note: references the unit_length list (update accordingly!)
+    Compiles the whole extraction vocabulary once, then extracts from any number of descriptions
+    Each extract_* method returns the same results as the module-level function of the same name
+    Note: vocabulary defaults to the constants defined below (all_properties, units_others, units_dia, wire_types, keywords_known)
+    Units, wire types and keywords are matched with VocabularyTrie (saved to / loaded from automaton_path, if given)
+    Keyword categories in fuzzy_thresholds (default: fuzzy_keywords) also get approximate matches (FuzzyVocabularyIndex)
+    Every distinct Item Category gets a CategoryPlan, compiled on first sight (settings: see category_settings)
     """
-    def is_valid_diameter_value(word):
+    basic_colors = ["red", "orange", "yellow", "green", "blue", "indigo", "violet", "white", "black", "gray", "brown", "pink", "grey"]
+    # ! bump when the extraction logic changes (invalidates cached extractions)
+    engine_version = 6
+    engine_name = "regex"
+    # ! the "(?:\S+\s+)*?" prefixed searches backtrack heavily on long token-dense descriptions (see RowWatchdog)
+    bounded_search = False
+    # per-row latency budget (RowWatchdog, see set_watchdog), None = off
+    watchdog = None
+    # Item Category -> category_vocabulary_hash, for the vocabulary hash category_hashes_of
+    category_hashes = {}
+    category_hashes_of = None
+    # output column subset (ColumnPlan, see select_columns), None = every column
+    column_plan = None
+    # stages that category_settings (and column plans) can skip, in extraction order
+    skippable_stages = ("properties", "diameter", "thickness", "units", "color", "wire type", "keywords")
+    category_plans_size = 10000
+
+    def __init__(self, properties=None, units_others_vocab=None, units_dia_vocab=None, wire_types_vocab=None, keywords_vocab=None,
+                 automaton_path=None, settings_by_category=None, fuzzy_thresholds=None):
+        self.all_properties = list(all_properties if properties is None else properties)
+        self.units_others = list(units_others if units_others_vocab is None else units_others_vocab)
+        self.units_dia = list(units_dia if units_dia_vocab is None else units_dia_vocab)
+        self.wire_types = list(wire_types if wire_types_vocab is None else wire_types_vocab)
+        self.keywords_known = dict(keywords_known if keywords_vocab is None else keywords_vocab)
+
+        # lookup maps (same construction as the module-level maps)
+        self.unit_property_map = {unit: unit_info["prop"] for unit_info in self.units_others for unit in sorted(unit_info["unit"],reverse=True)}
+        self.keywords_known_map = {a_value.lower(): a_categ for a_categ in self.keywords_known.keys() for a_value in sorted(self.keywords_known[a_categ],reverse=True)}
+        self.units_others_list = [a_prop["prop"] for a_prop in self.units_others]
+        self.category_settings = {name.strip().upper(): settings for name, settings in
+                                  (category_settings if settings_by_category is None else settings_by_category).items()}
+        for name, settings in self.category_settings.items():
+            unknown = set(settings.get("skip", ())) - set(self.skippable_stages)
+            if unknown:
+                raise ValueError(f"category_settings[{name!r}]: unknown stages {sorted(unknown)} (stages: {', '.join(self.skippable_stages)})")
+        self.fuzzy_thresholds = dict(fuzzy_keywords if fuzzy_thresholds is None else fuzzy_thresholds)
+        unknown = set(self.fuzzy_thresholds) - set(self.keywords_known)
+        if unknown:
+            raise ValueError(f"fuzzy_keywords: unknown keyword categories {sorted(unknown)} (categories: {', '.join(self.keywords_known)})")
+        self.vocabulary_hash = self.compute_vocabulary_hash()
+
+        # ! category plans, by Item Category
+        self.category_plans = {}
+        self.plan_hits = 0
+        self.plan_misses = 0
+
+        # ! properties: <property> <value>
+        self.property_patterns = []
+        for prop in self.all_properties:
+            if prop=="gauge":
+                pattern = re.compile(rf'\b{re.escape(prop)}\s*(\d+\w*)\b', re.IGNORECASE)
+            else:
+                pattern = re.compile(rf'\b{re.escape(prop)}\s*(\S+)\b', re.IGNORECASE)
+            self.property_patterns.append((prop, pattern))
+        self.property_head_patterns = [re.compile(rf'\b{re.escape(prop)}\s*', re.IGNORECASE) for prop in self.all_properties]
+
+        # ! diameter and thickness
+        dia_units = '|'.join(self.units_dia)
+        self.dia_keyword_pattern = re.compile(r'\bDIA\b', re.IGNORECASE)
+        self.thk_keyword_pattern = re.compile(r'\bTHK\b', re.IGNORECASE)
+        self.dia_fraction_pattern = re.compile(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*(?:' + dia_units + r'))', re.IGNORECASE)   # good for mixed or unmixed fractions
+        self.dia_whole_pattern = re.compile(r'(?:\S+\s+)*?(\d+\s*(?:' + dia_units + r'))(?=\s|$)', re.IGNORECASE)
+        self.thk_value_pattern = re.compile(r'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*\w+)', re.IGNORECASE)
+
+        # ! color
+        self.color_pattern = re.compile(r'\b(?:light |dark )?(' + '|'.join(self.basic_colors) + r')\b')
+
+        # ! units, wire types and keywords: vocabulary tries (loaded from automaton_path if saved there for this vocabulary)
+        tries = self.load_vocabulary_tries(automaton_path) if automaton_path else None
+        if tries is None:
+            tries = self.build_vocabulary_tries()
+            if automaton_path:
+                self.save_vocabulary_tries(automaton_path, tries)
+        self.units_trie = VocabularyTrie(root=tries["units"])
+        self.wire_types_trie = VocabularyTrie(root=tries["wire types"])
+        self.keywords_tries = [VocabularyTrie(root=a_root) for a_root in tries["keywords"]]
+        self.fuzzy_indexes = [(a_categ, FuzzyVocabularyIndex(threshold=threshold, data=tries["fuzzy keywords"][a_categ]))
+                              for a_categ, threshold in self.fuzzy_thresholds.items()]
+
+        # ! units (the longest unit that fits wins)
+        self.unit_pattern = self.units_trie.pattern()
+        self.unit_fraction_pattern = re.compile(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*(' + self.unit_pattern + r'))', re.IGNORECASE)
+        self.unit_whole_pattern = re.compile(r'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*(' + self.unit_pattern + r'))(?:/[^\s]+)?(?=\s|$)', re.IGNORECASE)
+        self.dimension_separator_pattern = re.compile(r'\bX\b', re.IGNORECASE)
+
+    def extract_fields(self, category, total_descr, profiler=None):
+        """
+        Runs the whole extraction chain on a normalized description, without touching the row
+        Returns the extracted field set (JSON-serializable, so it can be cached):
+            properties, units and keywords as [property, value] pairs (in extraction order),
+            diameter, thickness and color (or None), wire type (list) and the remaining text (info)
+        With a profiler (StageProfiler), every stage is timed
+        """
+        if profiler is not None:
+            profiler.start()
+            original_descr = total_descr
+
+        # ! additional: extract the ITEM CATEGORY NAME from the DESCRIPTION, if applicable
+        # ! MOVED (from after extraction... to start of with-loop)
+        # if row['Item Category'] in total_descr:
+        #     total_descr = re.sub(rf'\b{}')
+        #     # total_descr = total_descr.replace(f"{row['Item Category']}"," ")
+        # else:
+        #     # try second option: split the item category word per word, and splice each word
+        # ! now: one precompiled pattern per category strips all its words
+        plan = self.category_plan(category)
+        total_descr = plan.strip_category(total_descr)
+    
+        # remove extra spaces at ends and in middle
+        total_descr = total_descr.strip().strip(punctuation)
+        if profiler is not None:
+            profiler.lap("category", total_descr != original_descr)
+    
+        # ! extract the properties
+        result_properties = {}
+        if "properties" not in plan.skip:
+            result_properties, total_descr = self.extract_properties(total_descr)
+        if profiler is not None:
+            profiler.lap("properties", result_properties)
+    
+        # ! extracting the diameter
+        result_dia = None
+        if "diameter" not in plan.skip:
+            result_dia, total_descr = self.extract_diameter(total_descr)
+        if profiler is not None:
+            profiler.lap("diameter", result_dia is not None)
+    
+        # ! extracting the thickness
+        result_thk = None
+        if "thickness" not in plan.skip:
+            result_thk, total_descr = self.extract_thickness(total_descr)
+        if profiler is not None:
+            profiler.lap("thickness", result_thk is not None)
+    
+        # ! extracting the units
+        # TODO: double check function; may accidentally truncate extra text?
+        result_units = []
+        if "units" not in plan.skip:
+            result_units, total_descr = self.extract_units(total_descr)
+        unit_values = []
+        for match in result_units:
+            prop = self.unit_property_map.get(match[1].lower())
+            if prop:
+                unit_values.append([prop, match[0]])
+        if profiler is not None:
+            profiler.lap("units", unit_values)
+    
+        # ! extracting the color
+        result_color = None
+        if "color" not in plan.skip:
+            result_color, total_descr = self.extract_color_name(total_descr)
+        if profiler is not None:
+            profiler.lap("color", result_color is not None)
+    
+        # ! extracting the wire type
+        result_wire_type = []
+        if "wire type" not in plan.skip:
+            result_wire_type, total_descr = self.extract_wire_type(total_descr)
+        if profiler is not None:
+            profiler.lap("wire type", result_wire_type)
+    
+        # ! extracting keywords (e.g. brands)
+        result_keywords = []
+        if "keywords" not in plan.skip:
+            result_keywords, total_descr = self.extract_keywords(total_descr)
+        keyword_values = []
+        for match in result_keywords:
+            prop = self.keywords_known_map.get(match.lower())
+            if prop:
+                keyword_values.append([prop, match])
+        # ! misspelled/variant keywords (e.g. brands) in what is left
+        fuzzy_values = []
+        if "keywords" not in plan.skip and self.fuzzy_indexes:
+            fuzzy_values, total_descr = self.extract_fuzzy_keywords(total_descr)
+        keyword_values, keyword_confidence = self.keyword_confidence(keyword_values, fuzzy_values)
+        if profiler is not None:
+            profiler.lap("keywords", keyword_values)
+
+        return {
+            "properties": [[prop, value] for prop, value in result_properties.items()],
+            "diameter": result_dia,
+            "thickness": result_thk,
+            "units": unit_values,
+            "color": result_color,
+            "wire type": result_wire_type,
+            "keywords": keyword_values,
+            "keyword confidence": keyword_confidence,
+            "info": total_descr,
+        }
+
+    def category_plan(self, category):
+        """
+        The CategoryPlan of an Item Category (compiled on first sight, then reused)
+        """
+        plan = self.category_plans.get(category)
+        if plan is not None:
+            self.plan_hits += 1
+            return plan
+        self.plan_misses += 1
+        if len(self.category_plans) >= self.category_plans_size:
+            self.category_plans.clear()
+        plan = self.category_plans[category] = CategoryPlan(category, self.category_settings.get(category.strip().upper()),
+                                                            self.column_plan.skip if self.column_plan is not None else ())
+        return plan
+
+    def select_columns(self, columns=None):
+        """
+        Extracts only what the given output columns need (see ColumnPlan); None goes back to every column
+        Field sets missing skipped stages are not full ones, so the skipped stages are part of the vocabulary hash
+        Returns the ColumnPlan (or None)
+        """
+        columns = list(columns) if columns is not None else None
+        if columns == (self.column_plan.columns if self.column_plan is not None else None):
+            return self.column_plan
+        self.column_plan = ColumnPlan(columns, self) if columns is not None else None
+        self.category_plans.clear()
+        if self.watchdog is not None:
+            self.watchdog.fallback = None
+            self.watchdog.attach(self)
+        else:
+            self.vocabulary_hash = self.compute_vocabulary_hash()
+        return self.column_plan
+
+    def plan_report(self):
+        lookups = self.plan_hits + self.plan_misses
+        rate = self.plan_hits / lookups if lookups else 0.0
+        return f"Category plans: {self.plan_misses} compiled, {self.plan_hits} reused, hit rate {rate:.1%}"
+
+    def build_vocabulary_tries(self):
+        """
+        Tries of the units, wire types and keywords (one per keyword category), as nested dicts,
+        and the trigram indexes of the fuzzy matched keyword categories
+        """
+        return {
+            "units": VocabularyTrie(self.unit_property_map.keys()).to_dict(),
+            "wire types": VocabularyTrie(self.wire_types).to_dict(),
+            "keywords": [VocabularyTrie(self.keywords_known[a_categ]).to_dict() for a_categ in self.keywords_known.keys()],
+            "fuzzy keywords": {a_categ: FuzzyVocabularyIndex(self.keywords_known[a_categ]).to_dict() for a_categ in self.fuzzy_thresholds},
+        }
+
+    def save_vocabulary_tries(self, automaton_path, tries):
+        with open(automaton_path, 'w', encoding='utf-8') as automaton_file:
+            json.dump({"vocabulary_hash": self.vocabulary_hash, "tries": tries}, automaton_file, separators=(',', ':'))
+
+    def load_vocabulary_tries(self, automaton_path):
+        """
+        Returns the tries saved in automaton_path, None if there are none for this vocabulary
+        """
+        if not os.path.exists(automaton_path):
+            return None
+        with open(automaton_path, 'r', encoding='utf-8') as automaton_file:
+            saved = json.load(automaton_file)
+        if saved.get("vocabulary_hash") != self.vocabulary_hash:
+            return None
+        return saved["tries"]
+
+    def compute_vocabulary_hash(self):
+        """
+        Hash of the whole vocabulary (and engine name/version), used to invalidate cached extractions
+        """
+        vocabulary = [self.engine_name, self.engine_version, self.all_properties, self.units_others, self.units_dia, self.wire_types, self.keywords_known, self.basic_colors,
+                      {name: sorted(settings.get("skip", ())) for name, settings in self.category_settings.items()}, self.fuzzy_thresholds]
+        if self.column_plan is not None and self.column_plan.skip:
+            vocabulary.append(sorted(self.column_plan.skip))
+        return hashlib.sha256(json.dumps(vocabulary, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def stage_vocabularies(self):
+        """
+        The vocabulary each extraction stage matches against (thickness only uses fixed patterns)
+        """
+        return {"properties": self.all_properties, "diameter": self.units_dia, "thickness": [], "units": self.units_others,
+                "color": self.basic_colors, "wire type": self.wire_types, "keywords": [self.keywords_known, self.fuzzy_thresholds]}
+
+    def category_vocabulary_hash(self, category):
+        """
+        Hash of the vocabulary the rows of an Item Category go through: that of the stages its plan does not skip
+        (with the engine name/version and the watchdog guard), used in the row fingerprints of incremental mode,
+        so a vocabulary change only re-extracts the categories that use it
+        """
+        if self.category_hashes_of != self.vocabulary_hash:
+            self.category_hashes = {}
+            self.category_hashes_of = self.vocabulary_hash
+        category_hash = self.category_hashes.get(category)
+        if category_hash is None:
+            settings = self.category_settings.get(category.strip().upper()) or {}
+            skip = set(settings.get("skip", ())) | set(self.column_plan.skip if self.column_plan is not None else ())
+            guard = self.watchdog.token_limit if self.watchdog is not None and not self.bounded_search else None
+            vocabulary = [self.engine_name, self.engine_version, guard, sorted(skip)]
+            vocabulary += [[stage, stage_vocabulary] for stage, stage_vocabulary in self.stage_vocabularies().items() if stage not in skip]
+            category_hash = hashlib.blake2b(json.dumps(vocabulary, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+            if len(self.category_hashes) >= self.category_plans_size:
+                self.category_hashes.clear()
+            self.category_hashes[category] = category_hash
+        return category_hash
+
+    def extract_properties(self, input_text):
+        """
+        Extract all extractable properties, which follow the following format in the description:
+            <property> <value>
+        """
+        properties_dict = {}
+
+        for (prop, pattern), head_pattern in zip(self.property_patterns, self.property_head_patterns):
+            # Search for the pattern in the input text
+            match = pattern.search(input_text)
+
+            if match:
+                # Store the match in the properties dictionary
+                properties_dict[prop] = match.group(1)
+
+                # Remove the found property and its value from the input text
+                input_text = remove_spans(input_text, self.property_spans(head_pattern, input_text, properties_dict[prop])).strip()
+
+        return properties_dict, input_text.strip().strip(punctuation)
+
+    def property_spans(self, head_pattern, text, value):
+        """
+        Spans of every "<property> <value>" occurrence in text (value taken literally, case-insensitive, ending a word)
+        """
+        spans = []
+        for head in head_pattern.finditer(text):
+            end = head.end() + len(value)
+            if text[head.end():end].lower() == value.lower() and is_word_boundary(text, end):
+                if not spans or head.start() >= spans[-1][1]:
+                    spans.append((head.start(), end))
+        return spans
+
+    def is_valid_diameter_value(self, word):
         """
         Checks if the extracted diameter value is valid (i.e. has a number and a valid unit measurement of length)
         """
-        # Define a regex pattern for valid diameter values
         # first regex extracts mixed fractions
-        diameter_pattern = re.compile(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*(?:' + '|'.join(units_dia) + r'))',re.IGNORECASE)   # good for mixed or unmixed fractions
-        match = diameter_pattern.search(word)
+        match = self.dia_fraction_pattern.search(word)
+        if match:
+            return match.group(1)
+        # next regex captures whole numbers
+        match = self.dia_whole_pattern.search(word)
         if match:
             return match.group(1)
-        else:
-            # next regex captures whole numbers
-            diameter_pattern = re.compile(r'(?:\S+\s+)*?(\d+\s*(?:'+'|'.join(units_dia)+r'))(?=\s|$)',re.IGNORECASE)
-            match = diameter_pattern.search(word)
-            if match:
-                return match.group(1)        
         return None
-        # return bool(match)
-    
-    # Use regex to find the diameter in the description
-    dia_match = re.search(r'\bDIA\b', description, re.IGNORECASE)
-    
-    if dia_match:
-        # Extract the substring before and after "DIA"
-        before_dia, after_dia = description.split("DIA", 1)
-
-        # Check if the word preceding "DIA" is a valid diameter value
-        before_dia = is_valid_diameter_value(before_dia.strip())
-        if before_dia is not None:
-            remaining_text = re.sub(before_dia, ' ', description, 1, flags=re.IGNORECASE)
-            remaining_text = re.sub(r'\bDIA\b', '', remaining_text, flags=re.IGNORECASE)
-            # remaining_text = re.sub("DIA", '', remaining_text, 1, flags=re.IGNORECASE)
-            return before_dia.strip(), remaining_text.strip().strip(punctuation)
-
-        after_dia = is_valid_diameter_value(after_dia.strip())
-        if after_dia is not None:
-            remaining_text = re.sub(after_dia, ' ', description, 1, flags=re.IGNORECASE)
-            remaining_text = re.sub(r'\bDIA\b', '', remaining_text, flags=re.IGNORECASE)
-            # remaining_text = re.sub("DIA", '', remaining_text, 1, flags=re.IGNORECASE)
-            return after_dia.strip(), remaining_text.strip().strip(punctuation)
-
-    return None, description.strip().strip(punctuation)
 
-def extract_thickness(description):
-    """
-    Extracts the THICKNESS from the description, based on the keyword "THK"
-    Exact same reference from extract_diameter function above
-    Contains a helper function is_valid_thickness_value
-    Note: references the unit_length list (update accordingly!)
-    """
-    def is_valid_thickness_value(word):
+    def is_valid_thickness_value(self, word):
         """
         Checks if the extracted value is valid (i.e. has a number and a valid unit measurement of length)
         """
-        # Define a regex pattern for valid diameter values
-        # first regex extracts mixed fractions
-        # pattern = re.compile(r'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*)',re.IGNORECASE)
-        pattern = re.compile(r'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*\w+)',re.IGNORECASE)
-        # pattern = f'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*)'
-        # diameter_pattern = re.compile(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*THK)',re.IGNORECASE)   # good for mixed or unmixed fractions
-        # diameter_pattern = re.compile(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*(?:' + '|'.join(units_dia) + r'))',re.IGNORECASE)   # good for mixed or unmixed fractions
-        # match = diameter_pattern.search(word)
-        match = pattern.search(word)
+        match = self.thk_value_pattern.search(word)
         if match:
             return match.group(1)
-        else:
-            # next regex captures whole numbers
-            diameter_pattern = re.compile(r'(?:\S+\s+)*?(\d+\s*(?:'+'|'.join(units_dia)+r'))(?=\s|$)',re.IGNORECASE)
-            match = diameter_pattern.search(word)
+        # next regex captures whole numbers
+        match = self.dia_whole_pattern.search(word)
+        if match:
+            return match.group(1)
+        return None
+
+    def extract_diameter(self, description):
+        """
+        Extracts the diameter from the description, based on the keyword "DIA"
+        """
+        keyword_match = self.dia_keyword_pattern.search(description)
+        if keyword_match:
+            # Extract the substring before and after "DIA"
+            before_dia, after_dia = description[:keyword_match.start()], description[keyword_match.end():]
+
+            # Check if the word preceding "DIA" is a valid diameter value
+            before_dia = self.is_valid_diameter_value(before_dia.strip())
+            if before_dia is not None:
+                remaining_text = remove_first(description, before_dia, ' ')
+                remaining_text = self.dia_keyword_pattern.sub('', remaining_text)
+                return before_dia.strip(), remaining_text.strip().strip(punctuation)
+
+            after_dia = self.is_valid_diameter_value(after_dia.strip())
+            if after_dia is not None:
+                remaining_text = remove_first(description, after_dia, ' ')
+                remaining_text = self.dia_keyword_pattern.sub('', remaining_text)
+                return after_dia.strip(), remaining_text.strip().strip(punctuation)
+
+        return None, description.strip().strip(punctuation)
+
+    def extract_thickness(self, description):
+        """
+        Extracts the THICKNESS from the description, based on the keyword "THK"
+        """
+        keyword_match = self.thk_keyword_pattern.search(description)
+        if keyword_match:
+            # Extract the substring before and after "THK"
+            before_thk, after_thk = description[:keyword_match.start()], description[keyword_match.end():]
+
+            # reverse the sentence of before_thk (so it prioritizes adjacent values)
+            before_thk = " ".join(before_thk.split(" ")[::-1])
+
+            before_thk = self.is_valid_thickness_value(before_thk.strip())
+            if before_thk is not None:
+                remaining_text = remove_first(description, before_thk, ' ')
+                remaining_text = self.thk_keyword_pattern.sub('', remaining_text)
+                return before_thk.strip(), remaining_text.strip().strip(punctuation)
+
+            after_thk = self.is_valid_thickness_value(after_thk.strip())
+            if after_thk is not None:
+                remaining_text = remove_first(description, after_thk, ' ')
+                remaining_text = self.thk_keyword_pattern.sub('', remaining_text)
+                return after_thk.strip(), remaining_text.strip().strip(punctuation)
+
+        return None, description.strip().strip(punctuation)
+
+    def extract_units(self, input_string):
+        """
+        Extracts <number><unit> values (units from units_others), returned as (value, unit) tuples
+        """
+        all_matches = []
+
+        # checks for proper and improper fractions (taken from diameter algo)
+        for match in self.unit_fraction_pattern.findall(input_string):
+            all_matches.append(match)
+            if self.unit_property_map.get(match[1].lower()):
+                input_string = remove_first(input_string, match[0])
+
+        # checks for whole numbers and decimals
+        for match in self.unit_whole_pattern.findall(input_string):
+            all_matches.append(match)
+            if self.unit_property_map.get(match[1].lower()):
+                input_string = remove_first(input_string, match[0])
+
+        # remove remaining " X " which separate dimensions
+        input_string = self.dimension_separator_pattern.sub('', input_string)
+
+        return all_matches, input_string.strip().strip(punctuation)
+
+    def extract_color_name(self, input_string):
+        """
+        Extracts the colors based on common values found in the string
+        """
+        match = self.color_pattern.search(input_string.strip().lower())
+        if match:
+            input_string = remove_first(input_string, match.group(0))
+            return match.group(0), input_string
+        return None, input_string
+
+    def extract_wire_type(self, input_string):
+        """
+        Extracts types of wires (e.g. THHN, THW-2, etc.)
+        """
+        matches = self.wire_types_trie.findall(input_string)
+        for match in matches:
+            input_string = remove_first(input_string, match)
+
+        return matches, input_string.strip().strip(punctuation)
+
+    def extract_keywords(self, input_string):
+        """
+        Extracts unlabeled brands and other keywords in description
+        (ex. brands: Panasonic, Phelps Dodge)
+        """
+        for keywords_trie in self.keywords_tries:   # by the category, e.g. brand
+            matches = keywords_trie.findall(input_string)
+            for match in matches:
+                input_string = remove_first(input_string, match)
+
+                prop = self.keywords_known_map.get(match.lower())
+                if prop:
+                    input_string = remove_first(input_string, match)
+
+        # TODO: double-check that variable "matches" is accurate (may return ALL but is not consistent with if prop: above)
+        return matches, input_string.strip().strip(punctuation)
+
+    def extract_fuzzy_keywords(self, input_string):
+        """
+        Extracts misspelled or variant keywords (e.g. PANASONIK, Phelps-Dodge) of the fuzzy_thresholds categories
+        Returns [category, vocabulary value, similarity] lists; the matched text is removed from the description
+        """
+        results = []
+        for a_categ, fuzzy_index in self.fuzzy_indexes:
+            matches = fuzzy_index.find(input_string)
+            for start, end, value, similarity in reversed(matches):
+                input_string = input_string[:start] + input_string[end:]
+            results.extend([a_categ, value, similarity] for start, end, value, similarity in matches)
+        if results:
+            input_string = input_string.strip().strip(punctuation)
+        return results, input_string
+
+    def keyword_confidence(self, keyword_values, fuzzy_values):
+        """
+        Appends the fuzzy matches to the exact keyword values; returns them with their [category, confidence] pairs
+        (exact matches of a fuzzy matched category have confidence 1.00)
+        """
+        keyword_confidence = [[prop, "1.00"] for prop, match in keyword_values if prop in self.fuzzy_thresholds]
+        for prop, value, similarity in fuzzy_values:
+            keyword_values.append([prop, value])
+            keyword_confidence.append([prop, f"{similarity:.2f}"])
+        return keyword_values, keyword_confidence
+
+
+class SpanStream:
+    """
+    A description seen as live spans of its original text
+    Extractors consume spans (optionally leaving a replacement, e.g. a space) instead of rewriting the text,
+    the current text is only re-joined when a stage needs it after something was consumed
+    """
+    __slots__ = ("text", "segments", "_view")
+
+    def __init__(self, text):
+        self.text = text
+        self.segments = [(0, len(text), None)]     # (start, end, None): slice of text, (0, 0, literal): inserted text
+        self._view = text
+
+    def view(self):
+        """
+        Current text (what the regex pipeline would have at this point)
+        """
+        if self._view is None:
+            self._view = ''.join(self.text[start:end] if literal is None else literal for start, end, literal in self.segments)
+        return self._view
+
+    def consume(self, start, end, replacement=''):
+        """
+        Consumes [start, end) of the current text, leaving the replacement in its place
+        """
+        segments = []
+        offset = 0
+        for segment in self.segments:
+            seg_start, seg_end, literal = segment
+            length = (seg_end - seg_start) if literal is None else len(literal)
+            if offset + length <= start or offset >= end:
+                segments.append(segment)
+            else:
+                left, right = start - offset, end - offset
+                if left > 0:
+                    segments.append((seg_start, seg_start + left, None) if literal is None else (0, 0, literal[:left]))
+                if replacement and offset <= start:
+                    segments.append((0, 0, replacement))
+                if right < length:
+                    segments.append((seg_start + right, seg_end, None) if literal is None else (0, 0, literal[right:]))
+            offset += length
+        if replacement and start >= offset:
+            segments.append((0, 0, replacement))
+        self.segments = segments
+        self._view = None
+
+    def consume_all(self, spans, replacement=''):
+        """
+        Consumes every (start, end) span (non-overlapping, in text order) of the current text
+        """
+        for start, end in reversed(spans):
+            self.consume(start, end, replacement)
+
+    def consume_matches(self, pattern):
+        """
+        Consumes every match of pattern (like pattern.sub('', text))
+        """
+        self.consume_all([match.span() for match in pattern.finditer(self.view()) if match.end() > match.start()])
+
+    def consume_first(self, value, replacement=''):
+        """
+        Consumes the first (case-insensitive) occurrence of value, like re.sub(value, replacement, text, 1, flags=re.IGNORECASE)
+        but with value taken literally (values such as "lbs/ft." or "3.2MM" are not regex patterns)
+        """
+        start = find_literal(self.view(), value)
+        if start >= 0:
+            self.consume(start, start + len(value), replacement)
+
+    def strip(self, punct=True):
+        """
+        Same as text.strip().strip(punctuation) (or text.strip() without punct)
+        """
+        view = self.view()
+        start = len(view) - len(view.lstrip())
+        end = len(view.rstrip())
+        if punct and start < end:
+            inner = view[start:end]
+            start += len(inner) - len(inner.lstrip(punctuation))
+            end = max(start, start + len(inner.strip(punctuation)))
+        if end < len(view):
+            self.consume(end, len(view))
+        if start > 0:
+            self.consume(0, start)
+
+
+class StreamExtractor(DescriptionExtractor):
+    """
+    Single-pass variant of DescriptionExtractor.extract_fields: the description is wrapped once in a SpanStream,
+    every stage matches the current text and consumes what it extracted, the leftover (info) is joined once at the end
+    - no regex is compiled per row, and extracted values are never used as regex patterns
+    - the "(?:\\S+\\s+)*?" prefixed searches are replaced by anchored matches at the candidate digits
+      (token starts first, then inside tokens: same result, without the backtracking)
+    Results are the same as the regex pipeline
+    """
+    engine_name = "stream"
+    bounded_search = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.digit_pattern = re.compile(r'\d')
+
+        # the value patterns without their "(?:\S+\s+)*?" prefix (same groups)
+        dia_units = '|'.join(self.units_dia)
+        self.dia_fraction_value = re.compile(r'((?:\d+\s+)?\d+/\d+\s*(?:' + dia_units + r'))', re.IGNORECASE)
+        self.dia_whole_value = re.compile(r'(\d+\s*(?:' + dia_units + r'))(?=\s|$)', re.IGNORECASE)
+        self.thk_value = re.compile(r'(\d+(?:[-.]\d+)?\s*\w+)', re.IGNORECASE)
+        self.unit_fraction_value = re.compile(r'((?:\d+\s+)?\d+/\d+\s*(' + self.unit_pattern + r'))', re.IGNORECASE)
+        self.unit_whole_value = re.compile(r'(\d+(?:[-.]\d+)?\s*(' + self.unit_pattern + r'))(?:/[^\s]+)?(?=\s|$)', re.IGNORECASE)
+
+    def search_value(self, pattern, text, start=0):
+        """
+        Same match as the "(?:\\S+\\s+)*?" prefixed pattern searched from start (all the value patterns start with a digit):
+        the lazy prefix tries every token start before moving inside a token
+        """
+        inside = []
+        for digit in self.digit_pattern.finditer(text, start):
+            position = digit.start()
+            if position == start or text[position - 1].isspace():
+                match = pattern.match(text, position)
+                if match:
+                    return match
+            else:
+                inside.append(position)
+        for position in inside:
+            match = pattern.match(text, position)
             if match:
-                return match.group(1)        
+                return match
         return None
-        # return bool(match)
-    
-    # Use regex to find the diameter in the description
-    dia_match = re.search(r'\bTHK\b', description, re.IGNORECASE)
-    
-    if dia_match:
-        # Extract the substring before and after "DIA"
-        before_dia, after_dia = description.split("THK", 1)
-        
-        # reverse the sentence of before_dia (so it prioritizes adjacent values)
-        before_dia_split = before_dia.split(" ")
-        before_dia_split = before_dia_split[::-1]
-        before_dia = " ".join(before_dia_split)
-        
-        # Check if the word preceding "DIA" is a valid diameter value
-        before_dia = is_valid_thickness_value(before_dia.strip())
-        if before_dia is not None:
-            remaining_text = re.sub(before_dia, ' ', description, 1, flags=re.IGNORECASE)
-            remaining_text = re.sub(r'\bTHK\b', '', remaining_text, flags=re.IGNORECASE)
-            # remaining_text = re.sub("DIA", '', remaining_text, 1, flags=re.IGNORECASE)
-            return before_dia.strip(), remaining_text.strip().strip(punctuation)
-
-        after_dia = is_valid_thickness_value(after_dia.strip())
-        if after_dia is not None:
-            remaining_text = re.sub(after_dia, ' ', description, 1, flags=re.IGNORECASE)
-            remaining_text = re.sub(r'\bTHK\b', '', remaining_text, flags=re.IGNORECASE)
-            # remaining_text = re.sub("DIA", '', remaining_text, 1, flags=re.IGNORECASE)
-            return after_dia.strip(), remaining_text.strip().strip(punctuation)
-
-    return None, description.strip().strip(punctuation)
-
-def extract_units(input_string):      
-    unit_pattern = '|'.join(re.escape(unit) for unit in unit_property_map.keys())
-    all_matches = []
-    
-    # checks for proper and improper fractions (taken from diameter algo)
-    matches = re.findall(r'(?:\S+\s+)*?((?:\d+\s+)?\d+/\d+\s*(' + unit_pattern + r'))', input_string, flags=re.IGNORECASE)
-    for match in matches:
-        all_matches.append(match)
-        unit = match[1]
-        prop = unit_property_map.get(unit.lower())
-        if prop:
-            input_string = re.sub(match[0], '', input_string, 1, flags=re.IGNORECASE)
-    
-    # checks for whole numbers and decimals
-    pattern = f'(?:\S+\s+)*?(\d+(?:[-.]\d+)?\s*({unit_pattern}))(?:/[^\\s]+)?(?=\s|$)'
-    # pattern = f'(?:\S+\s+)*?(\d+(?:\.\d+)?\s*({unit_pattern}))(?:/[^\\s]+)?(?=\s|$)'
-    matches = re.findall(pattern, input_string, flags=re.IGNORECASE)
-
-    for match in matches:
-        all_matches.append(match)
-        unit = match[1]
-        prop = unit_property_map.get(unit.lower())
-        if prop:
-            input_string = re.sub(match[0], '', input_string, 1, flags=re.IGNORECASE)
-    
-    # remove remaining " X " which separate dimensions
-    input_string = re.sub(r'\bX\b', '', input_string, flags=re.IGNORECASE)
-    
-    return all_matches, input_string.strip().strip(punctuation)
 
-def extract_color_name(input_string):
+    def find_values(self, pattern, text):
+        """
+        Same as findall of the prefixed pattern, returns the matches
+        """
+        matches = []
+        match = self.search_value(pattern, text)
+        while match:
+            matches.append(match)
+            match = self.search_value(pattern, text, match.end())
+        return matches
+
+    def valid_value(self, value_patterns, word):
+        for pattern in value_patterns:
+            match = self.search_value(pattern, word)
+            if match:
+                return match.group(1)
+        return None
+
+    def consume_properties(self, stream):
+        properties_dict = {}
+        for (prop, pattern), head_pattern in zip(self.property_patterns, self.property_head_patterns):
+            text = stream.view()
+            match = pattern.search(text)
+            if match:
+                value = properties_dict[prop] = match.group(1)
+                # every "<property> <value>" occurrence goes
+                stream.consume_all(self.property_spans(head_pattern, text, value))
+                stream.strip(punct=False)
+        stream.strip()
+        return properties_dict
+
+    def consume_measure(self, stream, keyword_pattern, before_patterns, after_patterns, reverse_before):
+        text = stream.view()
+        keyword_match = keyword_pattern.search(text)
+        if keyword_match:
+            before, after = text[:keyword_match.start()], text[keyword_match.end():]
+            if reverse_before:
+                # reverse the sentence (so it prioritizes adjacent values)
+                before = " ".join(before.split(" ")[::-1])
+            for part, value_patterns in ((before, before_patterns), (after, after_patterns)):
+                value = self.valid_value(value_patterns, part.strip())
+                if value is not None:
+                    stream.consume_first(value, ' ')
+                    stream.consume_matches(keyword_pattern)
+                    stream.strip()
+                    return value.strip()
+        stream.strip()
+        return None
+
+    def consume_units(self, stream):
+        all_matches = []
+        for pattern in (self.unit_fraction_value, self.unit_whole_value):
+            for match in self.find_values(pattern, stream.view()):
+                all_matches.append(match.groups())
+                if self.unit_property_map.get(match.group(2).lower()):
+                    stream.consume_first(match.group(1))
+        stream.consume_matches(self.dimension_separator_pattern)
+        stream.strip()
+        return all_matches
+
+    def extract_fields(self, category, total_descr, profiler=None):
+        """
+        Same field set as DescriptionExtractor.extract_fields, in a single SpanStream
+        """
+        if profiler is not None:
+            profiler.start()
+        stream = SpanStream(total_descr)
+
+        plan = self.category_plan(category)
+        for pattern in plan.strip_patterns:
+            stream.consume_matches(pattern)
+            stream.strip(punct=False)
+        stream.strip()
+        if profiler is not None:
+            profiler.lap("category", stream.view() != total_descr)
+
+        result_properties = {}
+        if "properties" not in plan.skip:
+            result_properties = self.consume_properties(stream)
+        if profiler is not None:
+            profiler.lap("properties", result_properties)
+
+        result_dia = None
+        if "diameter" not in plan.skip:
+            dia_values = (self.dia_fraction_value, self.dia_whole_value)
+            result_dia = self.consume_measure(stream, self.dia_keyword_pattern, dia_values, dia_values, False)
+        if profiler is not None:
+            profiler.lap("diameter", result_dia is not None)
+
+        result_thk = None
+        if "thickness" not in plan.skip:
+            thk_values = (self.thk_value, self.dia_whole_value)
+            result_thk = self.consume_measure(stream, self.thk_keyword_pattern, thk_values, thk_values, True)
+        if profiler is not None:
+            profiler.lap("thickness", result_thk is not None)
+
+        result_units = []
+        if "units" not in plan.skip:
+            result_units = self.consume_units(stream)
+        unit_values = []
+        for value, unit in result_units:
+            prop = self.unit_property_map.get(unit.lower())
+            if prop:
+                unit_values.append([prop, value])
+        if profiler is not None:
+            profiler.lap("units", unit_values)
+
+        result_color = None
+        match = None if "color" in plan.skip else self.color_pattern.search(stream.view().strip().lower())
+        if match:
+            result_color = match.group(0)
+            stream.consume_first(result_color)
+        if profiler is not None:
+            profiler.lap("color", result_color is not None)
+
+        result_wire_type = []
+        if "wire type" not in plan.skip:
+            result_wire_type = self.wire_types_trie.findall(stream.view())
+            for match in result_wire_type:
+                stream.consume_first(match)
+            stream.strip()
+        if profiler is not None:
+            profiler.lap("wire type", result_wire_type)
+
+        # as in extract_keywords, only the matches of the last keyword category are returned
+        result_keywords = []
+        if "keywords" not in plan.skip:
+            for keywords_trie in self.keywords_tries:
+                result_keywords = keywords_trie.findall(stream.view())
+                for match in result_keywords:
+                    stream.consume_first(match)
+                    if self.keywords_known_map.get(match.lower()):
+                        stream.consume_first(match)
+            stream.strip()
+        keyword_values = []
+        for match in result_keywords:
+            prop = self.keywords_known_map.get(match.lower())
+            if prop:
+                keyword_values.append([prop, match])
+        fuzzy_values = []
+        if "keywords" not in plan.skip and self.fuzzy_indexes:
+            total_descr = stream.view()
+            fuzzy_values, remaining = self.extract_fuzzy_keywords(total_descr)
+            if fuzzy_values:
+                stream = SpanStream(remaining)
+        keyword_values, keyword_confidence = self.keyword_confidence(keyword_values, fuzzy_values)
+        if profiler is not None:
+            profiler.lap("keywords", keyword_values)
+
+        return {
+            "properties": [[prop, value] for prop, value in result_properties.items()],
+            "diameter": result_dia,
+            "thickness": result_thk,
+            "units": unit_values,
+            "color": result_color,
+            "wire type": result_wire_type,
+            "keywords": keyword_values,
+            "keyword confidence": keyword_confidence,
+            "info": stream.view(),
+        }
+
+
+extraction_engines = {"regex": DescriptionExtractor, "stream": StreamExtractor}
+
+class ExtractionCache:
+    """
+    Bounded LRU cache of extracted field sets, keyed on (Item Category, normalized description)
+    Optionally backed by a sqlite file (path), so later runs skip descriptions seen before
+    Stored entries belong to one vocabulary hash: opening the file with a different vocabulary clears it
+    """
+    def __init__(self, vocabulary_hash, maxsize=100000, path=None):
+        self.vocabulary_hash = vocabulary_hash
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.pending_writes = []
+        self.connection = None
+        if path is not None:
+            import sqlite3  # only needed for the on-disk cache
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS extractions (category TEXT, description TEXT, fields TEXT, PRIMARY KEY (category, description))")
+            stored = self.connection.execute("SELECT value FROM meta WHERE key = 'vocabulary_hash'").fetchone()
+            if stored is None or stored[0] != vocabulary_hash:
+                # vocabulary changed since the entries were stored
+                self.connection.execute("DELETE FROM extractions")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('vocabulary_hash', ?)", (vocabulary_hash,))
+            self.connection.commit()
+
+    def get(self, key):
+        """
+        Returns the cached field set for key, or None (counted as a miss)
+        """
+        fields = self.entries.get(key)
+        if fields is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return fields
+        if self.connection is not None:
+            found = self.connection.execute("SELECT fields FROM extractions WHERE category = ? AND description = ?", key).fetchone()
+            if found is not None:
+                fields = json.loads(found[0])
+                self._remember(key, fields)
+                self.hits += 1
+                self.disk_hits += 1
+                return fields
+        self.misses += 1
+        return None
+
+    def put(self, key, fields):
+        self._remember(key, fields)
+        if self.connection is not None:
+            self.pending_writes.append((key[0], key[1], json.dumps(fields)))
+            if len(self.pending_writes) >= 1000:
+                self.flush()
+
+    def _remember(self, key, fields):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = fields
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def flush(self):
+        if self.connection is not None and self.pending_writes:
+            self.connection.executemany("INSERT OR REPLACE INTO extractions VALUES (?, ?, ?)", self.pending_writes)
+            self.connection.commit()
+            self.pending_writes = []
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        return f"Cache: {self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, hit rate {hit_rate:.1%}"
+
+
+class StageProfiler:
+    """
+    Opt-in per-stage instrumentation of the extraction pipeline
+    For every stage: call count, hit count (field extracted or not), cumulative time and worst single-row time
+    Stages are timed as laps: start() at the beginning of a row, lap(stage, hit) after each stage
+    """
+    stages = ["cache", "category", "properties", "diameter", "thickness", "units", "color", "wire type", "keywords", "assembly"]
+
+    def __init__(self):
+        self.stats = {}     # stage -> [calls, hits, total seconds, worst seconds]
+        self.last = 0.0
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def lap(self, stage, hit):
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        entry = self.stats.get(stage)
+        if entry is None:
+            entry = self.stats[stage] = [0, 0, 0.0, 0.0]
+        entry[0] += 1
+        if hit:
+            entry[1] += 1
+        entry[2] += elapsed
+        if elapsed > entry[3]:
+            entry[3] = elapsed
+
+    def merge(self, stats):
+        """
+        Adds the stats of another profiler (e.g. from a worker process)
+        """
+        for stage, (calls, hits, total, worst) in stats.items():
+            entry = self.stats.setdefault(stage, [0, 0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += hits
+            entry[2] += total
+            entry[3] = max(entry[3], worst)
+
+    def report(self):
+        """
+        Returns one dict per stage (pipeline order), with times in milliseconds
+        """
+        total_time = sum(entry[2] for entry in self.stats.values())
+        report = []
+        for stage in self.stages + [stage for stage in self.stats if stage not in self.stages]:
+            if stage not in self.stats:
+                continue
+            calls, hits, total, worst = self.stats[stage]
+            report.append({
+                "stage": stage,
+                "calls": calls,
+                "hits": hits,
+                "hit_rate": hits / calls if calls else 0.0,
+                "total_ms": total * 1000,
+                "share": total / total_time if total_time else 0.0,
+                "mean_us": total / calls * 1e6 if calls else 0.0,
+                "worst_ms": worst * 1000,
+            })
+        return report
+
+    def format_table(self):
+        lines = [f"{'stage':12s} {'calls':>9s} {'hits':>9s} {'total ms':>11s} {'share':>7s} {'mean us':>9s} {'worst ms':>9s}"]
+        for entry in self.report():
+            lines.append(f"{entry['stage']:12s} {entry['calls']:9d} {entry['hits']:9d} {entry['total_ms']:11.1f} {entry['share']:7.1%} {entry['mean_us']:9.1f} {entry['worst_ms']:9.2f}")
+        return "\n".join(lines)
+
+    def write_report(self, report_path):
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+
+class RowBudgetExceeded(Exception):
+    """
+    Raised between two stages when a row has used up its RowWatchdog budget
+    """
+    def __init__(self, stage, seconds, stage_seconds):
+        super().__init__(f"{stage}: {seconds * 1000:.1f} ms")
+        self.stage = stage
+        self.seconds = seconds
+        self.stage_seconds = stage_seconds
+
+
+class RowLaps:
+    """
+    Per-row stage timer handed to extract_fields as its profiler (start/lap), for RowWatchdog
+    Forwards the laps to the run's StageProfiler (if any); with a deadline, raises RowBudgetExceeded
+    after the stage that crossed the budget
+    """
+    def __init__(self, budget=None, raise_on_budget=False, profiler=None):
+        self.budget = budget
+        self.raise_on_budget = raise_on_budget
+        self.profiler = profiler
+        self.started = 0.0
+        self.last = 0.0
+        self.slowest = (None, 0.0)    # (stage, seconds)
+
+    def start(self):
+        self.started = self.last = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def lap(self, stage, hit):
+        now = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.lap(stage, hit)
+        elapsed = now - self.last
+        self.last = now
+        if elapsed > self.slowest[1]:
+            self.slowest = (stage, elapsed)
+        if self.raise_on_budget and self.budget is not None and now - self.started > self.budget:
+            raise RowBudgetExceeded(stage, now - self.started, elapsed)
+
+    def elapsed(self):
+        return self.last - self.started
+
+
+class RowWatchdog:
+    """
+    Per-row latency budget for the extraction chain, so a single pathological row cannot stall a run
+    - guard: descriptions of more than token_limit tokens skip the "(?:\\S+\\s+)*?" searches of the regex engine
+      (their time grows with the cube of the token count) and go straight to the fallback, a StreamExtractor with
+      the same vocabulary (same matches, anchored at the candidate digits); depends only on the description
+    - deadline: a row still running after budget seconds is flagged; with fallback=True it is stopped after the current
+      stage and re-extracted by the fallback instead. That depends on the machine's load, so the same row may come out
+      of either engine from one run to the next: leave it off when the output must be reproducible (cache, resume, shards)
+    With a bounded engine (stream) there is no fallback: rows over budget are only flagged
+    Every slow row is logged (stage, time, description): to log_path (JSON lines), the first log_examples to stderr
+    In worker processes (collect=True) the log entries are kept, then sent to the main process (take/merge)
+    """
+    log_examples = 10
+
+    def __init__(self, budget=0.2, token_limit=None, log_path=None, fallback=False, collect=False):
+        self.budget = budget
+        self.token_limit = token_limit
+        self.log_path = log_path
+        self.use_fallback = fallback
+        self.collect = collect
+        self.counts = {}    # stage -> [slow rows, rows re-extracted by the fallback, worst seconds]
+        self.pending = []   # log entries not sent to the main process yet (collect=True)
+        self.logged = 0
+        self.log_file = None
+        self.fallback = None
+
+    def settings(self):
+        return self.budget, self.token_limit, self.log_path, self.use_fallback
+
+    def attach(self, extractor):
+        """
+        Watches the extract_fields calls of extractor (see the module-level extract_fields)
+        The guard changes which engine extracts long rows, so token_limit is part of the vocabulary hash (cache key)
+        """
+        extractor.watchdog = self
+        vocabulary_hash = extractor.compute_vocabulary_hash()
+        if self.token_limit and not extractor.bounded_search:
+            vocabulary_hash = hashlib.sha256(f"{vocabulary_hash}:guard{self.token_limit}".encode('utf-8')).hexdigest()
+        extractor.vocabulary_hash = vocabulary_hash
+        return self
+
+    def fallback_extractor(self, extractor):
+        if self.fallback is None:
+            self.fallback = StreamExtractor(extractor.all_properties, extractor.units_others, extractor.units_dia, extractor.wire_types,
+                                            extractor.keywords_known, settings_by_category=extractor.category_settings,
+                                            fuzzy_thresholds=extractor.fuzzy_thresholds)
+            if extractor.column_plan is not None:
+                self.fallback.select_columns(extractor.column_plan.columns)
+        return self.fallback
+
+    def extract_fields(self, extractor, category, total_descr, profiler=None):
+        """
+        extractor.extract_fields(category, total_descr, profiler), within the budget
+        """
+        bounded = extractor.bounded_search
+        if not bounded and self.token_limit and total_descr.count(' ') >= self.token_limit and len(total_descr.split()) > self.token_limit:
+            self.record("guard", category, total_descr, 0.0, 0.0, "fallback")
+            return self.fallback_extractor(extractor).extract_fields(category, total_descr, profiler)
+
+        laps = RowLaps(self.budget, self.use_fallback and not bounded, profiler)
+        try:
+            fields = extractor.extract_fields(category, total_descr, laps)
+        except RowBudgetExceeded as exceeded:
+            self.record(exceeded.stage, category, total_descr, exceeded.seconds, exceeded.stage_seconds, "fallback")
+            # ! the stages run so far are already in the profiler: the re-extraction is not timed again
+            return self.fallback_extractor(extractor).extract_fields(category, total_descr)
+        if self.budget is not None and laps.elapsed() > self.budget:
+            stage, stage_seconds = laps.slowest
+            self.record(stage, category, total_descr, laps.elapsed(), stage_seconds, "flagged")
+        return fields
+
+    def record(self, stage, category, total_descr, seconds, stage_seconds, action):
+        entry = self.counts.setdefault(stage, [0, 0, 0.0])
+        entry[0] += 1
+        if action == "fallback":
+            entry[1] += 1
+        entry[2] = max(entry[2], seconds)
+        self.log({"stage": stage, "action": action, "ms": round(seconds * 1000, 3), "stage_ms": round(stage_seconds * 1000, 3),
+                  "Item Category": category, "description": total_descr})
+
+    def log(self, entry):
+        if self.collect:
+            self.pending.append(entry)
+            return
+        self.logged += 1
+        if self.log_path is not None:
+            if self.log_file is None:
+                self.log_file = open(self.log_path, 'w', encoding='utf-8')
+            self.log_file.write(json.dumps(entry) + "\n")
+        if self.logged <= self.log_examples:
+            reason = f"over {entry['stage']!r} token limit" if entry["stage"] == "guard" else f"{entry['ms']:.1f} ms, slowest stage {entry['stage']!r}"
+            print(f"Slow row ({reason}, {entry['action']}): {entry['Item Category']} | {entry['description'][:200]}", file=sys.stderr)
+        elif self.logged == self.log_examples + 1:
+            print("Slow row: more slow rows are only counted" + (f" (and logged to {self.log_path})" if self.log_path else ""), file=sys.stderr)
+
+    def take(self):
+        """
+        Worker side: returns (counts, log entries) since the last take, and resets them
+        """
+        report = (self.counts, self.pending)
+        self.counts = {}
+        self.pending = []
+        return report
+
+    def merge(self, report):
+        """
+        Main process side: adds the counts of a worker and logs its entries
+        """
+        counts, entries = report
+        for stage, (rows, fallback_rows, worst) in counts.items():
+            entry = self.counts.setdefault(stage, [0, 0, 0.0])
+            entry[0] += rows
+            entry[1] += fallback_rows
+            entry[2] = max(entry[2], worst)
+        for entry in entries:
+            self.log(entry)
+
+    def slow_rows(self):
+        return sum(entry[0] for entry in self.counts.values())
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+    def report(self):
+        limits = []
+        if self.budget is not None:
+            limits.append(f"budget {self.budget * 1000:g} ms")
+        if self.token_limit:
+            limits.append(f"guard {self.token_limit} tokens")
+        fallback_rows = sum(entry[1] for entry in self.counts.values())
+        lines = [f"Row watchdog ({', '.join(limits)}): {self.slow_rows()} slow rows, {fallback_rows} re-extracted by the fallback, "
+                 f"{self.slow_rows() - fallback_rows} flagged"]
+        for stage in ["guard"] + StageProfiler.stages + [stage for stage in self.counts if stage not in StageProfiler.stages + ["guard"]]:
+            if stage in self.counts:
+                rows, fallback_rows, worst = self.counts[stage]
+                lines.append(f"  {stage:12s} {rows:7d} rows" + (f", worst {worst * 1000:.1f} ms" if stage != "guard" else ""))
+        if self.log_path is not None and self.logged:
+            lines.append(f"  slow rows logged to: {self.log_path}")
+        return "\n".join(lines)
+
+
+def set_watchdog(extractor, budget=None, token_limit=None, log_path=None, fallback=False, collect=False):
+    """
+    Attaches a RowWatchdog to extractor (budget in seconds, token_limit in tokens), or removes it if both are off
+    fallback: re-extract the rows over budget with the stream engine (default: only flag them)
+    Returns the watchdog (or None)
+    """
+    if extractor.watchdog is not None:
+        extractor.watchdog.close()
+    if not budget and not token_limit:
+        extractor.watchdog = None
+        extractor.vocabulary_hash = extractor.compute_vocabulary_hash()
+        return None
+    return RowWatchdog(budget or None, token_limit or None, log_path, fallback, collect).attach(extractor)
+
+
+class RunMetrics:
+    """
+    Live metrics of a long run, sampled cheaply enough to leave throughput alone:
+    every row only bumps two counters, field fill rates are sampled on one row in sample_every,
+    and the clock is read once every check_every rows
+    Every interval seconds (and at the end), the metrics are written to metrics_path in the Prometheus text format
+    (atomically replaced, for a node_exporter textfile collector) and/or printed as a progress line on stderr
+    progress is a function returning the share of the input read (0-1, or None if unknown), used for the ETA
+    """
+    sample_every = 16
+    check_every = 256
+
+    def __init__(self, input_name, interval=10.0, metrics_path=None, show_progress=True, progress=None, cache=None, watchdog=None):
+        self.input_name = input_name
+        self.interval = interval
+        self.metrics_path = metrics_path
+        self.show_progress = show_progress
+        self.progress = progress
+        self.cache = cache
+        self.watchdog = watchdog
+        self.field_columns = extracted_field_columns()
+        column_plan = get_extractor().column_plan
+        if column_plan is not None:
+            self.field_columns = [a_column for a_column in self.field_columns if a_column in column_plan.columns]
+        self.fills = dict.fromkeys(self.field_columns, 0)
+        self.sampled = 0
+        self.rows = 0
+        self.extracted = 0
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.next_emit = self.started + interval
+        self.next_check = self.check_every
+        self.progress_lines = 0
+
+    def observe(self, row):
+        self.rows += 1
+        if row.get("extracted"):
+            self.extracted += 1
+        if self.rows % self.sample_every == 0:
+            self.sampled += 1
+            for a_column in self.field_columns:
+                if row.get(a_column):
+                    self.fills[a_column] += 1
+        if self.rows >= self.next_check:
+            self.next_check += self.check_every
+            if time.perf_counter() >= self.next_emit:
+                self.emit()
+
+    def add_rows(self, rows, extracted, fills, sampled):
+        """
+        Adds rows counted elsewhere (e.g. by a sharded mode worker): fills are the sampled field counts
+        """
+        self.rows += rows
+        self.extracted += extracted
+        self.sampled += sampled
+        for a_column, count in fills.items():
+            self.fills[a_column] = self.fills.get(a_column, 0) + count
+        if time.perf_counter() >= self.next_emit:
+            self.emit()
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        progress = self.progress() if self.progress is not None else None
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        eta = elapsed * (1 - progress) / progress if progress else None
+        snapshot = {
+            "rows": self.rows,
+            "elapsed": elapsed,
+            "rows_per_second": rate,
+            "progress": progress,
+            "eta": eta,
+            "extracted_ratio": self.extracted / self.rows if self.rows else 0.0,
+            "fill_ratios": {a_column: count / self.sampled if self.sampled else 0.0 for a_column, count in self.fills.items()},
+        }
+        if self.cache is not None:
+            lookups = self.cache.hits + self.cache.misses
+            snapshot["cache"] = (self.cache.hits, self.cache.misses, self.cache.hits / lookups if lookups else 0.0)
+        if self.watchdog is not None:
+            snapshot["slow_rows"] = self.watchdog.slow_rows()
+        return snapshot
+
+    def emit(self, final=False):
+        self.next_emit = time.perf_counter() + self.interval
+        snapshot = self.snapshot()
+        if self.metrics_path is not None:
+            self.write_metrics(snapshot)
+        if self.show_progress and (self.progress_lines or not final):
+            self.progress_lines += 1
+            print(self.format_progress(snapshot, final), file=sys.stderr, flush=True)
+
+    def close(self):
+        self.emit(final=True)
+
+    def format_progress(self, snapshot, final=False):
+        parts = [f"{snapshot['rows']} rows", f"{snapshot['rows_per_second']:.0f} rows/s"]
+        if snapshot["progress"] is not None:
+            parts.append(f"{snapshot['progress']:.1%}")
+        if not final and snapshot["eta"] is not None:
+            parts.append(f"ETA {datetime.timedelta(seconds=round(snapshot['eta']))}")
+        parts.append(f"extracted {snapshot['extracted_ratio']:.1%}")
+        if "cache" in snapshot:
+            parts.append(f"cache hits {snapshot['cache'][2]:.1%}")
+        if snapshot.get("slow_rows"):
+            parts.append(f"{snapshot['slow_rows']} slow rows")
+        return ("Done: " if final else "Progress: ") + ", ".join(parts)
+
+    @staticmethod
+    def label_value(value):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+    def write_metrics(self, snapshot):
+        label = 'input=' + self.label_value(self.input_name)
+        metrics = [
+            ("scic_rows_processed_total", "counter", "Rows extracted so far", [("", snapshot["rows"])]),
+            ("scic_rows_per_second", "gauge", "Mean rows per second since the start of the run", [("", snapshot["rows_per_second"])]),
+            ("scic_run_start_timestamp_seconds", "gauge", "Start of the run (unix time)", [("", self.started_at)]),
+            ("scic_progress_ratio", "gauge", "Share of the input read", [("", snapshot["progress"])]),
+            ("scic_eta_seconds", "gauge", "Estimated seconds until the end of the run", [("", snapshot["eta"])]),
+            ("scic_extracted_ratio", "gauge", 'Share of the rows with extracted == "Y"', [("", snapshot["extracted_ratio"])]),
+            ("scic_field_fill_ratio", "gauge", "Share of the (sampled) rows with the field filled",
+             [(',field=' + self.label_value(a_column), ratio) for a_column, ratio in snapshot["fill_ratios"].items()]),
+        ]
+        if "cache" in snapshot:
+            hits, misses, hit_rate = snapshot["cache"]
+            metrics.append(("scic_cache_hits_total", "counter", "Extraction cache hits", [("", hits)]))
+            metrics.append(("scic_cache_misses_total", "counter", "Extraction cache misses", [("", misses)]))
+            metrics.append(("scic_cache_hit_ratio", "gauge", "Extraction cache hit rate", [("", hit_rate)]))
+        if "slow_rows" in snapshot:
+            metrics.append(("scic_slow_rows_total", "counter", "Rows over the row watchdog budget", [("", snapshot["slow_rows"])]))
+        lines = []
+        for name, kind, description, samples in metrics:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{{{label}{labels}}} {'NaN' if value is None else repr(float(value)) if isinstance(value, float) else value}")
+        temporary_path = self.metrics_path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write("\n".join(lines) + "\n")
+        os.replace(temporary_path, self.metrics_path)
+
+class RunCheckpoint:
+    """
+    Checkpoints of a run with a .csv output, so an interrupted run can be resumed where it stopped
+    At every checkpoint the output is flushed to disk (fsync), then the checkpoint file next to it records the rows
+    written and the output size; a resumed run truncates the output to that size (dropping any row written after
+    the checkpoint) and skips as many input rows, so its output is the same as the one of an uninterrupted run
+    The checkpoint also records the input (size, modification time), the engine, the vocabulary and the output columns
+    (and any other settings given): resuming with any of them changed is refused
+    """
+    def __init__(self, output_file_path, input_file_path, csv_columns, **settings):
+        self.path = checkpoint_path_for(output_file_path)
+        self.output_file_path = output_file_path
+        input_stat = os.stat(input_file_path)
+        extractor = get_extractor()
+        self.identity = dict(input=os.path.abspath(input_file_path), input_size=input_stat.st_size, input_mtime_ns=input_stat.st_mtime_ns,
+                             engine=extractor.engine_name, vocabulary_hash=extractor.vocabulary_hash, columns=csv_columns, **settings)
+        self.saved = 0
+
+    def load(self):
+        """
+        Returns the saved state of an interrupted run (rows, output_position, ...), None if there is no checkpoint
+        Raises ValueError if the checkpoint is from another input, vocabulary or settings, or the output is shorter
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as checkpoint_file:
+            state = json.load(checkpoint_file)
+        changed = [a_key for a_key, value in self.identity.items() if state.get(a_key) != value]
+        if changed:
+            raise ValueError(f"Cannot resume from {self.path}: {', '.join(changed)} changed since the checkpoint (run again without resuming)")
+        if not os.path.exists(self.output_file_path) or os.path.getsize(self.output_file_path) < state["output_position"]:
+            raise ValueError(f"Cannot resume from {self.path}: {self.output_file_path} is missing or shorter than at the checkpoint")
+        return state
+
+    def save(self, csv_writer, rows, **state):
+        """
+        Flushes the output to disk and records rows (input rows done) with its size, plus state (e.g. shards done)
+        The checkpoint file is replaced atomically: a crash leaves either the previous checkpoint or this one
+        """
+        state = dict(self.identity, rows=rows, output_position=csv_writer.sync(), **state)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.path)
+        self.saved += 1
+
+    def remove(self):
+        """
+        The run completed: its checkpoint is no longer needed
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+quantity_pattern = re.compile(r'(?:(\d+)\s+)?(\d+(?:\.\d+)?)(?:/(\d+))?\s*(.*)$')
+
+def parse_quantity(text):
+    """
+    Parses a single extracted value into (number, unit), e.g. "1 1/2 IN" -> (1.5, "in"), "3.5MM SQ" -> (3.5, "mm sq")
+    Returns None if the text does not start with a number
+    """
+    match = quantity_pattern.match(text.strip())
+    if not match:
+        return None
+    whole, number, denominator, unit = match.groups()
+    number = float(number)
+    if denominator is not None:
+        if int(denominator) == 0:
+            return None
+        number /= int(denominator)
+    if whole is not None:
+        number += int(whole)
+    return number, unit.strip().lower()
+
+value_column_pattern = re.compile(r'[^0-9a-z]+')
+
+def value_column_name(prop):
+    """
+    Name of the numeric column of a measured property, e.g. "length_mm", "voltage_rating_v"
+    (lowercase letters, digits and underscores only, so it can be used unquoted in SQL engines reading the file)
+    """
+    canonical_unit = unit_conversions.get(prop, count_conversion)[0]
+    return value_column_pattern.sub('_', f"{prop}_{canonical_unit}".lower()).strip('_')
+
+def normalize_quantity(prop, raw_value):
+    """
+    Converts the raw text of a measured property to a number in the property's canonical unit (unit_conversions)
+    Properties holding several values ("100MM X 4FT", "12V, 24V") use the first one
+    Returns None when there is no value or the unit cannot be converted
+    """
+    if not raw_value:
+        return None
+    first_value = raw_value.split(" X ")[0].split(", ")[0]
+    parsed = parse_quantity(first_value)
+    if parsed is None:
+        return None
+    number, unit = parsed
+    conversion = unit_conversions.get(prop)
+    if conversion is None:
+        # counted properties (conductors, pins, pole, hole, ...)
+        return number
+    factor = conversion[1].get(unit)
+    return number * factor if factor is not None else None
+
+def normalize_quantities(prop, raw_value):
+    """
+    Every value of a measured property, in its canonical unit (see normalize_quantity),
+    e.g. ("length", "100MM X 4FT") -> [100.0, 1219.2]; values that cannot be converted are None
+    """
+    if not raw_value:
+        return []
+    return [normalize_quantity(prop, a_value) for a_part in raw_value.split(", ") for a_value in a_part.split(" X ")]
+
+def is_xlsx(file_path):
+    return file_path.lower().endswith(('.xlsx', '.xlsm'))
+
+def cell_text(value):
+    """
+    Converts an Excel cell value to the text a CSV export would contain
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+class CsvRowReader:
+    """
+    Reads rows of a CSV file as dicts (csv.DictReader), exposing fieldnames
+    """
+    def __init__(self, file_path, encoding='utf-8'):
+        self.file = open(file_path, 'r', encoding=encoding)
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.reader = csv.DictReader(self.file)
+        self.fieldnames = self.reader.fieldnames
+
+    def __iter__(self):
+        return iter(self.reader)
+
+    def progress(self):
+        """
+        Share of the file read so far (by bytes, ahead of the rows by the read buffer at most)
+        """
+        return self.file.buffer.tell() / self.size if self.size else 1.0
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class XlsxRowReader:
+    """
+    Streams rows of an .xlsx sheet as dicts (first row = header), like csv.DictReader
+    Uses openpyxl's read-only mode, so memory does not grow with the number of rows
+    """
+    def __init__(self, file_path, sheet_name=None):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportError("openpyxl is required to read .xlsx files (pip install openpyxl)")
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True)
+        sheet = self.workbook[sheet_name] if sheet_name is not None else self.workbook.active
+        self.max_row = sheet.max_row   # from the sheet dimensions, None if the file does not record them
+        self.rows_read = 0
+        self.values = sheet.iter_rows(values_only=True)
+        header = next(self.values, ())
+        # drop trailing empty header cells
+        while header and header[-1] is None:
+            header = header[:-1]
+        self.fieldnames = [cell_text(value) for value in header]
+
+    def __iter__(self):
+        width = len(self.fieldnames)
+        for values in self.values:
+            self.rows_read += 1
+            if all(value is None for value in values):
+                continue
+            texts = [cell_text(value) for value in values[:width]]
+            texts.extend([''] * (width - len(texts)))
+            yield dict(zip(self.fieldnames, texts))
+
+    def progress(self):
+        """
+        Share of the sheet rows read so far, None if the sheet size is unknown
+        """
+        return min(1.0, (self.rows_read + 1) / self.max_row) if self.max_row else None
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CsvRowWriter:
+    """
+    Writes dict rows to a CSV file (csv.DictWriter); row keys outside fieldnames are left out (selected columns)
+    With resume_position, the existing file is truncated to that many bytes and the rows are appended after them
+    """
+    def __init__(self, file_path, fieldnames, encoding='utf-8', resume_position=None):
+        if resume_position is not None:
+            os.truncate(file_path, resume_position)
+        self.file = open(file_path, 'w' if resume_position is None else 'a', newline='', encoding=encoding)
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction='ignore')
+
+    def writeheader(self):
+        self.writer.writeheader()
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+
+    def sync(self):
+        """
+        Flushes the rows written so far to disk, returns the file size
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class XlsxRowWriter:
+    """
+    Writes dict rows to an .xlsx sheet with openpyxl's write-only (streaming) workbook,
+    so memory does not grow with the number of rows
+    """
+    def __init__(self, file_path, fieldnames, sheet_name='extracted'):
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        except ImportError:
+            raise ImportError("openpyxl is required to write .xlsx files (pip install openpyxl)")
+        self.file_path = file_path
+        self.fieldnames = fieldnames
+        self.illegal_characters = ILLEGAL_CHARACTERS_RE
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_name)
+
+    def writeheader(self):
+        self.sheet.append(self.fieldnames)
+
+    def writerow(self, row):
+        values = []
+        for a_field in self.fieldnames:
+            value = row.get(a_field)
+            values.append(self.illegal_characters.sub('', value) if isinstance(value, str) else value)
+        self.sheet.append(values)
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.file_path)
+            self.workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ParquetRowWriter:
+    """
+    Writes dict rows to a typed Parquet file: every output column as text, plus one list of floats column per measured
+    property (units_others, diameter and thickness): each of its values normalized to the canonical unit, in order,
+    e.g. "length_mm" = [100.0, 1219.2] for "100MM X 4FT" (null for an empty cell, None for a value that cannot be converted)
+    Rows are buffered and written as row groups of row_group_size rows, so memory stays flat
+    """
+    def __init__(self, file_path, fieldnames, row_group_size=50000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to write .parquet files (pip install pyarrow)")
+        self.pa = pa
+        self.fieldnames = list(dict.fromkeys(fieldnames))   # Parquet column names must be unique
+        self.value_columns = [(prop, value_column_name(prop)) for prop in units_others_list + ['diameter', 'thickness'] if prop in self.fieldnames]
+        self.schema = pa.schema([pa.field(a_field, pa.string()) for a_field in self.fieldnames] +
+                                [pa.field(a_column, pa.list_(pa.float64())) for prop, a_column in self.value_columns])
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(file_path, self.schema)
+        self.buffer = {a_column: [] for a_column in self.schema.names}
+        self.buffered = 0
+
+    def writeheader(self):
+        pass
+
+    def writerow(self, row):
+        for a_field in self.fieldnames:
+            value = row.get(a_field)
+            self.buffer[a_field].append(None if value is None else str(value))
+        for prop, a_column in self.value_columns:
+            self.buffer[a_column].append(normalize_quantities(prop, row.get(prop)) or None)
+        self.buffered += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            self.writer.write_table(self.pa.table(self.buffer, schema=self.schema))
+            self.buffer = {a_column: [] for a_column in self.schema.names}
+            self.buffered = 0
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def detect_encoding(file_path, encodings=None):
+    """
+    Returns the first of encodings (default: input_encodings) that decodes the whole file
+    The file is decoded in chunks, so memory does not grow with the file size; .xlsx files are always 'utf-8'
+    """
+    if encodings is None:
+        encodings = input_encodings
+    if is_xlsx(file_path):
+        return 'utf-8'
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(file_path, 'rb') as input_file:
+                for chunk in iter(lambda: input_file.read(1 << 20), b''):
+                    decoder.decode(chunk)
+                decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    # ! none decodes the file: the last one is used (latin-1 decodes any byte anyway)
+    return encodings[-1]
+
+def open_reader(file_path, sheet_name=None, encoding='utf-8'):
+    """
+    Returns a row reader (fieldnames + dict rows) for a .csv or .xlsx file
+    """
+    if is_xlsx(file_path):
+        return XlsxRowReader(file_path, sheet_name)
+    return CsvRowReader(file_path, encoding)
+
+def open_writer(file_path, fieldnames, resume_position=None):
+    """
+    Returns a row writer (writeheader/writerow) for a .csv, .xlsx or .parquet (typed) file
+    resume_position (.csv only): append to the file truncated to that many bytes (see CsvRowWriter)
+    """
+    if resume_position is not None:
+        if not file_path.lower().endswith('.csv'):
+            raise ValueError("Only .csv outputs can be resumed")
+        return CsvRowWriter(file_path, fieldnames, resume_position=resume_position)
+    if is_xlsx(file_path):
+        return XlsxRowWriter(file_path, fieldnames)
+    if file_path.lower().endswith('.parquet'):
+        return ParquetRowWriter(file_path, fieldnames)
+    return CsvRowWriter(file_path, fieldnames)
+
+
+_default_extractor = None
+
+def get_extractor(engine=None):
+    """
+    Returns the shared extractor (built from the constants below on first use, with the row watchdog settings)
+    engine ("regex" or "stream", see extraction_engines) switches the shared extractor; by default the current one is kept
+    (or extraction_engine is used on first use)
+    The shared extractor is also rebuilt when fuzzy_keywords changed since it was built
+    """
+    global _default_extractor
+    if engine is None:
+        engine = extraction_engine if _default_extractor is None else _default_extractor.engine_name
+    if _default_extractor is None or _default_extractor.engine_name != engine or _default_extractor.fuzzy_thresholds != fuzzy_keywords:
+        watchdog_settings = (row_time_budget, row_token_limit, slow_rows_log_path, row_budget_fallback)
+        if _default_extractor is not None and _default_extractor.watchdog is not None:
+            watchdog_settings = _default_extractor.watchdog.settings()
+            _default_extractor.watchdog.close()
+        _default_extractor = extraction_engines[engine](automaton_path=vocabulary_automaton_path)
+        set_watchdog(_default_extractor, *watchdog_settings)
+    return _default_extractor
+
+def parse_fuzzy_keywords(values):
+    """
+    {category: threshold} of "category=threshold" values (see fuzzy_keywords)
+    """
+    thresholds = {}
+    for a_value in values:
+        a_categ, separator, threshold = a_value.partition("=")
+        try:
+            thresholds[a_categ.strip()] = float(threshold)
+        except ValueError:
+            raise ValueError(f"expected CATEGORY=THRESHOLD, got {a_value!r}") from None
+        if not separator or not 0 < thresholds[a_categ.strip()] <= 1:
+            raise ValueError(f"expected CATEGORY=THRESHOLD (threshold in (0, 1]), got {a_value!r}")
+    unknown = set(thresholds) - set(keywords_known)
+    if unknown:
+        raise ValueError(f"unknown keyword categories {sorted(unknown)} (categories: {', '.join(keywords_known)})")
+    return thresholds
+
+def set_fuzzy_keywords(thresholds):
+    """
+    Sets fuzzy_keywords ({category: threshold}): the shared extractor is rebuilt with them on its next use (see get_extractor)
+    """
+    global fuzzy_keywords
+    fuzzy_keywords = dict(thresholds)
+
+def _init_worker(engine, watchdog_settings, columns=None):
+    """
+    Worker initializer: the worker's extractor, with the main process' watchdog settings and column plan
+    (slow rows are sent back to the main process, which logs them)
+    """
+    extractor = get_extractor(engine)
+    extractor.select_columns(columns)
+    if watchdog_settings is None:
+        set_watchdog(extractor)
+    else:
+        set_watchdog(extractor, watchdog_settings[0], watchdog_settings[1], fallback=watchdog_settings[3], collect=True)
+
+def extract_properties(input_text):
     """
-    Extracts the colors based on common values found in the string
+    Extract all extractable properties, which follow the following format in the description:
+        <property> <value>
     """
-    basic_colors = ["red", "orange", "yellow", "green", "blue", "indigo", "violet", "white", "black", "gray", "brown", "pink", "grey"]
+    return get_extractor().extract_properties(input_text)
 
-    # Remove leading and trailing whitespaces and convert to lowercase for case-insensitive matching
-    normalized_input = input_string.strip().lower()
+def extract_diameter(description):
+    """
+    Extracts the diameter from the description, based on the keyword "DIA"
+    Note: references the units_dia list (update accordingly!)
+    """
+    return get_extractor().extract_diameter(description)
 
-    # Construct a regular expression pattern for color matching
-    pattern = re.compile(r'\b(?:light |dark )?(' + '|'.join(basic_colors) + r')\b')
+def extract_thickness(description):
+    """
+    Extracts the THICKNESS from the description, based on the keyword "THK"
+    Note: references the units_dia list (update accordingly!)
+    """
+    return get_extractor().extract_thickness(description)
 
-    # Search for the color pattern in the input string
-    match = pattern.search(normalized_input)
+def extract_units(input_string):
+    return get_extractor().extract_units(input_string)
 
-    if match:
-        input_string = re.sub(match.group(0), '', input_string, 1, flags=re.IGNORECASE)
-        return match.group(0), input_string
-    else:
-        return None, input_string
+def extract_color_name(input_string):
+    """
+    Extracts the colors based on common values found in the string
+    """
+    return get_extractor().extract_color_name(input_string)
 
 def extract_wire_type(input_string):
     """
     Extracts types of wires (e.g. THHN, THW-2, etc.)
     Update the wire_types list
     """
-    wire_types_pattern = re.compile(r'\b(?:' + '|'.join(sorted(wire_types,reverse=True)) + r')\b', re.IGNORECASE)
-    matches = wire_types_pattern.findall(input_string)
-    for match in matches:
-        # all_matches.append(match)
-        input_string = re.sub(match, '', input_string, 1, flags=re.IGNORECASE)
-            
-    return matches, input_string.strip().strip(punctuation)
+    return get_extractor().extract_wire_type(input_string)
 
 def extract_keywords(input_string):
     """
@@ -207,21 +2108,7 @@ def extract_keywords(input_string):
     (ex. brands: Panasonic, Phelps Dodge)
     Update the dictionary of lists keywords_known
     """
-    
-    for a_categ in keywords_known.keys():   # by the category, e.g. brand
-        keywords_pattern = re.compile(r'\b(?:' + '|'.join(keywords_known[a_categ]) + r')\b', re.IGNORECASE)
-        matches = keywords_pattern.findall(input_string)
-        for match in matches:
-            # all_matches.append(match)
-            input_string = re.sub(match, '', input_string, 1, flags=re.IGNORECASE)
-            
-            # all_matches.append(match)
-            prop = keywords_known_map.get(match.lower())
-            if prop:
-                input_string = re.sub(match, '', input_string, 1, flags=re.IGNORECASE)
-            
-    # TODO: double-check that variable "matches" is accurate (may return ALL but is not consistent with if prop: above)
-    return matches, input_string.strip().strip(punctuation)
+    return get_extractor().extract_keywords(input_string)
 
 # Define a function to extract "type", "with_property", and clean the "info" column accordingly
 def extract_with(input_string):
@@ -264,6 +2151,64 @@ def extract_with(input_string):
 # ? Modified for personal assignment
 input_file_path = 'masterlist_03-30/masterlist_clean_raw_0331.csv' 
 output_file_path = 'masterlist_03-30/masterlist_clean_extracted_0331.csv'
+# ? .csv inputs are read with the first of these encodings that decodes the whole file
+input_encodings = ('utf-8', 'latin-1')
+# ? .xlsx input/output is read/written directly (streaming); input_sheet_name = None reads the active sheet
+input_sheet_name = None
+# ? number of worker processes (1 = serial); rows are sent to workers in batches of batch_size
+num_workers = 1
+# ? extraction engine: "regex" (one re.sub pass per stage) or "stream" (single pass over the description, see StreamExtractor)
+extraction_engine = "regex"
+# ? vocabulary tries (units, wire types, keywords) are saved here and loaded on the next start (rebuilt if the vocabulary changed)
+vocabulary_automaton_path = None    # e.g. 'masterlist_vocabulary.json'
+# ? per Item Category (case-insensitive) settings: "skip" lists the stages not run for that category
+#   stages: properties, diameter, thickness, units, color, wire type, keywords
+category_settings = {
+    # "PIPE": {"skip": ["wire type"]},
+}
+batch_size = 1000
+# ? repeated descriptions are cached (cache_size entries, 0 = off); set cache_path to keep the cache between runs
+cache_size = 100000
+cache_path = None   # e.g. 'masterlist_cache.sqlite'
+# ? incremental mode: copy unchanged rows from the previous snapshot's output (None = full run)
+# ? the previous input is only needed if the previous output has no .manifest.json next to it
+previous_output_file_path = None    # e.g. 'masterlist_03-08/masterlist_extracted_0308_csv.csv'
+previous_input_file_path = None     # e.g. 'masterlist_03-08/masterlist_orig_0308_csv.csv'
+# ? manifest: row fingerprints written next to the output, for the next incremental run (always on in incremental mode)
+write_manifest_file = False
+# ? per-stage profiling: set a path to get a timing report per extraction stage (None = off)
+profile_report_path = None     # e.g. 'masterlist_03-30/profile_report.json'
+# ? row watchdog: rows still extracting after row_time_budget seconds are logged (stderr, and slow_rows_log_path
+#   as JSON lines); None = off. row_budget_fallback re-extracts them with the bounded stream engine instead: which
+#   engine a row gets then depends on the machine's load (output not reproducible, keep it off with cache/resume)
+#   rows longer than row_token_limit tokens always go to the stream engine (None = off): that bounds the regex
+#   engine's backtracking on pathological rows, whatever the load, and the stream engine gives the same results
+row_time_budget = 0.2
+row_budget_fallback = False
+row_token_limit = 64
+slow_rows_log_path = None   # e.g. 'masterlist_03-30/slow_rows.jsonl'
+# ? live metrics of long runs: a progress line on stderr every progress_interval seconds (0 = off), and the metrics
+#   in the Prometheus text format in metrics_path (None = off), rewritten every metrics_interval seconds
+progress_interval = 10
+metrics_path = None     # e.g. 'masterlist_03-30/metrics.prom'
+metrics_interval = 10
+# ? output columns: None writes every column; a subset (e.g. ["Item Description", "diameter", "P/N"]) is written in
+#   that order, and the extraction stages none of them depend on are skipped (see ColumnPlan)
+selected_columns = None
+# ? checkpoints (.csv output): every checkpoint_rows rows (sharded mode: every shard) the output is flushed to disk and
+#   the progress saved next to it (<output>.checkpoint.json), so --resume continues an interrupted run (0 = off;
+#   a resumed run keeps the interval of the interrupted one). The checkpoint is removed once the run completes
+checkpoint_rows = 0
+# ? sharded mode (large .csv inputs): the input is memory-mapped and split into byte ranges of about input_shard_size
+#   bytes on record boundaries; every worker parses and extracts its own ranges (None = off, e.g. 64 * 1024 * 1024)
+input_shard_size = None
+# every shard boundary is checked with csv; the record ending there is looked for among this many lines before it
+# (a file with a boundary that does not hold is read serially)
+shard_boundary_lines = 64
+# ? batch mode (--batch): every .csv/.xlsx file of a directory (or matching a glob) is written to the output directory
+#   as <name><batch_output_suffix><ext>, with a manifest of per-file row counts, timings and extraction rates
+batch_output_suffix = '_extracted'
+batch_manifest_name = 'batch_manifest.json'
 # categ_assigned = ['CON14', 'CON17', 'CON26', 'CON35', 'FWK18', 'FWK30', 'FWK31', 'LFO12', 'SPR11', 'SPR32', 'SPR44', 'SPR49', 'SPR53', 'SPR61', 'SPR65', 'SUP13', 'SUP17']
 
 
@@ -367,141 +2312,142 @@ keywords_known_map = {a_value.lower(): a_categ for a_categ in keywords_known.key
 unit_property_map = {unit: unit_info["prop"] for unit_info in units_others for unit in sorted(unit_info["unit"],reverse=True)}
 # note: sorted the units in reverse to prioritize longer units
 units_others_list = [a_prop["prop"] for a_prop in units_others]
-print(units_others_list)
+
+# ? fuzzy keyword matching: keyword categories (of keywords_known) also matched when misspelled or written differently
+#   (e.g. PANASONIK, Phelps-Dodge), with their similarity threshold (0-1); their confidence goes to "<category> confidence"
+#   off by default ({}), e.g. {"brand": 0.85} (command line: --fuzzy brand=0.85)
+fuzzy_keywords = {}
+
+new_columns = ['info', 'color', 'configuration','style','size','diameter', 'thickness','wire type']  # ! add 'dimensions' when extraction fixed
+
+# canonical unit of every measured property, and the factor converting each unit to it (typed Parquet output)
+# note: units missing here (e.g. "kg/m", "lbs/ft", "rad/s") are kept as raw text only
+# note: "mf" is taken as microfarad (MFD), as written on capacitor labels
+length_conversion = ("mm", {"mm": 1, "millimetre": 1, "cm": 10, "m": 1000, "meters": 1000, "mtr": 1000, "mtrs": 1000,
+                            "in": 25.4, "inch": 25.4, "inches": 25.4, "ft": 304.8, "ft.": 304.8, "feet": 304.8})
+count_conversion = ("count", {})
+unit_conversions = {
+    "weight": ("kg", {"kg": 1, "kgs": 1, "kilo": 1, "kilos": 1, "g": 0.001, "gram": 0.001, "grams": 0.001, "ton": 1000, "tons": 1000,
+                      "lb": 0.45359237, "lb.": 0.45359237, "lbs": 0.45359237, "lbs.": 0.45359237}),
+    "cross-sectional area": ("mm2", {"mm sq": 1, "mm sq.": 1}),
+    "volume": ("l", {"ml": 0.001, "litre": 1, "liter": 1, "liters": 1, "litres": 1, "cu. ft.": 28.316846592}),
+    "length": length_conversion,
+    "diameter": length_conversion,
+    "thickness": length_conversion,
+    "current": ("a", {"a": 1, "amp": 1, "amps": 1, "ampere": 1}),
+    "voltage rating": ("v", {"v": 1, "kv": 1000, "vdc": 1, "vac": 1, "v vdc": 1, "v vac": 1}),
+    "power rating": ("w", {"w": 1, "watt": 1, "watts": 1}),
+    "apparent power rating": ("va", {"va": 1, "kva": 1000}),
+    "horsepower": ("hp", {"hp": 1}),
+    "angle": ("deg", {"deg": 1, "degrees": 1, "degree": 1}),
+    "frequency": ("hz", {"hz": 1, "hertz": 1}),
+    "color temperature": ("k", {"k": 1}),
+    "capacitance": ("uf", {"f": 1e6, "mf": 1, "uf": 1, "pf": 1e-6}),
+    "inductance": ("mh", {"h": 1000, "mh": 1, "uh": 0.001, "ph": 1e-9}),
+    "force": ("kn", {"kn": 1}),
+    "speed": ("rpm", {"rpm": 1}),
+}
 
 
 # =============================
 #      PROGRAM BEGINS HERE
 # =============================
 
-# ? encoding: utf-8 or latin-1
-with open(input_file_path, 'r', encoding='utf-8') as input_file, open(output_file_path, 'w', newline='', encoding='utf-8') as output_file:    
-    # Create CSV reader and writer objects
-    csv_reader = csv.DictReader(input_file)
-    new_columns = ['info', 'color', 'configuration','style','size','diameter', 'thickness','wire type']  # ! add 'dimensions' when extraction fixed
+def normalize_description(description):
+    """
+    Cleans up the raw Item Description (separator punctuation replaced with spaces)
+    The result is what the extraction chain sees, so it is also used as the cache key
+    """
+    # ? temporary comment: if description 2 already contains the keyword from Description column, splice! 
+    # if(row["Item Category"].lower() in row["Description"].strip().lower()):
+    #     total_descr = row["Description"].replace(row["Item Category"],"",1).strip().strip(punctuation)
+    # else:
+    #     total_descr = row["Description"]
+    # TODO: fetch data from Item Category or Description, wherever needed
+    # total_descr = row["Item Category"].strip().strip(punctuation)
+    total_descr = description.strip().strip(punctuation)
+    # total_descr = row["Description"].strip().strip(punctuation)
+    
+    # replace all colons AND commas AND semicolons AND periods with spaces
+    total_descr = total_descr.replace(": "," ")
+    total_descr = total_descr.replace(","," ")
+    total_descr = total_descr.replace(". "," ")
+    total_descr = total_descr.replace(";"," ")
+    total_descr = total_descr.replace("("," ")
+    total_descr = total_descr.replace(")"," ")
+    return total_descr
+
+def extract_fields(category, total_descr, extractor=None, profiler=None):
+    """
+    Runs the whole extraction chain on a normalized description (see DescriptionExtractor.extract_fields)
+    """
+    if extractor is None:
+        extractor = get_extractor()
+    if extractor.watchdog is not None:
+        return extractor.watchdog.extract_fields(extractor, category, total_descr, profiler)
+    return extractor.extract_fields(category, total_descr, profiler)
+
+def apply_fields(row, fields, extractor=None):
+    """
+    Writes an extracted field set into the row (appending to values already in the row),
+    then assembles the configuration, size, style/info and extracted columns
+    Returns the same row, ready to be written by the csv.DictWriter
+    """
+    if extractor is None:
+        extractor = get_extractor()
+
+    for prop, value in fields["properties"]:
+        # row[prop] = value
+        try:
+            if(row[prop] is not None or row[prop]!=''):
+                row[prop] += ", " + value
+        except KeyError:
+            row[prop] = value
     
-    # TODO 03-08-2024: add 3 columns
+    if fields["diameter"] is not None:
+        row["diameter"] = fields["diameter"]
     
-    # csv_columns = csv_reader.fieldnames[:csv_reader.fieldnames.index('Description') + 1] + new_columns + all_properties + csv_reader.fieldnames[csv_reader.fieldnames.index('Description') + 1:]
-    csv_columns = ['extracted'] + csv_reader.fieldnames + new_columns + all_properties + units_others_list
-    csv_writer = csv.DictWriter(output_file, fieldnames=csv_columns)
+    if fields["thickness"] is not None:
+        row["thickness"] = fields["thickness"]
     
-    # Write the header to the output file
-    csv_writer.writeheader()
-
-    count = 0
-    # Iterate through each row and update 'fresh' column
-    for row in csv_reader:
-        # if count > 10:
-        #     break
-        # count+=1
-        # ! Important: check if assigned row is active, otherwise skip
-        # if row["Product Group Code"] not in categ_assigned:
-        #     continue
-        # ? temporary comment: if description 2 already contains the keyword from Description column, splice! 
-        # if(row["Item Category"].lower() in row["Description"].strip().lower()):
-        #     total_descr = row["Description"].replace(row["Item Category"],"",1).strip().strip(punctuation)
-        # else:
-        #     total_descr = row["Description"]
-        # TODO: fetch data from Item Category or Description, wherever needed
-        # total_descr = row["Item Category"].strip().strip(punctuation)
-        total_descr = row["Item Description"].strip().strip(punctuation)
-        # total_descr = row["Description"].strip().strip(punctuation)
-        
-        # replace all colons AND commas AND semicolons AND periods with spaces
-        total_descr = total_descr.replace(": "," ")
-        total_descr = total_descr.replace(","," ")
-        total_descr = total_descr.replace(". "," ")
-        total_descr = total_descr.replace(";"," ")
-        total_descr = total_descr.replace("("," ")
-        total_descr = total_descr.replace(")"," ")
-        
-        # ! additional: extract the ITEM CATEGORY NAME from the DESCRIPTION, if applicable
-        # ! MOVED (from after extraction... to start of with-loop)
-        # if row['Item Category'] in total_descr:
-        #     total_descr = re.sub(rf'\b{}')
-        #     # total_descr = total_descr.replace(f"{row['Item Category']}"," ")
-        # else:
-        #     # try second option: split the item category word per word, and splice each word
-        total_descr_list = [e for e in row['Item Category'].split(" ") if e not in ('',None)]
-        for a_word in total_descr_list:
-            total_descr = re.sub(rf'\b{re.escape(a_word)}\b', '', total_descr, flags=re.IGNORECASE).strip()
-            # total_descr = total_descr.replace(a_word," ")
-        
-        # remove extra spaces at ends and in middle
-        total_descr = total_descr.strip().strip(punctuation)
-        # total_descr_list = [e for e in total_descr.split(" ") if e not in ('',None)]
-        # total_descr = " ".join(total_descr_list)
-        
-        
-        # ! extract the properties
-        result_properties, total_descr = extract_properties(total_descr)
-        for prop, value in result_properties.items():
-            # row[prop] = value
-            try:
-                if(row[prop] is not None or row[prop]!=''):
+    for prop, value in fields["units"]:
+        # check if there already is a property, so we just append the value
+        try:
+            if(row[prop] is not None or row[prop]!=''):
+                if(prop=='length'):
+                    row[prop] += " X " + value
+                else:
                     row[prop] += ", " + value
-            except KeyError:
-                row[prop] = value
-        
-        # ! extracting the diameter
-        result_dia, total_descr = extract_diameter(total_descr)
-        if result_dia is not None:
-            row["diameter"] = result_dia
-        
-        # ! extracting the thickness
-        result_thk, total_descr = extract_thickness(total_descr)
-        if result_thk is not None:
-            row["thickness"] = result_thk
-        
-        # ! extracting the units
-        # TODO: double check function; may accidentally truncate extra text?
-        result_units, total_descr = extract_units(total_descr)
-        # print(result_units)
-        if result_units is not None:
-            # print("found some")
-            for match in result_units:
-                unit = match[1]
-                prop = unit_property_map.get(unit.lower())
-                # print("prop:",prop,"and match:",match[0])
-                if prop:
-                    # check if there already is a property, so we just append the value
-                    try:
-                        if(row[prop] is not None or row[prop]!=''):
-                            if(prop=='length'):
-                                row[prop] += " X " + match[0]
-                            else:
-                                row[prop] += ", " + match[0]
-                    except KeyError:
-                        row[prop] = match[0]
-        
-        # ! extracting the color
-        result_color, total_descr = extract_color_name(total_descr)
-        if result_color is not None:
-            row["color"] = result_color
-        
-        # ! extracting the wire type
-        result_wire_type, total_descr = extract_wire_type(total_descr)
-        if result_wire_type is not None:
-            row["wire type"] = ", ".join(result_wire_type)
-        
-        # ! extracting keywords (e.g. brands)
-        result_keywords, total_descr = extract_keywords(total_descr)
-        if result_keywords is not None:
-            for match in result_keywords:
-                prop = keywords_known_map.get(match.lower())
-                # print("Hit a match,",prop)
-                if prop:
-                    # check if there already is a property, so we just append the value
-                    try:
-                        if(row[prop] is not None or row[prop]!=''):
-                            row[prop] += ", " + match
-                    except KeyError:
-                        row[prop] = match
-        
+        except KeyError:
+            row[prop] = value
+    
+    if fields["color"] is not None:
+        row["color"] = fields["color"]
+    
+    row["wire type"] = ", ".join(fields["wire type"])
+    
+    for prop, match in fields["keywords"]:
+        # check if there already is a property, so we just append the value
+        try:
+            if(row[prop] is not None or row[prop]!=''):
+                row[prop] += ", " + match
+        except KeyError:
+            row[prop] = match
+
+    # match confidence of the fuzzy matched keyword categories (one value per keyword, same order)
+    for prop, confidence in fields.get("keyword confidence", ()):
+        a_column = confidence_column_name(prop)
+        if row.get(a_column):
+            row[a_column] += ", " + confidence
+        else:
+            row[a_column] = confidence
+    
+    # ! column plan (select_columns): only the assembled columns it selects are built
+    assemble = extractor.column_plan.assemble if extractor.column_plan is not None else None
+    if assemble is None or "configuration" in assemble or "info" in assemble:
         # TODO: extract all properties and combine cells!
         # configuration_props = ['current', 'voltage rating', 'power rating', 'apparent power rating', 'horsepower', 'angle', 'frequency', 'color temperature', 'capacitance', 'inductance', 'conductors', 'pins', 'phase', 'pole','hole','force','gang','grade','no.']
-        configuration_props = [a_prop for a_prop in units_others_list if a_prop not in ("weight","volume","length")]
+        configuration_props = [a_prop for a_prop in extractor.units_others_list if a_prop not in ("weight","volume","length")]
         configuration_props.extend(['grade','no.','gauge'])
         configuration_values = []
         for a_prop in configuration_props:
@@ -519,33 +2465,27 @@ with open(input_file_path, 'r', encoding='utf-8') as input_file, open(output_fil
                     configuration_values.append(row[a_prop])
             except:
                 pass
-        
-        
+    
+    
         # ! additional: extract remaining words from the description which have a numerical value
-        total_descr_list = [e for e in total_descr.split(" ") if e not in ('',None)]
-        # print("total_descr_list")
-        # print(total_descr_list)
-        # total_descr_config = [a_word for a_word in total_descr_list if any(a_char.isdigit() for a_char in a_word)]
+        total_descr_list = [e for e in fields["info"].split(" ") if e not in ('',None)]
         for a_word in total_descr_list.copy():  # important to reference the copy of the list, not the list itself!
-            # print([a_char.isdigit() for a_char in a_word])
             if any([a_char.isdigit() for a_char in a_word]):
                 configuration_values.append(a_word)
                 total_descr_list.remove(a_word)
-        
-        # print("config_values")
-        # print(configuration_values)
-        
+    
         # combine all configuration values to one tab
         row['configuration'] = " ".join(configuration_values)
         # revert total_descr
         total_descr = " ".join(total_descr_list)
         # row['configuration'] = ['weight', 'cross-sectional area', 'length', 'current', 'voltage rating', 'power rating', 'apparent power rating', 'horsepower', 'angle', 'frequency', 'color temperature', 'capacitance', 'inductance', 'conductors', 'pins', 'phase', 'pole']
 
+    if assemble is None or "size" in assemble:
         size_props = ['weight','length','diameter','thickness']
         size_values = []
         for a_prop in size_props:
             try:
-                
+            
                 if (a_prop=='diameter'):
                     size_values.append(row[a_prop] + " DIA")
                 elif (a_prop=='thickness'):
@@ -554,13 +2494,10 @@ with open(input_file_path, 'r', encoding='utf-8') as input_file, open(output_fil
                     size_values.append(row[a_prop])
             except:
                 pass
-            
-        row['size'] = " X ".join(size_values)
-        
-        # ---------------------
-        # ---------------------
-        # ---------------------
         
+        row['size'] = " X ".join(size_values)
+
+    if assemble is None or "info" in assemble:
         # paste the remaining text under info
         row["style"] = total_descr
         row["info"] = total_descr
@@ -569,13 +2506,960 @@ with open(input_file_path, 'r', encoding='utf-8') as input_file, open(output_fil
             row["extracted"] = "Y"
         else:
             row["extracted"] = ""
-        # finally, write the row in CSV
-        
-        csv_writer.writerow(row)
 
-    
+    return row
+
+def process_row(row, extractor=None, cache=None, profiler=None):
+    """
+    Extracts all fields of a single masterlist row (csv.DictReader row), updating it in place
+    With a cache (ExtractionCache), repeated (Item Category, description) pairs skip the extraction chain
+    With a profiler (StageProfiler), every stage is timed
+    Returns the same row, ready to be written by the csv.DictWriter
+    """
+    if extractor is None:
+        extractor = get_extractor()
+
+    # ! Important: check if assigned row is active, otherwise skip
+    # if row["Product Group Code"] not in categ_assigned:
+    #     continue
+    total_descr = normalize_description(row["Item Description"])
+    key = (row["Item Category"], total_descr)
+    fields = None
+    if cache is not None:
+        if profiler is not None:
+            profiler.start()
+        fields = cache.get(key)
+        if profiler is not None:
+            profiler.lap("cache", fields is not None)
+    if fields is None:
+        fields = extract_fields(row["Item Category"], total_descr, extractor, profiler)
+        if cache is not None:
+            cache.put(key, fields)
+    return _apply_fields_profiled(row, fields, extractor, profiler)
+
+def _apply_fields_profiled(row, fields, extractor, profiler):
+    if profiler is None:
+        return apply_fields(row, fields, extractor)
+    profiler.start()
+    apply_fields(row, fields, extractor)
+    profiler.lap("assembly", row["configuration"] or row["size"])
+    return row
+
+def _process_batch(rows, profile=False):
+    """
+    Worker task: extracts a batch of rows using the worker's own compiled vocabulary
+    Returns (row, field set) pairs, so the main process can fill its cache,
+    the worker's stage stats (None unless profiling), its category plan (hits, misses) and its slow rows for the batch
+    """
+    extractor = get_extractor()
+    profiler = StageProfiler() if profile else None
+    plan_counts = (extractor.plan_hits, extractor.plan_misses)
+    results = []
+    for row in rows:
+        fields = extract_fields(row["Item Category"], normalize_description(row["Item Description"]), extractor, profiler)
+        results.append((_apply_fields_profiled(row, fields, extractor, profiler), fields))
+    plan_counts = (extractor.plan_hits - plan_counts[0], extractor.plan_misses - plan_counts[1])
+    slow_rows = extractor.watchdog.take() if extractor.watchdog is not None else None
+    return results, (profiler.stats if profiler is not None else None), plan_counts, slow_rows
+
+def iter_batches(rows, batch_size):
+    """
+    Groups an iterable of rows into lists of at most batch_size rows
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+_in_flight = object()    # cached_fields marker of a row waiting for the extraction of an earlier row (see process_rows)
+
+def _collect_batch(entry, extractor, cache, profiler, in_flight=None):
+    """
+    Yields the rows of a submitted batch in order, merging cached rows with the worker results
+    in_flight: key -> [fields, rows waiting] of the keys sent to a worker, shared with process_rows
+    """
+    batch, keys, cached_fields, result = entry
+    results, stage_stats, plan_counts, slow_rows = result.get()
+    if stage_stats is not None:
+        profiler.merge(stage_stats)
+    if slow_rows is not None and extractor.watchdog is not None:
+        extractor.watchdog.merge(slow_rows)
+    # the workers' category plans are counted with the ones of this process
+    extractor.plan_hits += plan_counts[0]
+    extractor.plan_misses += plan_counts[1]
+    if cache is None:
+        for row, fields in results:
+            yield row
+        return
+
+    worker_results = iter(results)
+    for row, key, fields in zip(batch, keys, cached_fields):
+        if fields is None:
+            row, fields = next(worker_results)
+            cache.put(key, fields)
+            waiting = in_flight[key]
+            if waiting[1]:
+                waiting[0] = fields
+            else:
+                del in_flight[key]
+            yield row
+        else:
+            if fields is _in_flight:
+                # the row extracting the key comes first in the output, so its fields are there by now
+                waiting = in_flight[key]
+                fields = waiting[0]
+                waiting[1] -= 1
+                if not waiting[1]:
+                    del in_flight[key]
+            yield _apply_fields_profiled(row, fields, extractor, profiler)
+
+def process_rows(rows, workers=1, batch_size=1000, cache=None, profiler=None):
+    """
+    Extracts every row and yields the results in the original row order
+    With workers > 1, batches of rows are sent to a process pool (each worker compiles its own vocabulary)
+    At most 2 batches per worker are in flight, so memory stays bounded on large files
+    The cache (if any) lives in this process: cached rows are filled in here, only the misses go to the workers,
+    each key once: a repeat of a key still being extracted (same batch or an earlier one) waits for its fields
+    and is counted as a cache hit, as it would be in a serial run
+    """
+    extractor = get_extractor()
+    if workers <= 1:
+        for row in rows:
+            yield process_row(row, extractor, cache, profiler)
+        return
+
+    import multiprocessing  # only needed in parallel mode (keeps the module import fast)
+    profile = profiler is not None
+    watchdog_settings = extractor.watchdog.settings() if extractor.watchdog is not None else None
+    columns = extractor.column_plan.columns if extractor.column_plan is not None else None
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(extractor.engine_name, watchdog_settings, columns)) as pool:
+        pending = deque()
+        in_flight = {}  # key -> [fields (once collected), rows waiting for them]
+        for batch in iter_batches(rows, batch_size):
+            if cache is None:
+                pending.append((None, None, None, pool.apply_async(_process_batch, (batch, profile))))
+            else:
+                keys = [(row["Item Category"], normalize_description(row["Item Description"])) for row in batch]
+                cached_fields = []
+                misses = []
+                for row, key in zip(batch, keys):
+                    if profile:
+                        profiler.start()
+                    waiting = in_flight.get(key)
+                    if waiting is not None:
+                        waiting[1] += 1
+                        cache.hits += 1
+                        fields = _in_flight
+                    else:
+                        fields = cache.get(key)
+                        if fields is None:
+                            in_flight[key] = [None, 0]
+                            misses.append(row)
+                    cached_fields.append(fields)
+                    if profile:
+                        profiler.lap("cache", fields is not None)
+                pending.append((batch, keys, cached_fields, pool.apply_async(_process_batch, (misses, profile))))
+            if len(pending) >= workers * 2:
+                yield from _collect_batch(pending.popleft(), extractor, cache, profiler, in_flight)
+        while pending:
+            yield from _collect_batch(pending.popleft(), extractor, cache, profiler, in_flight)
+
+def extracted_field_columns():
+    """
+    The output columns holding extracted values (new_columns without the leftover text, properties and units)
+    """
+    return [a_column for a_column in new_columns if a_column not in ('info', 'style')] + all_properties + units_others_list
+
+def confidence_column_name(prop):
+    return f"{prop} confidence"
+
+def keyword_confidence_columns(extractor=None):
+    """
+    The "<category> confidence" columns of the fuzzy matched keyword categories of extractor (default: the shared extractor)
+    """
+    if extractor is None:
+        extractor = get_extractor()
+    return [confidence_column_name(a_categ) for a_categ in extractor.fuzzy_thresholds]
+
+def output_columns(fieldnames, extractor=None):
+    """
+    Output column layout: extracted flag, source columns, new_columns, all_properties, units_others_list,
+    keyword_confidence_columns (of extractor, default: the shared extractor)
+    """
+    return ['extracted'] + list(fieldnames) + new_columns + all_properties + units_others_list + keyword_confidence_columns(extractor)
+
+def select_output_columns(fieldnames, columns=None, extractor=None):
+    """
+    Output column layout of a run: output_columns(fieldnames, extractor), or only columns (in the given order)
+    Raises ValueError for a column that is not an output column
+    """
+    all_columns = output_columns(fieldnames, extractor)
+    if columns is None:
+        return all_columns
+    unknown = [a_column for a_column in columns if a_column not in all_columns]
+    if unknown:
+        raise ValueError(f"Unknown output columns {unknown} (columns: {', '.join(dict.fromkeys(all_columns))})")
+    return list(dict.fromkeys(columns))
+
+def _as_row(record):
+    if isinstance(record, dict):
+        return dict(record)
+    description, category = record
+    return {"Item Category": category, "Item Description": description}
+
+def extract_many(records, workers=1, batch_size=1000, cache=None, profiler=None):
+    """
+    Library entry point: extracts an iterable of records and yields the extracted rows, in input order
+    Records are row dicts (with "Item Category" and "Item Description") or (description, category) pairs;
+    the input dicts are not modified
+    The vocabulary is compiled on first use and shared by every later call
+    """
+    return process_rows((_as_row(record) for record in records), workers=workers, batch_size=batch_size, cache=cache, profiler=profiler)
+
+def extract_description(description, category=""):
+    """
+    Extracts a single description (see extract_many), returns the extracted row
+    """
+    return process_row(_as_row((description, category)))
+
+def manifest_path_for(output_file_path):
+    """
+    The row fingerprint manifest is written next to the output file
+    """
+    return output_file_path + '.manifest.json'
+
+def checkpoint_path_for(output_file_path):
+    """
+    The checkpoint of a run (see RunCheckpoint) is written next to the output file
+    """
+    return output_file_path + '.checkpoint.json'
+
+def open_checkpoint(output_file_path, input_file_path, csv_columns, checkpoint_every=0, resume=False, **settings):
+    """
+    Returns the RunCheckpoint of a run (None if it keeps none) and the state to resume from (None = first row)
+    Checkpoints are kept for .csv outputs only; without resume, the checkpoint of an earlier run is removed
+    """
+    if not output_file_path.lower().endswith('.csv'):
+        if resume:
+            raise ValueError("Only .csv outputs can be resumed")
+        return None, None
+    if checkpoint_every <= 0 and not resume:
+        return None, None
+    checkpoint = RunCheckpoint(output_file_path, input_file_path, csv_columns, **settings)
+    if not resume:
+        checkpoint.remove()
+        return checkpoint, None
+    state = checkpoint.load()
+    if state is None:
+        print(f"No checkpoint at {checkpoint.path}: starting from the first row")
+    else:
+        print(f"Resuming from {checkpoint.path}: {state['rows']} rows already written")
+    return checkpoint, state
+
+def skip_rows(rows, count, fieldnames=None, fingerprints=None):
+    """
+    Skips the first count rows (written before a checkpoint), appending their fingerprints to fingerprints (if any)
+    Returns an iterator over the remaining rows
+    """
+    rows = iter(rows)
+    for row in islice(rows, count):
+        if fingerprints is not None:
+            fingerprints.append(row_fingerprint(row, fieldnames))
+    return rows
+
+def write_rows(rows, writer, metrics=None):
+    """
+    Writes every row with writer (and counts it in metrics, if any), returns the number of rows written
+    """
+    count = 0
+    if metrics is None:
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+            metrics.observe(row)
+    return count
+
+def row_fingerprint(row, fieldnames, extractor=None):
+    """
+    Fingerprint of the source columns of a row (before extraction) and of the vocabulary its Item Category uses
+    (see category_vocabulary_hash)
+    """
+    if extractor is None:
+        extractor = get_extractor()
+    source = [row.get(a_field) for a_field in fieldnames] + [extractor.category_vocabulary_hash(row.get("Item Category") or '')]
+    return hashlib.blake2b(json.dumps(source).encode('utf-8'), digest_size=16).hexdigest()
+
+def write_manifest(manifest_path, vocabulary_hash, csv_columns, fingerprints):
+    """
+    Records the vocabulary, the output columns and the fingerprint of every output row (in order)
+    """
+    with open(manifest_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump({"vocabulary_hash": vocabulary_hash, "columns": csv_columns, "fingerprints": fingerprints}, manifest_file)
+
+def load_previous_rows(previous_output_path, csv_columns, previous_input_path=None):
+    """
+    Returns {fingerprint: previous output row} for the rows of the previous snapshot that can be reused as-is
+    Fingerprints come from the manifest next to the previous output or, if there is none, from the previous input
+    (in that case the previous output is assumed to be extracted with the current vocabulary)
+    Nothing is reused if the output columns changed; after a vocabulary change, only the rows of the categories
+    not using the changed part are (their fingerprints still match, see row_fingerprint)
+    """
+    manifest_path = manifest_path_for(previous_output_path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["columns"] != csv_columns:
+            return {}
+        fingerprints = manifest["fingerprints"]
+    elif previous_input_path is not None:
+        with open_reader(previous_input_path, encoding=detect_encoding(previous_input_path)) as previous_input:
+            fingerprints = [row_fingerprint(row, previous_input.fieldnames) for row in previous_input]
+    else:
+        return {}
+
+    previous_rows = {}
+    with open_reader(previous_output_path) as previous_output:
+        if previous_output.fieldnames != csv_columns:
+            return {}
+        for fingerprint, row in zip(fingerprints, previous_output):
+            previous_rows[fingerprint] = row
+    return previous_rows
+
+def process_rows_incremental(rows, fieldnames, previous_rows, fingerprints, stats, **options):
+    """
+    Like process_rows, but rows whose fingerprint is in previous_rows are taken from the previous output
+    Only the changed rows go through process_rows; the output keeps the input row order
+    The fingerprint of every yielded row is appended to fingerprints (for the new manifest),
+    and stats counts the "reused" and "extracted" rows
+    """
+    queued = deque()    # (fingerprint, previous row or None) in input order
+
+    def changed_rows():
+        for row in rows:
+            fingerprint = row_fingerprint(row, fieldnames)
+            previous = previous_rows.get(fingerprint)
+            queued.append((fingerprint, previous))
+            if previous is None:
+                yield row
+
+    def reuse(fingerprint, previous):
+        fingerprints.append(fingerprint)
+        stats["reused"] += 1
+        return previous
+
+    for row in process_rows(changed_rows(), **options):
+        # emit the reused rows queued before this changed row
+        fingerprint, previous = queued.popleft()
+        while previous is not None:
+            yield reuse(fingerprint, previous)
+            fingerprint, previous = queued.popleft()
+        fingerprints.append(fingerprint)
+        stats["extracted"] += 1
+        yield row
+
+    for fingerprint, previous in queued:
+        yield reuse(fingerprint, previous)
+
+def open_metrics(input_file_path, metrics_file_path=None, progress_interval=0, progress=None, cache=None):
+    """
+    The RunMetrics of a run, None if there is neither a metrics file nor a progress line
+    """
+    if metrics_file_path is None and not progress_interval:
+        return None
+    return RunMetrics(os.path.basename(input_file_path), interval=progress_interval or metrics_interval, metrics_path=metrics_file_path,
+                      show_progress=bool(progress_interval), progress=progress, cache=cache, watchdog=get_extractor().watchdog)
+
+def run(input_file_path, output_file_path, workers=1, batch_size=1000, cache_size=100000, cache_path=None,
+        previous_output_path=None, previous_input_path=None, write_manifest_file=False, input_sheet_name=None,
+        profile_report_path=None, engine=None, watchdog_settings=None, metrics_file_path=None, progress_interval=0,
+        checkpoint_every=0, resume=False, columns=None):
+    """
+    Reads the input file, extracts every row and writes the output file (same row order for any number of workers)
+    Input and output can each be .csv or .xlsx (streamed, for constant memory); input_sheet_name picks the .xlsx sheet
+    A .parquet output is typed: measured properties also get a column of their values in their canonical unit
+    Repeated descriptions are served from an LRU cache of cache_size entries (0 disables it),
+    optionally persisted to the sqlite file cache_path
+    Incremental mode (previous_output_path): unchanged rows are copied from the previous snapshot's output,
+    only new/changed rows are extracted; a fingerprint manifest is written next to the output for the next run
+    Profiling (profile_report_path): per-stage timings are printed and saved as JSON at the end of the run
+    engine: "regex" or "stream" (default: extraction_engine)
+    watchdog_settings: (budget seconds, token limit, slow rows log path, fallback) of the RowWatchdog (default: row_time_budget,
+    row_token_limit, slow_rows_log_path and row_budget_fallback); its summary of slow rows per stage is printed at the end of the run
+    Live metrics (RunMetrics): every progress_interval seconds a progress line goes to stderr (0 = none),
+    and the metrics are written to metrics_file_path in the Prometheus text format (if given)
+    Checkpoints (RunCheckpoint, .csv output only): every checkpoint_every rows (0 = none) the progress is saved
+    next to the output; resume=True continues an interrupted run from its last checkpoint
+    columns: write only these output columns (in this order); the extraction stages and assembled columns they
+    cannot depend on are skipped (see ColumnPlan), the values are the same as in a full run
+    """
+    extractor = get_extractor(engine or extraction_engine)
+    if watchdog_settings is not None:
+        set_watchdog(extractor, *watchdog_settings)
+    column_plan = extractor.select_columns(columns)
+    profiler = StageProfiler() if profile_report_path is not None else None
+    cache = None
+    if cache_size > 0 or cache_path is not None:
+        cache = ExtractionCache(get_extractor().vocabulary_hash, maxsize=cache_size, path=cache_path)
+
+    with open_reader(input_file_path, input_sheet_name, detect_encoding(input_file_path)) as csv_reader:
+        # TODO 03-08-2024: add 3 columns
+
+        # csv_columns = csv_reader.fieldnames[:csv_reader.fieldnames.index('Description') + 1] + new_columns + all_properties + csv_reader.fieldnames[csv_reader.fieldnames.index('Description') + 1:]
+        csv_columns = select_output_columns(csv_reader.fieldnames, columns)
+        checkpoint, state = open_checkpoint(output_file_path, input_file_path, csv_columns, checkpoint_every, resume,
+                                            sheet=input_sheet_name, previous_output=previous_output_path)
+        if state is not None and checkpoint_every <= 0:
+            # a resumed run keeps saving checkpoints, at the interval of the interrupted one
+            checkpoint_every = state.get("checkpoint_every", 0)
+
+        with open_writer(output_file_path, csv_columns, state["output_position"] if state is not None else None) as csv_writer:
+            # Write the header to the output file
+            if state is None:
+                csv_writer.writeheader()
+
+            options = dict(workers=workers, batch_size=batch_size, cache=cache, profiler=profiler)
+            vocabulary_hash = get_extractor().vocabulary_hash
+            fingerprints = []
+            incremental_stats = {"reused": 0, "extracted": 0}
+            incremental = previous_output_path is not None or write_manifest_file
+            source_rows = csv_reader
+            rows_done = 0
+            if state is not None:
+                # the rows before the checkpoint are already in the output: only their fingerprints are needed
+                rows_done = state["rows"]
+                incremental_stats.update(state.get("incremental", {}))
+                source_rows = skip_rows(csv_reader, rows_done, csv_reader.fieldnames, fingerprints if incremental else None)
+            if incremental:
+                previous_rows = {}
+                if previous_output_path is not None:
+                    previous_rows = load_previous_rows(previous_output_path, csv_columns, previous_input_path)
+                rows = process_rows_incremental(source_rows, csv_reader.fieldnames, previous_rows, fingerprints, incremental_stats, **options)
+            else:
+                rows = process_rows(source_rows, **options)
+
+            # Iterate through each row and update 'fresh' column
+            metrics = open_metrics(input_file_path, metrics_file_path, progress_interval, getattr(csv_reader, 'progress', None), cache)
+            if checkpoint is None or checkpoint_every <= 0:
+                write_rows(rows, csv_writer, metrics)
+            else:
+                rows = iter(rows)
+                while True:
+                    written = write_rows(islice(rows, checkpoint_every), csv_writer, metrics)
+                    rows_done += written
+                    if written < checkpoint_every:
+                        break
+                    checkpoint.save(csv_writer, rows_done, checkpoint_every=checkpoint_every, incremental=incremental_stats)
+            if metrics is not None:
+                metrics.close()
+
+    if incremental:
+        write_manifest(manifest_path_for(output_file_path), vocabulary_hash, csv_columns, fingerprints)
+    if checkpoint is not None:
+        checkpoint.remove()
+
+    print("Processing completed. Results saved to:", output_file_path)
+    if previous_output_path is not None:
+        print(f"Incremental: {incremental_stats['reused']} rows reused from {previous_output_path}, {incremental_stats['extracted']} rows extracted")
+    if cache is not None:
+        cache.close()
+        print(cache.report())
+    print(get_extractor().plan_report())
+    if column_plan is not None:
+        print(column_plan.describe())
+    if get_extractor().watchdog is not None:
+        get_extractor().watchdog.close()
+        print(get_extractor().watchdog.report())
+    if profiler is not None:
+        profiler.write_report(profile_report_path)
+        print(profiler.format_table())
+        print("Profile report saved to:", profile_report_path)
+
+
+def batch_input_files(input_pattern):
+    """
+    Returns the sorted .csv/.xlsx files of a directory, or the files matching a glob pattern
+    """
+    if os.path.isdir(input_pattern):
+        input_pattern = os.path.join(input_pattern, '*')
+    return sorted(file_path for file_path in glob.glob(input_pattern)
+                  if os.path.isfile(file_path) and file_path.lower().endswith(('.csv', '.xlsx', '.xlsm')))
+
+def batch_output_path(input_path, output_dir):
+    name, extension = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_dir, name + batch_output_suffix + extension)
+
+_worker_cache = None
+
+def _init_batch_worker(engine, cache_size, watchdog_settings=None):
+    """
+    Batch worker initializer: the compiled vocabulary is inherited from the main process when the pool forks
+    (get_extractor only rebuilds it if the engine differs, or from the module constants under spawn, see run_batch),
+    and the cache is shared by all files of the worker
+    watchdog_settings (budget, token limit, log path, fallback) replace the inherited watchdog: worker slow rows go to stderr only
+    """
+    global _worker_cache
+    extractor = get_extractor(engine)
+    if watchdog_settings is not None:
+        set_watchdog(extractor, *watchdog_settings)
+    _worker_cache = ExtractionCache(extractor.vocabulary_hash, maxsize=cache_size) if cache_size > 0 else None
+
+def _extract_file(input_path, output_path, sheet_name=None):
+    """
+    Batch task: extracts one file (serially, with the worker's extractor and cache) and returns its manifest entry
+    A file that cannot be read or written gets an "error" entry instead of stopping the batch
+    """
+    entry = {"input": input_path, "output": output_path, "encoding": None, "rows": 0, "extracted": 0, "with_fields": 0, "slow_rows": 0}
+    watchdog = get_extractor().watchdog
+    slow_rows = watchdog.slow_rows() if watchdog is not None else 0
+    field_columns = extracted_field_columns()
+    start = time.perf_counter()
+    try:
+        entry["encoding"] = detect_encoding(input_path)
+        with open_reader(input_path, sheet_name, entry["encoding"]) as csv_reader:
+            with open_writer(output_path, output_columns(csv_reader.fieldnames)) as csv_writer:
+                csv_writer.writeheader()
+                for row in process_rows(csv_reader, cache=_worker_cache):
+                    csv_writer.writerow(row)
+                    entry["rows"] += 1
+                    if row["extracted"]:
+                        entry["extracted"] += 1
+                    if any(row.get(a_column) for a_column in field_columns):
+                        entry["with_fields"] += 1
+    except Exception as error:
+        entry["error"] = f"{type(error).__name__}: {error}"
+        # ! no partial output for a failed file
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    seconds = time.perf_counter() - start
+    if watchdog is not None:
+        entry["slow_rows"] = watchdog.slow_rows() - slow_rows
+    entry["seconds"] = round(seconds, 3)
+    entry["rows_per_second"] = round(entry["rows"] / seconds, 1) if seconds > 0 else 0.0
+    # extraction_rate: fully extracted rows ("extracted" = Y), field_rate: rows with at least one extracted field
+    entry["extraction_rate"] = round(entry["extracted"] / entry["rows"], 4) if entry["rows"] else 0.0
+    entry["field_rate"] = round(entry["with_fields"] / entry["rows"], 4) if entry["rows"] else 0.0
+    if _worker_cache is not None:
+        _worker_cache.flush()
+    return entry
+
+def run_batch(input_pattern, output_dir, workers=1, cache_size=100000, input_sheet_name=None, engine=None):
+    """
+    Batch mode: extracts every file of a directory or glob pattern, writing one output per input into output_dir
+    Files are processed concurrently by a pool of workers (each file serially within its worker); the vocabulary is
+    compiled once here and inherited by the forked workers, and each worker keeps one cache for all its files
+    ! sharing the vocabulary relies on the fork start method (Linux): with spawn (Windows, macOS) every worker compiles
+      it again from the module constants, so changes made to them at run time in this process are not seen
+    Each .csv file is read with its own encoding (see detect_encoding)
+    Writes a manifest (batch_manifest_name in output_dir) with per-file row counts, timings and extraction rates;
+    returns the manifest
+    """
+    global _worker_cache
+    engine = engine or extraction_engine
+    get_extractor(engine).select_columns(None)     # batch outputs have every column
+    os.makedirs(output_dir, exist_ok=True)
+    input_paths = batch_input_files(input_pattern)
+    output_paths = [batch_output_path(input_path, output_dir) for input_path in input_paths]
+    # outputs of a previous batch written next to the inputs are not inputs
+    outputs = set(map(os.path.abspath, output_paths))
+    tasks = [(input_path, output_path) for input_path, output_path in zip(input_paths, output_paths)
+             if os.path.abspath(input_path) not in outputs]
+    names = [os.path.basename(output_path) for input_path, output_path in tasks]
+    if len(set(names)) != len(names):
+        raise ValueError("Batch inputs with the same file name would write the same output: " + ", ".join(sorted({name for name in names if names.count(name) > 1})))
+
+    start = time.perf_counter()
+    if workers <= 1 or len(tasks) <= 1:
+        _init_batch_worker(engine, cache_size)
+        try:
+            files = [_extract_file(input_path, output_path, input_sheet_name) for input_path, output_path in tasks]
+        finally:
+            _worker_cache = None
+    else:
+        import multiprocessing  # only needed in parallel mode (keeps the module import fast)
+        watchdog = get_extractor().watchdog
+        watchdog_settings = (watchdog.budget, watchdog.token_limit, None, watchdog.use_fallback) if watchdog is not None else (None, None)
+        with multiprocessing.Pool(min(workers, len(tasks)), initializer=_init_batch_worker, initargs=(engine, cache_size, watchdog_settings)) as pool:
+            files = pool.starmap(_extract_file, [(input_path, output_path, input_sheet_name) for input_path, output_path in tasks], chunksize=1)
+    seconds = time.perf_counter() - start
+
+    rows = sum(entry["rows"] for entry in files)
+    extracted = sum(entry["extracted"] for entry in files)
+    with_fields = sum(entry["with_fields"] for entry in files)
+    slow_rows = sum(entry["slow_rows"] for entry in files)
+    manifest = {
+        "input": input_pattern,
+        "engine": engine,
+        "vocabulary_hash": get_extractor().vocabulary_hash,
+        "workers": workers,
+        "files": files,
+        "total": {
+            "files": len(files),
+            "failed": sum(1 for entry in files if "error" in entry),
+            "rows": rows,
+            "extracted": extracted,
+            "extraction_rate": round(extracted / rows, 4) if rows else 0.0,
+            "field_rate": round(with_fields / rows, 4) if rows else 0.0,
+            "slow_rows": slow_rows,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds, 1) if seconds > 0 else 0.0,
+        },
+    }
+    manifest_path = os.path.join(output_dir, batch_manifest_name)
+    with open(manifest_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    for entry in files:
+        if "error" in entry:
+            print(f"{entry['input']}: FAILED ({entry['error']})")
+        else:
+            print(f"{entry['input']}: {entry['rows']} rows ({entry['encoding']}), {entry['extraction_rate']:.1%} fully extracted, "
+                  f"{entry['field_rate']:.1%} with fields, "
+                  f"{entry['seconds']:.2f}s" + (f", {entry['slow_rows']} slow rows" if entry["slow_rows"] else "") + f" -> {entry['output']}")
+    total = manifest["total"]
+    print(f"Batch completed: {total['files']} files ({total['failed']} failed), {total['rows']} rows in {total['seconds']:.2f}s. "
+          f"Manifest saved to: {manifest_path}")
+    return manifest
+
+
+def next_record_start(data, start, position):
+    """
+    Offset of the first record start at or after position in the CSV bytes data, start being a record start
+    A newline ends a record only outside quoted fields: an odd number of quotes since start means the newline
+    is inside a quoted field ("" escapes keep the count even)
+    # ! only a candidate: a quote inside an unquoted field (e.g. an inch mark, 1/2") is taken literally by csv and flips
+    #   the count, see record_boundary_is_valid
+    """
+    if position <= start:
+        position = start
+        quotes = 0
+    else:
+        quotes = data[start:position].count(b'"')
+    while True:
+        newline = data.find(b'\n', position)
+        if newline == -1:
+            return len(data)
+        quotes += data[position:newline].count(b'"')
+        if quotes % 2 == 0:
+            return newline + 1
+        position = newline + 1
+
+def parse_record(data, position, encoding='utf-8'):
+    """
+    Parses the CSV record starting at position in the bytes data with csv (which reads no further than the record)
+    Returns (fields, offset after the record); fields is None at the end of data
+    """
+    end = position
+
+    def lines():
+        nonlocal end
+        while end < len(data):
+            newline = data.find(b'\n', end)
+            line_end = len(data) if newline == -1 else newline + 1
+            line = data[end:line_end]
+            end = line_end
+            yield line.decode(encoding, errors='replace')
+
+    return next(csv.reader(lines()), None), end
+
+def record_boundary_is_valid(data, boundary, width, lower, encoding='utf-8'):
+    """
+    Checks a candidate record boundary of next_record_start with csv: the record starting at boundary, and a record
+    starting at one of the shard_boundary_lines line starts before it (after lower) and ending at boundary,
+    must have the header's width
+    """
+    if boundary < len(data):
+        fields, end = parse_record(data, boundary, encoding)
+        if fields is None or len(fields) != width:
+            return False
+    line_start = boundary
+    for _ in range(shard_boundary_lines):
+        if line_start <= lower:
+            return False
+        line_start = data.rfind(b'\n', lower, line_start - 1) + 1 or lower
+        fields, end = parse_record(data, line_start, encoding)
+        if end == boundary and fields is not None and len(fields) == width:
+            return True
+    return False
+
+def csv_shard_ranges(file_path, shard_size, encoding='utf-8'):
+    """
+    Splits a CSV file into byte ranges of about shard_size bytes, each one a run of whole records
+    Returns (header bytes, [(start, end), ...]); the file is memory-mapped, the quotes are counted in C
+    Every boundary is checked with csv (see record_boundary_is_valid): if one does not hold, the ranges are None
+    (the file has to be read serially)
+    # ! records ending with a lone "\r" (no "\n") are not split: such a file is a single shard
+    """
+    import mmap     # only needed in sharded mode
+    with open(file_path, 'rb') as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:
+            return b'', []
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header, header_end = parse_record(data, 0, encoding)
+            width = len(header or [])
+            ranges = []
+            start = header_end
+            while start < len(data):
+                end = next_record_start(data, start, start + shard_size)
+                if end < len(data) and not record_boundary_is_valid(data, end, width, start, encoding):
+                    return data[:header_end], None
+                ranges.append((start, end))
+                start = end
+            return data[:header_end], ranges
+
+def read_csv_range(input_path, start, end, encoding, fieldnames):
+    """
+    Returns a csv.DictReader over the records of the byte range start-end of a CSV file (no header)
+    """
+    import mmap     # only needed in sharded mode
+    with open(input_path, 'rb') as input_file:
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode(encoding)
+    # newline=None: same newline handling as the file reader (CsvRowReader)
+    return csv.DictReader(io.StringIO(text, newline=None), fieldnames=fieldnames)
+
+def _init_shard_worker(engine, watchdog_settings, cache_size, columns=None):
+    """
+    Sharded mode worker initializer: the worker's extractor (see _init_worker) and its cache, shared by all its shards
+    """
+    global _worker_cache
+    _init_worker(engine, watchdog_settings, columns)
+    _worker_cache = ExtractionCache(get_extractor().vocabulary_hash, maxsize=cache_size) if cache_size > 0 else None
+
+def _extract_shard(input_path, start, end, encoding, fieldnames, shard_path, profile=False, fingerprint=False, columns=None):
+    """
+    Sharded mode task: parses the records of one byte range of the input and writes their extracted rows
+    (no header, columns: the output columns, default output_columns) to shard_path, with the worker's extractor and cache
+    Returns the row count, the row fingerprints (if fingerprint), the stage stats (if profile), the category plan
+    (hits, misses), the slow rows and the (extracted rows, sampled field fills, sampled rows) of the shard
+    """
+    reader = read_csv_range(input_path, start, end, encoding, fieldnames)
+    extractor = get_extractor()
+    profiler = StageProfiler() if profile else None
+    plan_counts = (extractor.plan_hits, extractor.plan_misses)
+    fingerprints = [] if fingerprint else None
+
+    def source_rows():
+        for row in reader:
+            if fingerprints is not None:
+                fingerprints.append(row_fingerprint(row, fieldnames))
+            yield row
+
+    row_count = 0
+    metrics = RunMetrics(input_path, interval=float('inf'), show_progress=False)   # counters only
+    with CsvRowWriter(shard_path, columns or output_columns(fieldnames)) as shard_writer:
+        for row in process_rows(source_rows(), cache=_worker_cache, profiler=profiler):
+            shard_writer.writerow(row)
+            metrics.observe(row)
+            row_count += 1
+    if _worker_cache is not None:
+        _worker_cache.flush()
+    plan_counts = (extractor.plan_hits - plan_counts[0], extractor.plan_misses - plan_counts[1])
+    slow_rows = extractor.watchdog.take() if extractor.watchdog is not None else None
+    return (row_count, fingerprints, (profiler.stats if profiler is not None else None), plan_counts, slow_rows,
+            (metrics.extracted, metrics.fills, metrics.sampled))
+
+def run_sharded(input_file_path, output_file_path, workers=1, shard_size=64 * 1024 * 1024, cache_size=100000,
+                write_manifest_file=False, profile_report_path=None, engine=None, watchdog_settings=None,
+                metrics_file_path=None, progress_interval=0, checkpoint_every=0, resume=False, columns=None):
+    """
+    Sharded mode of run() for large .csv inputs: the input is memory-mapped and split into byte ranges of about
+    shard_size bytes, aligned to record boundaries (quoted fields may contain newlines)
+    Every range is parsed and extracted by a worker on its own (reading scales with the workers, like extraction),
+    into a temporary shard file; the shards are appended to the output in input order as they complete
+    The output is the same file as run() writes; each worker has its own cache (no sqlite cache or incremental mode)
+    Live metrics (see run) are updated as the shards are appended
+    Checkpoints (see run): with checkpoint_every > 0, one is saved after every appended shard; resume=True
+    continues an interrupted run after its last appended shard (same shard_size)
+    columns: see run
+    """
+    global _worker_cache
+    import shutil
+    if is_xlsx(input_file_path) or not output_file_path.lower().endswith('.csv'):
+        raise ValueError("Sharded mode reads and writes .csv files only")
+    extractor = get_extractor(engine or extraction_engine)
+    if watchdog_settings is not None:
+        set_watchdog(extractor, *watchdog_settings)
+    column_plan = extractor.select_columns(columns)
+    profiler = StageProfiler() if profile_report_path is not None else None
+
+    encoding = detect_encoding(input_file_path)
+    header, ranges = csv_shard_ranges(input_file_path, shard_size, encoding)
+    if ranges is None:
+        print(f"Sharded mode: the record boundaries of {input_file_path} are ambiguous (quotes inside unquoted fields), "
+              "reading it serially")
+        return run(input_file_path, output_file_path, workers=workers, cache_size=cache_size, write_manifest_file=write_manifest_file,
+                   profile_report_path=profile_report_path, engine=engine, watchdog_settings=watchdog_settings,
+                   metrics_file_path=metrics_file_path, progress_interval=progress_interval, checkpoint_every=checkpoint_every,
+                   resume=resume, columns=columns)
+    fieldnames = next(csv.reader(io.StringIO(header.decode(encoding), newline=None)), [])
+    csv_columns = select_output_columns(fieldnames, columns)
+    tasks = [(input_file_path, start, end, encoding, fieldnames, f"{output_file_path}.shard{index:05d}.tmp", profiler is not None, write_manifest_file,
+              csv_columns) for index, (start, end) in enumerate(ranges)]
+
+    fingerprints = []
+    row_count = 0
+    appended_bytes = 0
+    total_bytes = sum(end - start for start, end in ranges)
+    checkpoint, state = open_checkpoint(output_file_path, input_file_path, csv_columns, checkpoint_every, resume, shard_size=shard_size)
+    if state is not None and checkpoint_every <= 0:
+        # a resumed run keeps saving checkpoints after every shard, as the interrupted one did
+        checkpoint_every = state.get("checkpoint_every", 0)
+    shards_done = 0
+    if state is not None:
+        # the shards before the checkpoint are already in the output: only their fingerprints are needed
+        shards_done, row_count = state["shards"], state["rows"]
+        appended_bytes = sum(end - start for start, end in ranges[:shards_done])
+        if write_manifest_file and shards_done:
+            for row in read_csv_range(input_file_path, ranges[0][0], ranges[shards_done - 1][1], encoding, fieldnames):
+                fingerprints.append(row_fingerprint(row, fieldnames))
+        tasks = tasks[shards_done:]
+    metrics = open_metrics(input_file_path, metrics_file_path, progress_interval, lambda: appended_bytes / total_bytes if total_bytes else 1.0)
+    with CsvRowWriter(output_file_path, csv_columns, resume_position=state["output_position"] if state is not None else None) as csv_writer:
+        if state is None:
+            csv_writer.writeheader()
+
+        def append_shard(task, result, from_worker=True):
+            nonlocal row_count, appended_bytes, shards_done
+            shard_rows, shard_fingerprints, stage_stats, plan_counts, slow_rows, row_metrics = result
+            csv_writer.file.flush()
+            with open(task[5], 'rb') as shard_file:
+                shutil.copyfileobj(shard_file, csv_writer.file.buffer)
+            os.remove(task[5])
+            row_count += shard_rows
+            if shard_fingerprints is not None:
+                fingerprints.extend(shard_fingerprints)
+            if stage_stats is not None:
+                profiler.merge(stage_stats)
+            if from_worker:
+                extractor.plan_hits += plan_counts[0]
+                extractor.plan_misses += plan_counts[1]
+            if slow_rows is not None and extractor.watchdog is not None:
+                extractor.watchdog.merge(slow_rows)
+            appended_bytes += task[2] - task[1]
+            if metrics is not None:
+                metrics.add_rows(shard_rows, *row_metrics)
+            shards_done += 1
+            if checkpoint is not None and checkpoint_every > 0:
+                checkpoint.save(csv_writer, row_count, checkpoint_every=checkpoint_every, shards=shards_done)
+
+        watchdog_settings = extractor.watchdog.settings() if extractor.watchdog is not None else None
+        if workers <= 1 or len(tasks) <= 1:
+            # in this process: the watchdog logs its slow rows itself (take/merge only move the counts)
+            _worker_cache = ExtractionCache(extractor.vocabulary_hash, maxsize=cache_size) if cache_size > 0 else None
+            try:
+                for task in tasks:
+                    append_shard(task, _extract_shard(*task), from_worker=False)
+            finally:
+                _worker_cache = None
+        else:
+            import multiprocessing  # only needed in parallel mode (keeps the module import fast)
+            with multiprocessing.Pool(workers, initializer=_init_shard_worker,
+                                     initargs=(extractor.engine_name, watchdog_settings, cache_size, columns)) as pool:
+                for task, result in zip(tasks, pool.imap(_extract_shard_task, tasks)):
+                    append_shard(task, result)
+    if metrics is not None:
+        metrics.close()
+
+    if write_manifest_file:
+        write_manifest(manifest_path_for(output_file_path), extractor.vocabulary_hash, csv_columns, fingerprints)
+    if checkpoint is not None:
+        checkpoint.remove()
+    print("Processing completed. Results saved to:", output_file_path)
+    print(f"Sharded: {row_count} rows in {len(ranges)} shards of about {shard_size / 1024 / 1024:g} MB ({encoding})")
+    print(extractor.plan_report())
+    if column_plan is not None:
+        print(column_plan.describe())
+    if extractor.watchdog is not None:
+        extractor.watchdog.close()
+        print(extractor.watchdog.report())
+    if profiler is not None:
+        profiler.write_report(profile_report_path)
+        print(profiler.format_table())
+        print("Profile report saved to:", profile_report_path)
+
+def _extract_shard_task(task):
+    return _extract_shard(*task)
+
+
+def main(argv=None):
+    """
+    Command line wrapper of run(); defaults come from the constants above
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract properties from masterlist item descriptions (.csv or .xlsx)")
+    parser.add_argument("input", nargs="?", default=input_file_path, help="input file (batch mode: directory or glob pattern)")
+    parser.add_argument("output", nargs="?", default=output_file_path, help="output file (batch mode: output directory)")
+    parser.add_argument("--batch", action="store_true", help="extract every .csv/.xlsx file of the input directory/glob, --workers files at a time")
+    parser.add_argument("--shard-size", type=float, default=input_shard_size / 1024 / 1024 if input_shard_size else 0,
+                        help="sharded mode for large .csv inputs: byte ranges of this many MB, parsed and extracted by --workers (0 = off)")
+    parser.add_argument("--sheet", default=input_sheet_name, help=".xlsx input sheet (default: active sheet)")
+    parser.add_argument("--workers", type=int, default=num_workers)
+    parser.add_argument("--batch-size", type=int, default=batch_size)
+    parser.add_argument("--cache-size", type=int, default=cache_size, help="0 disables the cache")
+    parser.add_argument("--cache-path", default=cache_path, help="sqlite file keeping the cache between runs")
+    parser.add_argument("--previous-output", default=previous_output_file_path, help="incremental mode: previous snapshot's output")
+    parser.add_argument("--previous-input", default=previous_input_file_path, help="previous snapshot's input (if its output has no manifest)")
+    parser.add_argument("--manifest", dest="write_manifest", action="store_true", default=write_manifest_file,
+                        help="write the row fingerprint manifest next to the output (always done in incremental mode)")
+    parser.add_argument("--no-manifest", dest="write_manifest", action="store_false")
+    parser.add_argument("--profile", default=profile_report_path, help="write a per-stage timing report to this file")
+    parser.add_argument("--engine", choices=sorted(extraction_engines), default=extraction_engine)
+    parser.add_argument("--fuzzy", nargs="*", metavar="CATEGORY=THRESHOLD", default=[f"{a_categ}={threshold}" for a_categ, threshold in fuzzy_keywords.items()],
+                        help="also match misspelled keywords of these categories (similarity threshold 0-1, e.g. brand=0.85; no value = off)")
+    parser.add_argument("--row-budget", type=float, default=row_time_budget * 1000 if row_time_budget else 0,
+                        help="per-row latency budget in ms: slower rows are logged (0 = off)")
+    parser.add_argument("--row-budget-fallback", action="store_true", default=row_budget_fallback,
+                        help="re-extract the rows over budget with the stream engine (output then depends on the machine's load)")
+    parser.add_argument("--row-token-limit", type=int, default=row_token_limit or 0,
+                        help="rows with more tokens skip the regex engine (0 = off)")
+    parser.add_argument("--slow-rows-log", default=slow_rows_log_path, help="log every slow row to this file (JSON lines)")
+    parser.add_argument("--progress-interval", type=float, default=progress_interval, help="seconds between progress lines on stderr (0 = off)")
+    parser.add_argument("--metrics", default=metrics_path, help="keep live metrics in this file (Prometheus text format)")
+    parser.add_argument("--checkpoint-rows", type=int, default=checkpoint_rows, help="save a checkpoint every this many rows (.csv output, 0 = off)")
+    parser.add_argument("--columns", nargs="+", default=selected_columns,
+                        help="write only these output columns (stages they do not depend on are skipped)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from the checkpoint next to the output")
+    args = parser.parse_args(argv)
+    try:
+        set_fuzzy_keywords(parse_fuzzy_keywords(args.fuzzy))
+    except ValueError as error:
+        parser.error(f"--fuzzy: {error}")
+    watchdog_settings = (args.row_budget / 1000 or None, args.row_token_limit or None, args.slow_rows_log, args.row_budget_fallback)
+    if args.batch:
+        single_file_options = [("--cache-path", args.cache_path), ("--previous-output", args.previous_output), ("--previous-input", args.previous_input),
+                               ("--manifest", args.write_manifest), ("--profile", args.profile), ("--slow-rows-log", args.slow_rows_log),
+                               ("--metrics", args.metrics), ("--checkpoint-rows", args.checkpoint_rows > 0), ("--columns", args.columns),
+                               ("--resume", args.resume), ("--shard-size", args.shard_size > 0)]
+        used = [option for option, value in single_file_options if value]
+        if used:
+            parser.error(f"{', '.join(used)}: single input file only (not with --batch)")
+
+    if args.shard_size > 0 and not args.batch:
+        run_sharded(args.input, args.output, workers=args.workers, shard_size=int(args.shard_size * 1024 * 1024), cache_size=args.cache_size,
+                    write_manifest_file=args.write_manifest, profile_report_path=args.profile, engine=args.engine, watchdog_settings=watchdog_settings,
+                    metrics_file_path=args.metrics, progress_interval=args.progress_interval, checkpoint_every=args.checkpoint_rows,
+                    resume=args.resume, columns=args.columns)
+        return
+    if args.batch:
+        set_watchdog(get_extractor(args.engine), *watchdog_settings)
+        run_batch(args.input, args.output, workers=args.workers, cache_size=args.cache_size, input_sheet_name=args.sheet, engine=args.engine)
+        return
+    run(args.input, args.output, workers=args.workers, batch_size=args.batch_size, cache_size=args.cache_size, cache_path=args.cache_path,
+        previous_output_path=args.previous_output, previous_input_path=args.previous_input, write_manifest_file=args.write_manifest,
+        input_sheet_name=args.sheet, profile_report_path=args.profile, engine=args.engine, watchdog_settings=watchdog_settings,
+        metrics_file_path=args.metrics, progress_interval=args.progress_interval, checkpoint_every=args.checkpoint_rows, resume=args.resume,
+        columns=args.columns)
+
+
+if __name__ == "__main__":
+    main()
 
-print("Processing completed. Results saved to:", output_file_path)
 # print("Trying to extract de")
 
 # print(extract_dimensions("20MM X 4FT X 8FT 450 BHN"))
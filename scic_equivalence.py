@@ -0,0 +1,195 @@
+"""
+Differential equivalence harness for the extraction engines
+- runs the reference engine (the extract_* chain, "regex") and one or more candidate engines side by side on every row
+- reports the mismatch rate of each compared column (diameter, thickness, configuration, size, info, extracted
+  by default) with example rows, and each engine's throughput, in the same JSON report
+The corpus is a masterlist file (.csv or .xlsx) or synthetic rows from scic_benchmark; rows are streamed,
+so memory does not grow with the corpus size
+
+Usage:
+    python scic_equivalence.py masterlist_03-30/masterlist_clean_raw_0331.csv --candidates stream --output equivalence_report.json
+    python scic_equivalence.py --synthetic 100000 --candidates stream --max-mismatch-rate 0.001
+"""
+import argparse
+import datetime
+import json
+import time
+
+import scic_data_cleanup as scic
+
+compared_columns = ["diameter", "thickness", "configuration", "size", "info", "extracted"]
+
+
+def build_engine(engine):
+    """
+    Returns a new extractor of the given engine (see scic_data_cleanup.extraction_engines), with the script's settings
+    """
+    return scic.extraction_engines[engine](automaton_path=scic.vocabulary_automaton_path)
+
+
+def timed_row(row, extractor):
+    """
+    Extracts a copy of row with extractor (no cache), returns (output row or None, error or None, seconds)
+    """
+    start = time.perf_counter()
+    try:
+        output, error = scic.process_row(dict(row), extractor), None
+    except Exception as exception:
+        output, error = None, f"{type(exception).__name__}: {exception}"
+    return output, error, time.perf_counter() - start
+
+
+def compare_engines(rows, reference="regex", candidates=("stream",), columns=None, max_examples=10):
+    """
+    Runs every row through the reference and the candidate engines and returns the report (a dict):
+    per engine its throughput, and per candidate the mismatch count/rate of every compared column, with up to
+    max_examples example rows per column, and the rows where the candidate raised
+    """
+    columns = list(columns or compared_columns)
+    engines = {name: build_engine(name) for name in [reference] + [name for name in candidates if name != reference]}
+    seconds = {name: 0.0 for name in engines}
+    differences = {name: {a_column: {"mismatches": 0, "examples": []} for a_column in columns} for name in candidates}
+    errors = {name: {"count": 0, "examples": []} for name in engines}
+    row_count = 0
+    mismatched_rows = {name: 0 for name in candidates}
+
+    for index, row in enumerate(rows):
+        row_count += 1
+        expected, error, elapsed = timed_row(row, engines[reference])
+        seconds[reference] += elapsed
+        if error is not None:
+            errors[reference]["count"] += 1
+            if len(errors[reference]["examples"]) < max_examples:
+                errors[reference]["examples"].append(example_row(index, row, error=error))
+        for name in candidates:
+            output, error, elapsed = timed_row(row, engines[name])
+            seconds[name] += elapsed
+            if error is not None:
+                errors[name]["count"] += 1
+                if len(errors[name]["examples"]) < max_examples:
+                    errors[name]["examples"].append(example_row(index, row, error=error))
+            if expected is None or output is None:
+                continue
+            row_differs = False
+            for a_column in columns:
+                if expected.get(a_column) != output.get(a_column):
+                    row_differs = True
+                    entry = differences[name][a_column]
+                    entry["mismatches"] += 1
+                    if len(entry["examples"]) < max_examples:
+                        entry["examples"].append(example_row(index, row, expected=expected.get(a_column), actual=output.get(a_column)))
+            if row_differs:
+                mismatched_rows[name] += 1
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": row_count,
+        "reference": reference,
+        "columns": columns,
+        "engines": {},
+        "candidates": {},
+    }
+    for name, extractor in engines.items():
+        report["engines"][name] = {
+            "engine_version": extractor.engine_version,
+            "vocabulary_hash": extractor.vocabulary_hash,
+            "seconds": seconds[name],
+            "rows_per_second": row_count / seconds[name] if seconds[name] else None,
+            "us_per_row": seconds[name] / row_count * 1e6 if row_count else None,
+            "errors": errors[name],
+        }
+    for name in candidates:
+        report["candidates"][name] = {
+            "speedup": seconds[reference] / seconds[name] if seconds[name] else None,
+            "mismatched_rows": mismatched_rows[name],
+            "mismatch_rate": mismatched_rows[name] / row_count if row_count else 0.0,
+            "columns": {a_column: dict(entry, mismatch_rate=entry["mismatches"] / row_count if row_count else 0.0)
+                        for a_column, entry in differences[name].items()},
+        }
+    return report
+
+
+def example_row(index, row, expected=None, actual=None, error=None):
+    example = {"row": index, "Item Category": row.get("Item Category"), "Item Description": row.get("Item Description")}
+    if error is not None:
+        example["error"] = error
+    else:
+        example["expected"] = expected
+        example["actual"] = actual
+    return example
+
+
+def format_report(report, examples=3):
+    """
+    Text summary of a report: throughput per engine, mismatch rate per column and a few examples per candidate
+    """
+    lines = [f"{report['rows']} rows, reference engine: {report['reference']}"]
+    lines.append(f"{'engine':12s} {'rows/s':>10s} {'us/row':>9s} {'errors':>7s}")
+    for name, entry in report["engines"].items():
+        lines.append(f"{name:12s} {entry['rows_per_second'] or 0:10.0f} {entry['us_per_row'] or 0:9.1f} {entry['errors']['count']:7d}")
+    for name, candidate in report["candidates"].items():
+        lines.append("")
+        lines.append(f"{name} vs {report['reference']}: x{candidate['speedup'] or 0:.2f} speed, "
+                     f"{candidate['mismatched_rows']} rows differ ({candidate['mismatch_rate']:.3%})")
+        for a_column, entry in candidate["columns"].items():
+            lines.append(f"  {a_column:16s} {entry['mismatches']:8d} {entry['mismatch_rate']:9.3%}")
+            for example in entry["examples"][:examples]:
+                lines.append(f"      row {example['row']}: {example['Item Description']!r}")
+                lines.append(f"          expected {example['expected']!r}, got {example['actual']!r}")
+        for example in report["engines"][name]["errors"]["examples"][:examples]:
+            lines.append(f"  row {example['row']} raised {example['error']}: {example['Item Description']!r}")
+    return "\n".join(lines)
+
+
+def iter_corpus(input_path=None, sheet_name=None, synthetic_rows=0, seed=0):
+    """
+    Yields the corpus rows: the rows of input_path, or synthetic_rows generated rows (scic_benchmark)
+    """
+    if input_path is None:
+        import scic_benchmark
+        yield from scic_benchmark.generate_rows(synthetic_rows, seed, duplicate_rate=0)
+        return
+    with scic.open_reader(input_path, sheet_name, scic.detect_encoding(input_path)) as reader:
+        yield from reader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare extraction engines row by row (mismatch rates and throughput)")
+    parser.add_argument("input", nargs="?", help="masterlist corpus (.csv or .xlsx); omit with --synthetic")
+    parser.add_argument("--sheet", help=".xlsx input sheet (default: active sheet)")
+    parser.add_argument("--synthetic", type=int, default=0, help="compare on this many generated rows instead of a file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reference", choices=sorted(scic.extraction_engines), default="regex")
+    parser.add_argument("--candidates", nargs="+", choices=sorted(scic.extraction_engines), default=["stream"])
+    parser.add_argument("--columns", nargs="+", default=compared_columns, help="columns to compare ('all' = every output column)")
+    parser.add_argument("--examples", type=int, default=10, help="example rows kept per column")
+    parser.add_argument("--output", default="equivalence_report.json")
+    parser.add_argument("--max-mismatch-rate", type=float, help="exit with status 1 if a candidate differs on more rows than this")
+    args = parser.parse_args(argv)
+    if args.input is None and args.synthetic <= 0:
+        parser.error("give an input file or --synthetic ROWS")
+
+    columns = args.columns
+    if columns == ["all"]:
+        columns = None  # set from the first row's output columns below
+    rows = iter_corpus(args.input, args.sheet, args.synthetic, args.seed)
+    if columns is None:
+        first = next(rows, None)
+        columns = scic.output_columns(list(first)) if first is not None else compared_columns
+        rows = iter_corpus(args.input, args.sheet, args.synthetic, args.seed)
+
+    report = compare_engines(rows, args.reference, args.candidates, columns, args.examples)
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(format_report(report))
+    print("Equivalence report saved to:", args.output)
+
+    if args.max_mismatch_rate is not None:
+        worst = max((candidate["mismatch_rate"] for candidate in report["candidates"].values()), default=0.0)
+        engine_errors = sum(entry["errors"]["count"] for entry in report["engines"].values())
+        if worst > args.max_mismatch_rate or engine_errors:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Queryable property index over an extracted masterlist output (.csv)
+- inverted index: every value of the indexed columns (wire type, gauge, brand, the other properties, color, ...),
+  case-insensitive, to the sorted numbers of the rows holding it; multi-valued cells are split on the separators
+  the extraction joins values with (", ", and " X " for length)
+- sorted numeric indexes: the measured properties (diameter, thickness, units_others) converted to their canonical
+  unit (scic_data_cleanup.normalize_quantity), sorted by value, for equality and range conditions
+- the byte range of every record in the output, so matching rows are read directly instead of scanning the file
+The index is a sqlite file next to the output (<output>.index.sqlite); it records the output's size and modification
+time and refuses to answer once the output changed (build it again)
+
+Conditions are "<column><operator><value>", operators =, <, <=, >, >=; a query returns the rows matching all of them
+Numeric values take any unit of the property (diameter=1/2 IN, length>=2 m); without a unit, the canonical one
+
+Usage:
+    python scic_index.py build masterlist_03-30/masterlist_clean_extracted_0331.csv
+    python scic_index.py query masterlist_03-30/masterlist_clean_extracted_0331.csv "wire type=THHN" "gauge=12" "brand=Phelps Dodge"
+    python scic_index.py query masterlist_03-30/masterlist_clean_extracted_0331.csv "diameter=1/2 IN" --count
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+import argparse
+import datetime
+import sqlite3
+import json
+import time
+import csv
+import sys
+import io
+import os
+import re
+
+import scic_data_cleanup as scic
+
+numeric_columns = ["diameter", "thickness"] + scic.units_others_list
+indexed_columns = ["Item Category", "color", "wire type"] + scic.all_properties + numeric_columns
+condition_pattern = re.compile(r'^\s*(.+?)\s*(<=|>=|=|<|>)\s*(.*?)\s*$')
+# numeric equality: values within this relative difference are equal (unit conversions are not exact)
+numeric_tolerance = 1e-9
+fetch_chunk_size = 500
+
+
+def index_path_for(output_file_path):
+    """
+    The index of an output file is written next to it
+    """
+    return output_file_path + '.index.sqlite'
+
+
+def index_term(value):
+    """
+    Indexed form of a value: case-insensitive, single spaces
+    """
+    return " ".join(value.split()).casefold()
+
+
+def split_values(column, text):
+    """
+    The single values of an output cell (apply_fields joins several values with ", ", length values with " X ")
+    """
+    values = text.split(", ")
+    if column == "length":
+        values = [a_part for a_value in values for a_part in a_value.split(" X ")]
+    return [a_value.strip() for a_value in values if a_value.strip()]
+
+
+def quantity_value(column, text):
+    """
+    A numeric condition value in the canonical unit of column, e.g. ("diameter", "1/2 IN") -> 12.7 (mm)
+    A number without a unit is taken as the canonical unit; returns None if text is not a quantity of column
+    """
+    parsed = scic.parse_quantity(text)
+    if parsed is None:
+        return None
+    if not parsed[1]:
+        return parsed[0]
+    return scic.normalize_quantity(column, text)
+
+
+def parse_condition(text):
+    """
+    "<column><operator><value>" -> (column, operator, value), e.g. "wire type=THHN" -> ("wire type", "=", "THHN")
+    """
+    match = condition_pattern.match(text)
+    if not match or not match.group(3):
+        raise ValueError(f"Invalid condition {text!r} (expected <column><operator><value>, operators: = < <= > >=)")
+    return match.groups()
+
+
+def record_ranges(data):
+    """
+    Yields the (start, end) byte range of every record of the CSV bytes data after the header
+    """
+    start = scic.next_record_start(data, 0, 0)
+    while start < len(data):
+        end = scic.next_record_start(data, start, start)
+        yield start, end
+        start = end
+
+
+def build_index(output_file_path, index_path=None, columns=None):
+    """
+    Builds the index of an extracted output (.csv) into index_path (default: index_path_for), replacing any older one
+    columns: the indexed columns (default: indexed_columns; the ones missing from the output are left out)
+    Returns the index summary (rows, terms and numeric values per column, seconds)
+    """
+    import mmap
+    if not output_file_path.lower().endswith('.csv'):
+        raise ValueError("Only .csv outputs can be indexed")
+    index_path = index_path or index_path_for(output_file_path)
+    start_time = time.perf_counter()
+    encoding = scic.detect_encoding(output_file_path)
+    output_stat = os.stat(output_file_path)
+
+    with open(output_file_path, 'rb') as output_file:
+        if output_stat.st_size == 0:
+            raise ValueError(f"{output_file_path} is empty")
+        with mmap.mmap(output_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = list(record_ranges(data))
+    with open(output_file_path, 'r', newline='', encoding=encoding) as output_file:
+        reader = csv.reader(output_file)
+        fieldnames = next(reader, [])
+        columns = [a_column for a_column in dict.fromkeys(columns or indexed_columns) if a_column in fieldnames]
+        positions = [(a_column, fieldnames.index(a_column), a_column in numeric_columns) for a_column in columns]
+        postings = {a_column: {} for a_column in columns}
+        numbers = {a_column: [] for a_column in columns if a_column in numeric_columns}
+        row_count = 0
+        for row_number, values in enumerate(reader):
+            row_count += 1
+            for a_column, position, numeric in positions:
+                if position >= len(values) or not values[position]:
+                    continue
+                for a_value in split_values(a_column, values[position]):
+                    column_postings = postings[a_column]
+                    term = index_term(a_value)
+                    rows = column_postings.get(term)
+                    if rows is None:
+                        rows = column_postings[term] = array('I')
+                    if not rows or rows[-1] != row_number:
+                        rows.append(row_number)
+                    if numeric:
+                        number = scic.normalize_quantity(a_column, a_value)
+                        if number is not None:
+                            numbers[a_column].append((number, row_number))
+    if row_count != len(ranges):
+        # ! the record boundaries (newlines outside quotes) must match the CSV parser's records, e.g. no lone "\r" line ends
+        raise ValueError(f"{output_file_path}: {row_count} rows parsed but {len(ranges)} records found, cannot index it")
+
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    connection = sqlite3.connect(index_path)
+    try:
+        connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute("CREATE TABLE postings (column_name TEXT, term TEXT, count INTEGER, rows BLOB, PRIMARY KEY (column_name, term))")
+        connection.execute("CREATE TABLE numeric (column_name TEXT PRIMARY KEY, count INTEGER, numbers BLOB, rows BLOB)")
+        connection.execute("CREATE TABLE records (row INTEGER PRIMARY KEY, start INTEGER, end INTEGER)")
+        connection.executemany("INSERT INTO records VALUES (?, ?, ?)", ((row_number, start, end) for row_number, (start, end) in enumerate(ranges)))
+        connection.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                               ((a_column, term, len(rows), rows.tobytes()) for a_column, column_postings in postings.items()
+                                for term, rows in column_postings.items()))
+        for a_column, pairs in numbers.items():
+            pairs.sort()
+            connection.execute("INSERT INTO numeric VALUES (?, ?, ?, ?)", (a_column, len(pairs), array('d', [number for number, row_number in pairs]).tobytes(),
+                                                                         array('I', [row_number for number, row_number in pairs]).tobytes()))
+        meta = {
+            "output": os.path.abspath(output_file_path),
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+            "encoding": encoding,
+            "fieldnames": fieldnames,
+            "columns": columns,
+            "rows": row_count,
+            "byteorder": sys.byteorder,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", ((key, json.dumps(value)) for key, value in meta.items()))
+        connection.commit()
+    finally:
+        connection.close()
+
+    return {
+        "index": index_path,
+        "rows": row_count,
+        "terms": {a_column: len(column_postings) for a_column, column_postings in postings.items()},
+        "numeric": {a_column: len(pairs) for a_column, pairs in numbers.items()},
+        "seconds": time.perf_counter() - start_time,
+    }
+
+
+def intersect(small, large):
+    """
+    Rows of the sorted sequence small also in the sorted sequence large (binary search from the last position)
+    """
+    result = array('I')
+    position = 0
+    for row_number in small:
+        position = bisect_left(large, row_number, position)
+        if position == len(large):
+            break
+        if large[position] == row_number:
+            result.append(row_number)
+    return result
+
+
+class PropertyIndex:
+    """
+    Read side of an index: answers conjunctive conditions with the inverted and numeric indexes,
+    then reads the matching records from the output at their byte offsets
+    Raises ValueError if the output changed since the index was built
+    """
+    def __init__(self, output_file_path, index_path=None):
+        self.output_file_path = output_file_path
+        self.index_path = index_path or index_path_for(output_file_path)
+        if not os.path.exists(self.index_path):
+            raise ValueError(f"No index at {self.index_path} (build it with: python scic_index.py build {output_file_path})")
+        self.connection = sqlite3.connect(self.index_path)
+        self.meta = {key: json.loads(value) for key, value in self.connection.execute("SELECT key, value FROM meta")}
+        output_stat = os.stat(output_file_path)
+        if (output_stat.st_size, output_stat.st_mtime_ns) != (self.meta["output_size"], self.meta["output_mtime_ns"]):
+            self.close()
+            raise ValueError(f"{output_file_path} changed since {self.index_path} was built (build it again)")
+        self.swap_bytes = self.meta["byteorder"] != sys.byteorder
+        self.numeric_cache = {}
+
+    def load_array(self, typecode, data):
+        values = array(typecode)
+        values.frombytes(data)
+        if self.swap_bytes:
+            values.byteswap()
+        return values
+
+    def postings(self, column, value):
+        """
+        Sorted rows holding value in column (case-insensitive)
+        """
+        found = self.connection.execute("SELECT rows FROM postings WHERE column_name = ? AND term = ?", (column, index_term(value))).fetchone()
+        return self.load_array('I', found[0]) if found is not None else array('I')
+
+    def numeric(self, column):
+        """
+        (sorted values, their rows) of a numeric column
+        """
+        if column not in self.numeric_cache:
+            found = self.connection.execute("SELECT numbers, rows FROM numeric WHERE column_name = ?", (column,)).fetchone()
+            self.numeric_cache[column] = (self.load_array('d', found[0]), self.load_array('I', found[1])) if found is not None else (array('d'), array('I'))
+        return self.numeric_cache[column]
+
+    def numeric_range(self, column, low=None, high=None, include_low=True, include_high=True):
+        """
+        Sorted rows with a value of column between low and high (None = unbounded)
+        """
+        numbers, rows = self.numeric(column)
+        start = 0 if low is None else (bisect_left(numbers, low) if include_low else bisect_right(numbers, low))
+        end = len(numbers) if high is None else (bisect_right(numbers, high) if include_high else bisect_left(numbers, high))
+        return array('I', sorted(set(rows[start:end]))) if start < end else array('I')
+
+    def match(self, column, operator, value):
+        """
+        Sorted rows matching one condition
+        """
+        if column not in self.meta["columns"]:
+            raise ValueError(f"Column {column!r} is not indexed (indexed columns: {', '.join(self.meta['columns'])})")
+        number = quantity_value(column, value) if column in numeric_columns else None
+        if operator == "=":
+            if number is None:
+                return self.postings(column, value)
+            tolerance = numeric_tolerance * max(1.0, abs(number))
+            return self.numeric_range(column, number - tolerance, number + tolerance)
+        if number is None:
+            raise ValueError(f"{column} {operator} {value!r}: range conditions need a numeric column and a quantity of it")
+        if operator in ("<", "<="):
+            return self.numeric_range(column, high=number, include_high=operator == "<=")
+        return self.numeric_range(column, low=number, include_low=operator == ">=")
+
+    def query(self, conditions):
+        """
+        Sorted numbers of the rows matching every condition ((column, operator, value) tuples or condition strings)
+        """
+        conditions = [parse_condition(a_condition) if isinstance(a_condition, str) else a_condition for a_condition in conditions]
+        if not conditions:
+            return array('I', range(self.meta["rows"]))
+        matches = sorted((self.match(*a_condition) for a_condition in conditions), key=len)
+        result = matches[0]
+        for rows in matches[1:]:
+            if not result:
+                break
+            result = intersect(result, rows)
+        return result
+
+    def fetch(self, row_numbers, columns=None):
+        """
+        Yields the rows row_numbers of the output (dicts, restricted to columns if given), read at their byte offsets
+        """
+        fieldnames = self.meta["fieldnames"]
+        with open(self.output_file_path, 'rb') as output_file:
+            for chunk_start in range(0, len(row_numbers), fetch_chunk_size):
+                chunk = list(row_numbers[chunk_start:chunk_start + fetch_chunk_size])
+                found = self.connection.execute(f"SELECT row, start, end FROM records WHERE row IN ({','.join('?' * len(chunk))})", chunk)
+                ranges = {row_number: (start, end) for row_number, start, end in found}
+                for row_number in chunk:
+                    start, end = ranges[row_number]
+                    output_file.seek(start)
+                    text = output_file.read(end - start).decode(self.meta["encoding"])
+                    row = dict(zip(fieldnames, next(csv.reader(io.StringIO(text, newline='')))))
+                    yield {a_column: row.get(a_column, '') for a_column in columns} if columns else row
+
+    def search(self, conditions, columns=None, limit=None):
+        """
+        The rows matching every condition (see query), at most limit of them
+        """
+        row_numbers = self.query(conditions)
+        return list(self.fetch(row_numbers[:limit] if limit else row_numbers, columns))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query a property index over an extracted masterlist output (.csv)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="index an extracted output")
+    build_parser.add_argument("output", help="extracted output (.csv)")
+    build_parser.add_argument("--index", help="index file (default: <output>.index.sqlite)")
+    build_parser.add_argument("--columns", nargs="+", default=indexed_columns, help="columns to index")
+    query_parser = commands.add_parser("query", help="print the rows matching every condition (CSV)")
+    query_parser.add_argument("output", help="extracted output (.csv)")
+    query_parser.add_argument("conditions", nargs="+", help='e.g. "wire type=THHN" "gauge=12" "diameter=1/2 IN" "length>=2 m"')
+    query_parser.add_argument("--index", help="index file (default: <output>.index.sqlite)")
+    query_parser.add_argument("--columns", nargs="+", help="columns to print (default: every column)")
+    query_parser.add_argument("--limit", type=int, default=0, help="print at most this many rows (0 = all)")
+    query_parser.add_argument("--count", action="store_true", help="only print the number of matching rows")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        summary = build_index(args.output, args.index, args.columns)
+        print(f"Indexed {summary['rows']} rows, {sum(summary['terms'].values())} values in {len(summary['terms'])} columns "
+              f"({sum(summary['numeric'].values())} numeric) in {summary['seconds']:.2f}s. Index saved to: {summary['index']}")
+        return
+
+    start = time.perf_counter()
+    with PropertyIndex(args.output, args.index) as index:
+        row_numbers = index.query(args.conditions)
+        if args.count:
+            print(len(row_numbers))
+        else:
+            columns = args.columns or list(dict.fromkeys(index.meta["fieldnames"]))
+            writer = csv.DictWriter(sys.stdout, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            for row in index.fetch(row_numbers[:args.limit] if args.limit else row_numbers, columns):
+                writer.writerow(row)
+    print(f"{len(row_numbers)} matching rows ({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
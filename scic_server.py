@@ -0,0 +1,426 @@
+"""
+Local extraction server: keeps the compiled vocabulary (and the extraction cache) warm between requests
+- asyncio HTTP/1.1 server on localhost (TCP) or on a Unix socket, standard library only
+- concurrent requests are batched: the batcher waits up to --max-wait ms for more requests (at most --max-batch records),
+  then runs one scic_data_cleanup.extract_many pass over all of them (in the extraction thread, so the server keeps accepting)
+- at most --max-concurrency requests are handled at once, the others wait for a slot
+- GET /stats returns the request count, batch sizes and p50/p99 latencies
+
+Endpoints:
+    POST /extract   {"records": [{"description": "...", "category": "..."}, ...]}  (or [description, category] pairs)
+                    -> {"rows": [extracted row, ...]}  (same columns as the CSV output, in request order)
+    GET /stats      -> latency and batching stats
+    GET /health     -> {"status": "ok"}
+
+Usage:
+    python scic_server.py serve --port 8765
+    python scic_server.py serve --unix /tmp/scic.sock
+    python scic_server.py query "ANCHOR BOLT 20MM DIA X 500MM" --category "ANCHOR BOLT" --port 8765
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import http.client
+import argparse
+import asyncio
+import socket
+import json
+import math
+import time
+
+import scic_data_cleanup as scic
+
+max_body_size = 16 * 1024 * 1024
+# ! longer request/header lines and more headers are refused (400), so a client cannot make a request head grow unbounded
+max_line_size = 64 * 1024
+max_headers = 100
+http_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+                500: "Internal Server Error"}
+
+
+class LatencyStats:
+    """
+    Request latencies (seconds) of the last window_size requests, for p50/p99
+    Latencies are counted in log-spaced buckets (bucket_growth apart, from min_seconds), kept in step with the window,
+    so a percentile is one pass over the buckets instead of a sort of the window; it is the upper bound of its bucket
+    (at most 2% over the exact value)
+    """
+    min_seconds = 1e-5
+    bucket_growth = 1.02
+    buckets = 1000      # the last one holds everything over min_seconds * bucket_growth ** buckets (about an hour)
+
+    def __init__(self, window_size=10000):
+        self.latencies = deque(maxlen=window_size)  # bucket of every latency of the window
+        self.counts = [0] * (self.buckets + 1)
+        self.requests = 0
+
+    def bucket(self, seconds):
+        if seconds <= self.min_seconds:
+            return 0
+        return min(self.buckets, math.ceil(math.log(seconds / self.min_seconds) / math.log(self.bucket_growth)))
+
+    def record(self, seconds):
+        if self.latencies.maxlen and len(self.latencies) == self.latencies.maxlen:
+            self.counts[self.latencies[0]] -= 1
+        bucket = self.bucket(seconds)
+        self.latencies.append(bucket)
+        self.counts[bucket] += 1
+        self.requests += 1
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return None
+        rank = min(len(self.latencies) - 1, int(fraction * len(self.latencies)))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return self.min_seconds * self.bucket_growth ** bucket
+
+    def report(self):
+        return {
+            "requests": self.requests,
+            "window": len(self.latencies),
+            "p50_ms": None if not self.latencies else self.percentile(0.50) * 1000,
+            "p99_ms": None if not self.latencies else self.percentile(0.99) * 1000,
+        }
+
+
+def parse_records(payload):
+    """
+    Request body -> (description, category) pairs
+    Records are {"description": ..., "category": ...} objects (or the masterlist column names) or [description, category] pairs
+    """
+    records = payload.get("records") if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        raise ValueError('expected {"records": [...]}')
+    pairs = []
+    for record in records:
+        if isinstance(record, dict):
+            description = record.get("description", record.get("Item Description"))
+            category = record.get("category", record.get("Item Category", ""))
+        elif isinstance(record, (list, tuple)) and len(record) in (1, 2):
+            description, category = record[0], (record[1] if len(record) == 2 else "")
+        else:
+            raise ValueError(f"bad record: {record!r}")
+        if not isinstance(description, str) or not isinstance(category or "", str):
+            raise ValueError(f"bad record: {record!r}")
+        pairs.append((description, category or ""))
+    return pairs
+
+
+class ExtractionServer:
+    """
+    Batches the records of concurrent requests into extract_many passes over one warm extractor and cache
+    """
+    def __init__(self, max_batch=512, max_wait=0.002, max_concurrency=16, cache_size=100000, cache_path=None, engine=None):
+        self.extractor = scic.get_extractor(engine)
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.cache = None
+        # the extraction (and the sqlite cache, tied to the thread that opened it) runs in a single thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scic-extract")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.latency = LatencyStats()
+        self.batches = 0
+        self.batched_records = 0
+        self.failed_requests = 0
+        self.queue = None
+        self.slots = None
+
+    def open_cache(self):
+        if self.cache_size > 0 or self.cache_path is not None:
+            self.cache = scic.ExtractionCache(self.extractor.vocabulary_hash, maxsize=self.cache_size, path=self.cache_path)
+
+    def close_cache(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def extract_batch(self, pairs):
+        return list(scic.extract_many(pairs, cache=self.cache))
+
+    async def extract(self, pairs):
+        """
+        Queues the records of one request and waits for their rows
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((pairs, future))
+        return await future
+
+    async def run_batches(self):
+        """
+        Takes the queued requests, waits up to max_wait for more (up to max_batch records), extracts them in one pass
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            record_count = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while record_count < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                record_count += len(pending[-1][0])
+
+            all_pairs = [pair for pairs, future in pending for pair in pairs]
+            try:
+                rows = await loop.run_in_executor(self.executor, self.extract_batch, all_pairs)
+            except Exception as error:
+                # ! the extractor does not raise on any text record, so this is a last resort for unexpected errors
+                #   (a bug, the cache): one request's records must not fail the others, so every request of the batch
+                #   is extracted on its own and only the requests that still raise get the error
+                print(f"Extraction of a batch of {len(pending)} requests failed ({error!r}): retrying them one by one")
+                await self.extract_each(pending)
+                continue
+            self.batches += 1
+            self.batched_records += len(all_pairs)
+            offset = 0
+            for pairs, future in pending:
+                if not future.done():
+                    future.set_result(rows[offset:offset + len(pairs)])
+                offset += len(pairs)
+
+    async def extract_each(self, pending):
+        """
+        Extracts the queued requests one by one (after their batch raised unexpectedly), failing only the requests that raise
+        """
+        loop = asyncio.get_running_loop()
+        for pairs, future in pending:
+            if future.done():
+                continue
+            try:
+                rows = await loop.run_in_executor(self.executor, self.extract_batch, pairs)
+            except Exception as error:
+                self.failed_requests += 1
+                future.set_exception(error)
+                continue
+            self.batches += 1
+            self.batched_records += len(pairs)
+            future.set_result(rows)
+
+    def stats(self):
+        stats = self.latency.report()
+        stats.update({
+            "batches": self.batches,
+            "records": self.batched_records,
+            "mean_batch_size": self.batched_records / self.batches if self.batches else None,
+            "failed_requests": self.failed_requests,
+            "max_concurrency": self.max_concurrency,
+            "engine": self.extractor.engine_name,
+            "cache": self.cache.report() if self.cache is not None else None,
+            "category_plans": self.extractor.plan_report(),
+        })
+        return stats
+
+    async def respond(self, method, path, body):
+        """
+        Returns (status, JSON-serializable response) for one request
+        """
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/extract":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            pairs = parse_records(json.loads(body or b"null"))
+        except ValueError as error:     # json.JSONDecodeError is a ValueError
+            return 400, {"error": str(error)}
+        async with self.slots:
+            return 200, {"rows": await self.extract(pairs)}
+
+    async def handle_connection(self, reader, writer):
+        """
+        HTTP/1.1 with keep-alive: one request after the other on the same connection
+        """
+        try:
+            while True:
+                try:
+                    request_line, headers = await self.read_head(reader)
+                except ValueError as error:
+                    await self.send(writer, 400, {"error": str(error)}, close=True)
+                    break
+                if request_line is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send(writer, 400, {"error": "bad request line"}, close=True)
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send(writer, 400, {"error": "bad Content-Length"}, close=True)
+                    break
+                if length > max_body_size:
+                    await self.send(writer, 413, {"error": f"body over {max_body_size} bytes"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                try:
+                    status, response = await self.respond(method, target.split("?", 1)[0], body)
+                except Exception as error:
+                    status, response = 500, {"error": repr(error)}
+                await self.send(writer, status, response, close)
+                if target.startswith("/extract"):
+                    self.latency.record(time.perf_counter() - start)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_head(self, reader):
+        """
+        Request line and headers of the next request on the connection, (None, None) once the client is done
+        Raises ValueError for a line over max_line_size bytes (the stream limit) or more than max_headers headers
+        """
+        request_line = await self.read_line(reader)
+        if not request_line:
+            return None, None
+        headers = {}
+        for count in range(max_headers + 1):
+            line = await self.read_line(reader)
+            if line in (b"\r\n", b"\n", b""):
+                return request_line, headers
+            if count == max_headers:
+                raise ValueError(f"more than {max_headers} headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def read_line(reader):
+        try:
+            return await reader.readline()
+        except ValueError:
+            # the line does not fit in the stream limit
+            raise ValueError(f"request line or header over {max_line_size} bytes") from None
+
+    async def send(self, writer, status, response, close=False):
+        body = json.dumps(response).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {http_reasons.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None, ready=None):
+        """
+        Serves until cancelled; ready (an asyncio.Event) is set once the server accepts connections
+        """
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+        await loop.run_in_executor(self.executor, self.open_cache)
+        batcher = asyncio.create_task(self.run_batches())
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=max_line_size)
+            print("Extraction server listening on", unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=max_line_size)
+            print("Extraction server listening on", ", ".join(str(a_socket.getsockname()) for a_socket in server.sockets))
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            await loop.run_in_executor(self.executor, self.close_cache)
+            self.executor.shutdown()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, unix_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = unix_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ExtractionClient:
+    """
+    Client of a running extraction server (keeps its connection open between calls)
+    """
+    def __init__(self, host="127.0.0.1", port=8765, unix_path=None, timeout=60):
+        if unix_path is not None:
+            self.connection = UnixHTTPConnection(unix_path, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload)
+        self.connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"{response.status}: {result.get('error')}")
+        return result
+
+    def extract(self, records):
+        """
+        records: (description, category) pairs or {"description", "category"} dicts; returns the extracted rows
+        """
+        return self.request("POST", "/extract", {"records": [list(record) if isinstance(record, tuple) else record for record in records]})["rows"]
+
+    def stats(self):
+        return self.request("GET", "/stats")
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local extraction server (keeps the compiled vocabulary warm)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "query"):
+        command = commands.add_parser(name)
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--unix", help="Unix socket path (instead of host/port)")
+    serve = commands.choices["serve"]
+    serve.add_argument("--max-batch", type=int, default=512, help="records per extraction pass")
+    serve.add_argument("--max-wait", type=float, default=2.0, help="ms to wait for more requests before a pass")
+    serve.add_argument("--max-concurrency", type=int, default=16, help="requests handled at once")
+    serve.add_argument("--cache-size", type=int, default=scic.cache_size, help="0 disables the cache")
+    serve.add_argument("--cache-path", default=scic.cache_path)
+    serve.add_argument("--engine", choices=sorted(scic.extraction_engines), default=scic.extraction_engine)
+    query = commands.choices["query"]
+    query.add_argument("descriptions", nargs="*")
+    query.add_argument("--category", default="")
+    query.add_argument("--stats", action="store_true", help="print the server stats")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = ExtractionServer(args.max_batch, args.max_wait / 1000, args.max_concurrency, args.cache_size, args.cache_path, args.engine)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    client = ExtractionClient(args.host, args.port, args.unix)
+    if args.descriptions:
+        for row in client.extract([(description, args.category) for description in args.descriptions]):
+            print(json.dumps(row))
+    if args.stats:
+        print(json.dumps(client.stats(), indent=2))
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
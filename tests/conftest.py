@@ -0,0 +1,32 @@
+import csv
+import os
+import sys
+
+import pytest
+
+# the scic_* modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+sample_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "masterlist_sample.csv")
+
+
+@pytest.fixture(scope="session")
+def sample_rows():
+    """
+    The masterlist sample (300 rows) as csv.DictReader rows
+    """
+    with open(sample_path, 'r', encoding='utf-8', newline='') as sample_file:
+        return list(csv.DictReader(sample_file))
+
+
+@pytest.fixture
+def sample_csv(tmp_path, sample_rows):
+    """
+    The sample followed by every other sample row again (450 rows, a third of them repeats), as a .csv input
+    """
+    input_path = str(tmp_path / "masterlist.csv")
+    with open(input_path, 'w', encoding='utf-8', newline='') as input_file:
+        writer = csv.DictWriter(input_file, fieldnames=list(sample_rows[0]))
+        writer.writeheader()
+        writer.writerows(sample_rows + sample_rows[::2])
+    return input_path
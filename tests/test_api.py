@@ -0,0 +1,33 @@
+import copy
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def test_extract_many_keeps_order_and_input(sample_rows):
+    rows = copy.deepcopy(sample_rows)
+    extracted = list(scic.extract_many(rows))
+    assert rows == sample_rows
+    assert [a_row["No."] for a_row in extracted] == [a_row["No."] for a_row in sample_rows]
+    assert all(set(a_row) <= set(extracted_row) for a_row, extracted_row in zip(sample_rows, extracted))
+    assert list(scic.extract_many(rows, workers=2, batch_size=16)) == extracted
+
+
+def test_extract_many_takes_description_category_pairs(sample_rows):
+    pairs = [(a_row["Item Description"], a_row["Item Category"]) for a_row in sample_rows[:20]]
+    expected = [scic.extract_description(description, category) for description, category in pairs]
+    assert list(scic.extract_many(pairs)) == expected
+    assert [a_row["Item Description"] for a_row in expected] == [description for description, category in pairs]
+
+
+@pytest.mark.parametrize("engine", sorted(scic.extraction_engines))
+@pytest.mark.parametrize("description, field, value", [
+    ("pipe 20mm dia x 3m", "diameter", "20mm"),
+    ("dia 20mm pipe", "diameter", "20mm"),
+    ("plate 6mm thk", "thickness", "6mm"),
+    ("MEDIA FILTER 20MM DIA", "diameter", "20MM"),
+])
+def test_lowercase_and_embedded_keywords(engine, description, field, value):
+    fields = scic.extraction_engines[engine]().extract_fields("", description)
+    assert fields[field] == value
@@ -0,0 +1,70 @@
+import csv
+import json
+import os
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+def write_rows(path, rows, encoding='utf-8'):
+    with open(path, 'w', encoding=encoding, newline='') as csv_file:
+        csv_writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        csv_writer.writeheader()
+        csv_writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def batch_dir(tmp_path, sample_rows):
+    """
+    Input directory of the batch: two masterlists (one in cp1252) and a file without an Item Description column
+    """
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    write_rows(str(input_dir / "first.csv"), sample_rows)
+    write_rows(str(input_dir / "second.csv"), [dict(row, **{"Item Description": row["Item Description"] + " 90°"}) for row in sample_rows[::3]],
+               encoding='cp1252')
+    write_rows(str(input_dir / "broken.csv"), [{"No.": "1", "Name": "PIPE 1/2IN"}])
+    (input_dir / "notes.txt").write_text("not an input")
+    return str(input_dir)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_outputs_equal_single_runs(tmp_path, batch_dir, workers):
+    output_dir = str(tmp_path / f"outputs_{workers}")
+    manifest = scic.run_batch(batch_dir, output_dir, workers=workers)
+    assert sorted(os.listdir(output_dir)) == ["batch_manifest.json", "first_extracted.csv", "second_extracted.csv"]
+    for name in ("first", "second"):
+        expected_path = str(tmp_path / f"{name}_single.csv")
+        scic.run(os.path.join(batch_dir, f"{name}.csv"), expected_path)
+        assert read_bytes(os.path.join(output_dir, f"{name}_extracted.csv")) == read_bytes(expected_path)
+
+    with open(os.path.join(output_dir, scic.batch_manifest_name), 'r', encoding='utf-8') as manifest_file:
+        assert json.load(manifest_file) == manifest
+    by_name = {os.path.basename(entry["input"]): entry for entry in manifest["files"]}
+    assert sorted(by_name) == ["broken.csv", "first.csv", "second.csv"]
+    assert "error" in by_name["broken.csv"] and by_name["broken.csv"]["rows"] == 0
+    assert (by_name["first.csv"]["rows"], by_name["second.csv"]["rows"]) == (300, 100)
+    assert by_name["second.csv"]["encoding"] != 'utf-8'
+    total = manifest["total"]
+    assert (total["files"], total["failed"], total["rows"]) == (3, 1, 400)
+    assert total["extracted"] == by_name["first.csv"]["extracted"] + by_name["second.csv"]["extracted"]
+
+
+def test_previous_outputs_are_not_inputs(tmp_path, batch_dir):
+    scic.run_batch(batch_dir, batch_dir)
+    manifest = scic.run_batch(os.path.join(batch_dir, "*.csv"), batch_dir)
+    assert sorted(os.path.basename(entry["input"]) for entry in manifest["files"]) == ["broken.csv", "first.csv", "second.csv"]
+
+
+@pytest.mark.parametrize("option", [["--columns", "color"], ["--resume"], ["--shard-size", "1"], ["--metrics", "run.prom"]])
+def test_single_file_options_are_rejected(tmp_path, batch_dir, option):
+    with pytest.raises(SystemExit):
+        scic.main([batch_dir, str(tmp_path / "outputs"), "--batch"] + option)
+    assert not os.path.exists(str(tmp_path / "outputs"))
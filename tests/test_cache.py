@@ -0,0 +1,50 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def extract(rows, **options):
+    return list(scic.process_rows((dict(row) for row in rows), **options))
+
+
+@pytest.fixture
+def repeated_rows(sample_rows):
+    return sample_rows + sample_rows[::2]
+
+
+def distinct_keys(rows):
+    return len({(row["Item Category"], scic.normalize_description(row["Item Description"])) for row in rows})
+
+
+def test_cached_rows_equal_uncached_rows(repeated_rows):
+    cache = scic.ExtractionCache(scic.get_extractor().vocabulary_hash)
+    assert extract(repeated_rows, cache=cache) == extract(repeated_rows)
+    assert cache.misses == distinct_keys(repeated_rows)
+    assert cache.hits == len(repeated_rows) - cache.misses
+
+
+def test_parallel_cache_counts_match_serial(repeated_rows):
+    serial_cache = scic.ExtractionCache(scic.get_extractor().vocabulary_hash)
+    parallel_cache = scic.ExtractionCache(scic.get_extractor().vocabulary_hash)
+    serial = extract(repeated_rows, cache=serial_cache)
+    # small batches: repeats of a key still being extracted by a worker wait for it
+    parallel = extract(repeated_rows, workers=2, batch_size=16, cache=parallel_cache)
+    assert parallel == serial
+    assert (parallel_cache.hits, parallel_cache.misses) == (serial_cache.hits, serial_cache.misses)
+
+
+def test_disk_cache_is_reused_for_the_same_vocabulary_only(tmp_path, sample_rows):
+    path = str(tmp_path / "cache.sqlite")
+    vocabulary_hash = scic.get_extractor().vocabulary_hash
+    cache = scic.ExtractionCache(vocabulary_hash, path=path)
+    expected = extract(sample_rows, cache=cache)
+    cache.close()
+
+    cache = scic.ExtractionCache(vocabulary_hash, path=path)
+    assert extract(sample_rows, cache=cache) == expected
+    assert cache.disk_hits == distinct_keys(sample_rows) and cache.misses == 0
+    cache.close()
+
+    cache = scic.ExtractionCache("another vocabulary", path=path)
+    assert cache.get((sample_rows[0]["Item Category"], scic.normalize_description(sample_rows[0]["Item Description"]))) is None
+    cache.close()
@@ -0,0 +1,56 @@
+import random
+import re
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def strip_word_by_word(category, description):
+    """
+    The per-row stripping the plans replaced: one re.sub per word of the Item Category
+    """
+    for a_word in [e for e in category.split(" ") if e not in ('',None)]:
+        description = re.sub(rf'\b{re.escape(a_word)}\b', '', description, flags=re.IGNORECASE).strip()
+    return description
+
+
+@pytest.mark.parametrize("category", ["PIPE", "PVC PIPE", "Pipe  Fittings", "WIRE W/ GROUND", "ELBOW - 90 DEG", "A AB B", "1/2 PIPE", ""])
+def test_strip_category_equals_word_by_word(category):
+    plan = scic.CategoryPlan(category)
+    rng = random.Random(category)
+    words = [e for e in category.split(" ") if e] + ["W", "/", "-", "90", "PIPES", "AB", "CABLE", "2.0MM"]
+    for _ in range(300):
+        picked = [rng.choice(words) for _ in range(rng.randint(0, 8))]
+        picked = [a_word.lower() if rng.random() < 0.3 else a_word for a_word in picked]
+        description = rng.choice([" ", "", "-", "  "]).join(picked)
+        assert plan.strip_category(description) == strip_word_by_word(category, description), description
+
+
+def test_rows_equal_word_by_word_stripping(sample_rows):
+    for row in sample_rows:
+        plan = scic.CategoryPlan(row["Item Category"])
+        assert plan.strip_category(row["Item Description"]) == strip_word_by_word(row["Item Category"], row["Item Description"])
+
+
+@pytest.mark.parametrize("engine", sorted(scic.extraction_engines))
+def test_skipped_stages(engine):
+    extractor = scic.extraction_engines[engine](settings_by_category={"pipe ": {"skip": ["wire type"]}})
+    for category in ("PIPE", "Pipe"):
+        fields = extractor.extract_fields(category, "PIPE THHN 2.0MM BLUE")
+        assert fields["wire type"] == [] and fields["info"] == "THHN"
+        assert fields["color"] == "blue" and fields["units"] == [["length", "2.0MM"]]
+    assert extractor.extract_fields("WIRE", "WIRE THHN 2.0MM BLUE")["wire type"] == ["THHN"]
+
+
+def test_plans_are_reused():
+    extractor = scic.DescriptionExtractor()
+    for category in ["PIPE", "WIRE", "PIPE", "PIPE", "WIRE"]:
+        extractor.extract_fields(category, f"{category} 2.0MM")
+    assert (extractor.plan_misses, extractor.plan_hits) == (2, 3)
+    assert extractor.plan_report() == "Category plans: 2 compiled, 3 reused, hit rate 60.0%"
+
+
+def test_unknown_stage():
+    with pytest.raises(ValueError, match="wire types"):
+        scic.DescriptionExtractor(settings_by_category={"PIPE": {"skip": ["wire types"]}})
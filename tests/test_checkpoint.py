@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+class Interrupted(Exception):
+    pass
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+def interrupt_after(count, process_rows):
+    """
+    process_rows, stopping the run after count rows (as a crash would, with rows written after the last checkpoint)
+    """
+    def interrupted(rows, **options):
+        for number, row in enumerate(process_rows(rows, **options), 1):
+            if number > count:
+                raise Interrupted()
+            yield row
+    return interrupted
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resumed_run_equals_uninterrupted_run(tmp_path, sample_csv, monkeypatch, capsys, workers):
+    expected_path = str(tmp_path / "expected.csv")
+    scic.run(sample_csv, expected_path, workers=workers, batch_size=16)
+
+    output_path = str(tmp_path / "resumed.csv")
+    with monkeypatch.context() as patch:
+        patch.setattr(scic, "process_rows", interrupt_after(130, scic.process_rows))
+        with pytest.raises(Interrupted):
+            scic.run(sample_csv, output_path, workers=workers, batch_size=16, checkpoint_every=50)
+    assert os.path.exists(scic.checkpoint_path_for(output_path))
+
+    capsys.readouterr()
+    scic.run(sample_csv, output_path, workers=workers, batch_size=16, resume=True)
+    assert "100 rows already written" in capsys.readouterr().out
+    assert read_bytes(output_path) == read_bytes(expected_path)
+    assert not os.path.exists(scic.checkpoint_path_for(output_path))
+
+
+def test_resume_with_other_columns_is_refused(tmp_path, sample_csv, monkeypatch):
+    output_path = str(tmp_path / "resumed.csv")
+    with monkeypatch.context() as patch:
+        patch.setattr(scic, "process_rows", interrupt_after(130, scic.process_rows))
+        with pytest.raises(Interrupted):
+            scic.run(sample_csv, output_path, checkpoint_every=50)
+    with pytest.raises(ValueError, match="changed since the checkpoint"):
+        scic.run(sample_csv, output_path, resume=True, columns=["Item Description", "diameter"])
+
+
+def test_no_checkpoint_by_default(tmp_path, sample_csv):
+    output_path = str(tmp_path / "output.csv")
+    scic.run(sample_csv, output_path, checkpoint_every=scic.checkpoint_rows)
+    assert not os.path.exists(scic.checkpoint_path_for(output_path))
+    assert not os.path.exists(scic.manifest_path_for(output_path))
@@ -0,0 +1,86 @@
+import csv
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+        csv_reader = csv.DictReader(csv_file)
+        return csv_reader.fieldnames, list(csv_reader)
+
+
+@pytest.fixture(params=sorted(scic.extraction_engines))
+def engine(request):
+    return request.param
+
+
+@pytest.fixture
+def full_output(tmp_path, sample_csv, engine):
+    output_path = str(tmp_path / "full.csv")
+    scic.run(sample_csv, output_path, engine=engine)
+    return read_rows(output_path)
+
+
+column_sets = [
+    ["No."],
+    ["color"],
+    ["Item Description", "brand", "SN"],
+    ["voltage rating", "length", "cross-sectional area"],
+    ["size", "diameter"],
+    ["wire type", "style", "no."],
+    ["info", "extracted"],
+    ["configuration", "color"],
+]
+
+
+@pytest.mark.parametrize("columns", column_sets)
+def test_selected_columns_equal_the_full_run(tmp_path, sample_csv, engine, full_output, columns):
+    output_path = str(tmp_path / "selected.csv")
+    scic.run(sample_csv, output_path, engine=engine, columns=columns)
+    fieldnames, rows = read_rows(output_path)
+    assert fieldnames == columns
+    assert rows == [{a_column: row[a_column] for a_column in columns} for row in full_output[1]]
+
+
+@pytest.mark.parametrize("mode", ["parallel", "sharded"])
+def test_selected_columns_in_other_modes(tmp_path, sample_csv, engine, full_output, mode):
+    columns = ["Item Description", "length", "brand", "wire type"]
+    output_path = str(tmp_path / "selected.csv")
+    if mode == "parallel":
+        scic.run(sample_csv, output_path, engine=engine, workers=2, batch_size=16, columns=columns)
+    else:
+        scic.run_sharded(sample_csv, output_path, engine=engine, workers=2, shard_size=6000, columns=columns)
+    assert read_rows(output_path)[1] == [{a_column: row[a_column] for a_column in columns} for row in full_output[1]]
+
+
+def test_next_full_run_has_every_column(tmp_path, sample_csv, engine, full_output):
+    scic.run(sample_csv, str(tmp_path / "selected.csv"), engine=engine, columns=["color"])
+    output_path = str(tmp_path / "full_again.csv")
+    scic.run(sample_csv, output_path, engine=engine)
+    assert read_rows(output_path) == full_output
+
+
+@pytest.mark.parametrize("columns, stages", [
+    (["No.", "Item Description"], ()),
+    (["P/N"], ("properties",)),
+    (["color"], ("properties", "diameter", "thickness", "units", "color")),
+    (["size"], ("properties", "diameter", "thickness", "units")),
+    (["brand"], scic.DescriptionExtractor.skippable_stages),
+    (["info"], scic.DescriptionExtractor.skippable_stages),
+])
+def test_plan_stages(columns, stages):
+    extractor = scic.DescriptionExtractor()
+    plan = extractor.select_columns(columns)
+    assert plan.stages == stages
+    assert plan.skip == set(scic.DescriptionExtractor.skippable_stages) - set(stages)
+    fields = extractor.extract_fields("PIPE", "PIPE THHN 2.0MM BLUE PANASONIC")
+    assert ("wire type" in plan.skip) == (fields["wire type"] == [])
+    assert extractor.select_columns(None) is None
+    assert extractor.extract_fields("PIPE", "PIPE THHN 2.0MM BLUE PANASONIC")["wire type"] == ["THHN"]
+
+
+def test_unknown_columns(tmp_path, sample_csv):
+    with pytest.raises(ValueError, match="colour"):
+        scic.run(sample_csv, str(tmp_path / "selected.csv"), columns=["Item Description", "colour"])
@@ -0,0 +1,77 @@
+import csv
+
+import pytest
+
+import scic_data_cleanup as scic
+import scic_columnar
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def csv_output(tmp_path, sample_csv):
+    """
+    Header and rows (lists of strings) of the CSV path output
+    """
+    output_path = str(tmp_path / "extracted.csv")
+    scic.run(sample_csv, output_path)
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        rows = list(csv.reader(output_file))
+    return rows[0], rows[1:]
+
+
+def as_lists(frame):
+    return [['' if value is None else str(value) for value in row] for row in frame.itertuples(index=False)]
+
+
+def test_dataframe_equals_csv_path(sample_csv, csv_output):
+    header, rows = csv_output
+    result = scic_columnar.extract_table(pd.read_csv(sample_csv, dtype=str, keep_default_na=False))
+    assert list(result.columns) == header
+    assert as_lists(result) == rows
+
+
+def test_arrow_table_equals_csv_path(sample_csv, csv_output):
+    pa = pytest.importorskip("pyarrow")
+    header, rows = csv_output
+    table = pa.Table.from_pandas(pd.read_csv(sample_csv, dtype=str, keep_default_na=False), preserve_index=False)
+    result = scic_columnar.extract_table(table)
+    assert result.column_names == header
+    assert as_lists(result.to_pandas()) == rows
+
+
+@pytest.mark.parametrize("extra_column", [None, "brand"])
+def test_missing_categories_are_empty(tmp_path, sample_rows, extra_column):
+    """
+    Rows without an Item Category (None in the frame, empty in the .csv), with and without a source column
+    overlapping the extracted ones (broadcast and row by row merge)
+    """
+    rows = [dict(row, **{"Item Category": '' if number % 5 == 0 else row["Item Category"]}) for number, row in enumerate(sample_rows)]
+    if extra_column is not None:
+        rows = [dict(row, **{extra_column: "Acme" if number % 3 == 0 else ''}) for number, row in enumerate(rows)]
+    input_path, output_path = str(tmp_path / "masterlist.csv"), str(tmp_path / "extracted.csv")
+    with open(input_path, 'w', encoding='utf-8', newline='') as input_file:
+        writer = csv.DictWriter(input_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    scic.run(input_path, output_path)
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        expected = list(csv.reader(output_file))
+
+    frame = pd.DataFrame(rows)
+    frame.loc[frame["Item Category"] == '', "Item Category"] = None
+    result = scic_columnar.extract_table(frame)
+    assert [list(result.columns)] + as_lists(result) == expected
+
+
+def test_column_plan_equals_column_selected_run(tmp_path, sample_csv):
+    columns = ["Item Description", "diameter", "brand", "size", "voltage rating"]
+    output_path = str(tmp_path / "selected.csv")
+    scic.run(sample_csv, output_path, columns=columns)
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        expected = list(csv.reader(output_file))
+
+    extractor = scic.DescriptionExtractor()
+    extractor.select_columns(columns)
+    result = scic_columnar.extract_table(pd.read_csv(sample_csv, dtype=str, keep_default_na=False), extractor=extractor)
+    assert [list(result.columns)] + as_lists(result) == expected
@@ -0,0 +1,8 @@
+import scic_equivalence
+
+
+def test_engines_agree_on_the_sample(sample_rows):
+    report = scic_equivalence.compare_engines(sample_rows)
+    assert report["rows"] == len(sample_rows)
+    assert report["candidates"]["stream"]["mismatched_rows"] == 0
+    assert [engine["errors"]["count"] for engine in report["engines"].values()] == [0, 0]
@@ -0,0 +1,24 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+@pytest.fixture(scope="module", params=sorted(scic.extraction_engines))
+def extractor(request):
+    return scic.extraction_engines[request.param]()
+
+
+def test_extracted_values_are_removed_literally(extractor):
+    """
+    "3.2MM" is not a pattern: it must not remove the "3/2MM" before it
+    """
+    fields = extractor.extract_fields("PIPE", scic.normalize_description("PIPE SN 3R 3/2MM X 184.3MM BEND 3.2MM THK"))
+    assert fields["thickness"] == "3.2MM"
+    assert fields["units"] == [["length", "3/2MM"], ["length", "184.3MM"]]
+    assert fields["info"] == "BEND"
+
+
+def test_remove_first():
+    assert scic.remove_first("A 3/2MM X 3.2MM", "3.2mm") == "A 3/2MM X "
+    assert scic.remove_first("LBS/FT. (2)", "lbs/ft.", ' ') == "  (2)"
+    assert scic.remove_first("NO MATCH", "[") == "NO MATCH"
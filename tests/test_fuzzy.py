@@ -0,0 +1,75 @@
+import csv
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+@pytest.fixture(scope="module", params=sorted(scic.extraction_engines))
+def fuzzy_extractor(request):
+    return scic.extraction_engines[request.param](fuzzy_thresholds={"brand": 0.85})
+
+
+def brands(fields):
+    return [value for prop, value in fields["keywords"] if prop == "brand"]
+
+
+@pytest.mark.parametrize("description", ["PHILLIPS SCREW HEAD", "PHILIP SCREW", "AMCGILL SWITCH"])
+def test_short_word_near_a_brand_is_not_the_brand(fuzzy_extractor, description):
+    fields = fuzzy_extractor.extract_fields("SCREW", description)
+    assert brands(fields) == []
+    assert fields["info"].split()[0] == description.split()[0]
+
+
+def test_misspelled_brand_is_matched(fuzzy_extractor):
+    fields = fuzzy_extractor.extract_fields("LAMP", "PANASONIK LAMP 20W")
+    assert brands(fields) == ["Panasonic"]
+    assert fields["keyword confidence"] == [["brand", "0.89"]]
+
+
+@pytest.mark.parametrize("description, span", [("Mcgill L", "Mcgill"), ("12 TELEMICANIQUE", "TELEMICANIQUE"),
+                                               ("PANA SONIC X", "PANA SONIC")])
+def test_neighbouring_tokens_are_not_swallowed(description, span):
+    index = scic.FuzzyVocabularyIndex(["Mcgill", "TELEMECANIQUE", "Panasonic"])
+    [(start, end, value, similarity)] = index.find(description)
+    assert description[start:end] == span
+
+
+def test_fuzzy_matching_is_off_by_default():
+    extractor = scic.DescriptionExtractor()
+    assert extractor.fuzzy_indexes == []
+    assert brands(extractor.extract_fields("LAMP", "PANASONIK LAMP 20W")) == []
+
+
+@pytest.fixture
+def brand_csv(tmp_path):
+    input_path = str(tmp_path / "masterlist.csv")
+    with open(input_path, 'w', encoding='utf-8', newline='') as input_file:
+        input_file.write("Item Category,Item Description\nLAMP,PANASONIK LAMP 20W\nLAMP,PANASONIC LAMP 20W\nLAMP,LAMP 20W\n")
+    return input_path
+
+
+def test_confidence_column_follows_the_fuzzy_setting(tmp_path, brand_csv, monkeypatch):
+    monkeypatch.setattr(scic, "fuzzy_keywords", scic.fuzzy_keywords)     # restored after the test
+    output_path = str(tmp_path / "extracted.csv")
+    scic.main([brand_csv, output_path, "--fuzzy", "brand=0.85"])
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        rows = list(csv.DictReader(output_file))
+    assert [(a_row["brand"], a_row["brand confidence"]) for a_row in rows] == [("Panasonic", "0.89"), ("PANASONIC", "1.00"), ("", "")]
+
+    scic.main([brand_csv, output_path, "--fuzzy"])
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        assert "brand confidence" not in next(csv.reader(output_file))
+
+
+def test_columnar_confidence_column(brand_csv, fuzzy_extractor):
+    pd = pytest.importorskip("pandas")
+    import scic_columnar
+    result = scic_columnar.extract_table(pd.read_csv(brand_csv, dtype=str), extractor=fuzzy_extractor)
+    assert list(result["brand confidence"]) == ["0.89", "1.00", ""]
+
+
+@pytest.mark.parametrize("values", [["brand"], ["brand=2"], ["color=0.9"], ["brand=high"]])
+def test_bad_fuzzy_option_is_refused(values):
+    with pytest.raises(ValueError):
+        scic.parse_fuzzy_keywords(values)
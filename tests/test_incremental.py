@@ -0,0 +1,25 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+@pytest.fixture
+def serial_output(tmp_path, sample_csv):
+    output_path = str(tmp_path / "serial.csv")
+    scic.run(sample_csv, output_path)
+    return read_bytes(output_path)
+
+
+def test_incremental_run_reuses_unchanged_rows(tmp_path, sample_csv, serial_output, capsys):
+    previous_path = str(tmp_path / "previous.csv")
+    scic.run(sample_csv, previous_path, write_manifest_file=True)
+    output_path = str(tmp_path / "incremental.csv")
+    capsys.readouterr()
+    scic.run(sample_csv, output_path, previous_output_path=previous_path)
+    assert "450 rows reused" in capsys.readouterr().out
+    assert read_bytes(output_path) == serial_output
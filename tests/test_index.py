@@ -0,0 +1,79 @@
+import csv
+import os
+import random
+
+import pytest
+
+import scic_data_cleanup as scic
+import scic_index
+
+
+@pytest.fixture
+def extracted(tmp_path, sample_csv):
+    """
+    (path, rows) of an extracted output with its index built
+    """
+    output_path = str(tmp_path / "extracted.csv")
+    scic.run(sample_csv, output_path)
+    scic_index.build_index(output_path)
+    with open(output_path, 'r', encoding='utf-8', newline='') as output_file:
+        return output_path, list(csv.DictReader(output_file))
+
+
+def scan(rows, conditions):
+    """
+    Brute force: numbers of the rows matching every (column, operator, value) condition
+    """
+    comparisons = {"=": lambda a, b: abs(a - b) <= scic_index.numeric_tolerance * max(1.0, abs(b)),
+                   "<": lambda a, b: a < b, "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b}
+    found = []
+    for number, row in enumerate(rows):
+        for column, operator, value in conditions:
+            values = scic_index.split_values(column, row.get(column, ''))
+            quantity = scic_index.quantity_value(column, value) if column in scic_index.numeric_columns else None
+            if quantity is None:
+                matched = scic_index.index_term(value) in [scic_index.index_term(a_value) for a_value in values]
+            else:
+                numbers = [scic.normalize_quantity(column, a_value) for a_value in values]
+                matched = any(comparisons[operator](a_number, quantity) for a_number in numbers if a_number is not None)
+            if not matched:
+                break
+        else:
+            found.append(number)
+    return found
+
+
+def random_conditions(rng, row):
+    columns = [a_column for a_column in scic_index.indexed_columns if row.get(a_column)]
+    conditions = []
+    for column in rng.sample(columns, min(len(columns), rng.randint(1, 3))):
+        value = rng.choice(scic_index.split_values(column, row[column]))
+        quantity = scic.parse_quantity(value) if column in scic_index.numeric_columns else None
+        if quantity is not None and scic.normalize_quantity(column, value) is not None and rng.random() < 0.5:
+            conditions.append((column, rng.choice(["=", "<", "<=", ">", ">="]), f"{quantity[0]} {quantity[1]}"))
+        else:
+            conditions.append((column, "=", value.lower() if rng.random() < 0.3 else value))
+    return conditions
+
+
+def test_queries_equal_a_scan(extracted):
+    output_path, rows = extracted
+    rng = random.Random(0)
+    with scic_index.PropertyIndex(output_path) as index:
+        for _ in range(200):
+            conditions = random_conditions(rng, rows[rng.randrange(len(rows))])
+            if conditions:
+                assert list(index.query(conditions)) == scan(rows, conditions), conditions
+        sample = sorted(rng.sample(range(len(rows)), 50))
+        assert list(index.fetch(sample)) == [rows[number] for number in sample]
+
+
+def test_changed_output_is_refused(extracted):
+    output_path, rows = extracted
+    with open(output_path, 'a', encoding='utf-8') as output_file:
+        output_file.write("\n")
+    with pytest.raises(ValueError, match="changed since"):
+        scic_index.PropertyIndex(output_path)
+    os.remove(scic_index.index_path_for(output_path))
+    with pytest.raises(ValueError, match="No index"):
+        scic_index.PropertyIndex(output_path)
@@ -0,0 +1,68 @@
+import csv
+import os
+import re
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_metrics(path):
+    """
+    {(name, labels): value} of a Prometheus text file (checking every sample has its HELP and TYPE lines)
+    """
+    samples, described = {}, set()
+    with open(path, 'r', encoding='utf-8') as metrics_file:
+        for line in metrics_file.read().splitlines():
+            if line.startswith("# "):
+                kind, name = line.split(" ")[1:3]
+                described.add((kind, name))
+                continue
+            name, labels, value = re.fullmatch(r'(\w+)\{(.*)\} (\S+)', line).groups()
+            assert {("HELP", name), ("TYPE", name)} <= described
+            assert labels.startswith('input="masterlist.csv"')
+            samples[name, labels[len('input="masterlist.csv"'):]] = float(value)
+    return samples
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+def test_metrics_file(tmp_path, sample_csv):
+    output_path, metrics_path = str(tmp_path / "extracted.csv"), str(tmp_path / "run.prom")
+    scic.run(sample_csv, output_path, metrics_file_path=metrics_path)
+    metrics = read_metrics(metrics_path)
+    assert not os.path.exists(metrics_path + ".tmp")
+
+    rows = read_rows(output_path)
+    assert metrics["scic_rows_processed_total", ""] == len(rows) == 450
+    assert metrics["scic_progress_ratio", ""] == 1.0 and metrics["scic_eta_seconds", ""] == 0.0
+    assert metrics["scic_extracted_ratio", ""] == pytest.approx(sum(1 for row in rows if row["extracted"]) / len(rows))
+    assert metrics["scic_cache_hits_total", ""] + metrics["scic_cache_misses_total", ""] == 450
+    assert metrics["scic_slow_rows_total", ""] == 0
+    # the fill rates are sampled on one row in RunMetrics.sample_every
+    sampled = rows[scic.RunMetrics.sample_every - 1::scic.RunMetrics.sample_every]
+    for a_column in scic.extracted_field_columns():
+        fill_ratio = sum(1 for row in sampled if row[a_column]) / len(sampled)
+        assert metrics["scic_field_fill_ratio", f',field="{a_column}"'] == pytest.approx(fill_ratio), a_column
+
+
+@pytest.mark.parametrize("mode", ["parallel", "sharded"])
+def test_metrics_count_every_row(tmp_path, sample_csv, mode):
+    output_path, metrics_path = str(tmp_path / "extracted.csv"), str(tmp_path / "run.prom")
+    if mode == "parallel":
+        scic.run(sample_csv, output_path, workers=2, batch_size=16, metrics_file_path=metrics_path)
+    else:
+        scic.run_sharded(sample_csv, output_path, workers=2, shard_size=6000, metrics_file_path=metrics_path)
+    metrics = read_metrics(metrics_path)
+    assert metrics["scic_rows_processed_total", ""] == 450
+    assert metrics["scic_extracted_ratio", ""] == pytest.approx(sum(1 for row in read_rows(output_path) if row["extracted"]) / 450)
+
+
+def test_metrics_of_selected_columns(tmp_path, sample_csv):
+    metrics_path = str(tmp_path / "run.prom")
+    scic.run(sample_csv, str(tmp_path / "extracted.csv"), metrics_file_path=metrics_path, columns=["Item Description", "color", "brand"])
+    fields = sorted(labels for name, labels in read_metrics(metrics_path) if name == "scic_field_fill_ratio")
+    assert fields == [',field="brand"', ',field="color"']
@@ -0,0 +1,22 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+@pytest.fixture
+def serial_output(tmp_path, sample_csv):
+    output_path = str(tmp_path / "serial.csv")
+    scic.run(sample_csv, output_path)
+    return read_bytes(output_path)
+
+
+@pytest.mark.parametrize("cache_size", [0, 1000])
+def test_parallel_output_is_byte_identical(tmp_path, sample_csv, serial_output, cache_size):
+    output_path = str(tmp_path / "parallel.csv")
+    scic.run(sample_csv, output_path, workers=2, batch_size=16, cache_size=cache_size)
+    assert read_bytes(output_path) == serial_output
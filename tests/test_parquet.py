@@ -0,0 +1,46 @@
+import csv
+import re
+
+import pytest
+
+import scic_data_cleanup as scic
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_parquet_output(tmp_path, sample_csv):
+    expected_path, output_path = str(tmp_path / "extracted.csv"), str(tmp_path / "extracted.parquet")
+    scic.run(sample_csv, expected_path)
+    scic.run(sample_csv, output_path)
+    with open(expected_path, 'r', encoding='utf-8', newline='') as expected_file:
+        expected = list(csv.DictReader(expected_file))
+    table = pq.read_table(output_path)
+
+    # the text columns hold the same values as the .csv output (null for the fields a row never got)
+    text_columns = [a_field.name for a_field in table.schema if pa.types.is_string(a_field.type)]
+    assert text_columns == list(dict.fromkeys(expected[0]))
+    assert [{a_column: value or '' for a_column, value in row.items()} for row in table.select(text_columns).to_pylist()] == expected
+
+    # one list<double> column per measured property, with every value of the cell
+    value_columns = [a_field.name for a_field in table.schema if not pa.types.is_string(a_field.type)]
+    props = scic.units_others_list + ['diameter', 'thickness']
+    assert value_columns == [scic.value_column_name(prop) for prop in props]
+    assert all(re.fullmatch(r'[0-9a-z_]+', a_column) for a_column in value_columns)
+    assert all(table.schema.field(a_column).type == pa.list_(pa.float64()) for a_column in value_columns)
+    for prop, a_column in zip(props, value_columns):
+        assert table.column(a_column).to_pylist() == [scic.normalize_quantities(prop, row[prop]) or None for row in expected]
+    assert any(len(values) > 1 for values in table.column("length_mm").to_pylist() if values)
+
+
+def test_typed_values(tmp_path):
+    output_path = str(tmp_path / "typed.parquet")
+    with scic.ParquetRowWriter(output_path, ["Item Description", "length", "voltage rating", "cross-sectional area"]) as writer:
+        writer.writerow({"Item Description": "A", "length": "100MM X 4FT", "voltage rating": "12V, 24V", "cross-sectional area": "2.5 MM SQ"})
+        writer.writerow({"Item Description": "B", "length": "3 ZZ", "voltage rating": "", "cross-sectional area": None})
+    table = pq.read_table(output_path)
+    assert table.column_names == ["Item Description", "length", "voltage rating", "cross-sectional area",
+                                  "cross_sectional_area_mm2", "length_mm", "voltage_rating_v"]
+    assert table.column("length_mm").to_pylist() == [[100.0, 1219.2], [None]]
+    assert table.column("voltage_rating_v").to_pylist() == [[12.0, 24.0], None]
+    assert table.column("cross_sectional_area_mm2").to_pylist() == [[2.5], None]
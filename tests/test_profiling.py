@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+def counts(report):
+    return [(entry["stage"], entry["calls"], entry["hits"]) for entry in report]
+
+
+@pytest.fixture
+def serial_report(tmp_path, sample_csv):
+    """
+    (output bytes, report) of a profiled serial run
+    """
+    output_path, report_path = str(tmp_path / "profiled.csv"), str(tmp_path / "profile.json")
+    scic.run(sample_csv, output_path, profile_report_path=report_path)
+    with open(report_path, 'r', encoding='utf-8') as report_file:
+        return read_bytes(output_path), json.load(report_file)
+
+
+def test_profile_report(tmp_path, sample_csv, serial_report):
+    output, report = serial_report
+    output_path = str(tmp_path / "plain.csv")
+    scic.run(sample_csv, output_path)
+    assert read_bytes(output_path) == output
+
+    assert [entry["stage"] for entry in report] == scic.StageProfiler.stages
+    by_stage = {entry["stage"]: entry for entry in report}
+    # every row goes through the cache and the assembly, only the cache misses through the extraction stages
+    assert by_stage["cache"]["calls"] == by_stage["assembly"]["calls"] == 450
+    misses = by_stage["cache"]["calls"] - by_stage["cache"]["hits"]
+    assert all(by_stage[stage]["calls"] == misses for stage in scic.DescriptionExtractor.skippable_stages)
+    assert all(0 <= entry["hits"] <= entry["calls"] and entry["worst_ms"] * 1000 >= entry["mean_us"] for entry in report)
+    assert sum(entry["share"] for entry in report) == pytest.approx(1.0)
+
+
+def test_worker_profiles_are_merged(tmp_path, sample_csv, serial_report):
+    output, report = serial_report
+    output_path, report_path = str(tmp_path / "profiled.csv"), str(tmp_path / "profile.json")
+    scic.run(sample_csv, output_path, workers=2, batch_size=16, profile_report_path=report_path)
+    with open(report_path, 'r', encoding='utf-8') as report_file:
+        assert counts(json.load(report_file)) == counts(report)
+    assert read_bytes(output_path) == output
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import scic_data_cleanup as scic
+import scic_server
+
+
+async def extract_together(server, requests):
+    """
+    Queues every request before the batcher wakes up (max_wait is long), so they share one batch
+    """
+    server.queue = asyncio.Queue()
+    batcher = asyncio.create_task(server.run_batches())
+    try:
+        return await asyncio.gather(*(server.extract(pairs) for pairs in requests), return_exceptions=True)
+    finally:
+        batcher.cancel()
+
+
+class Poisoned(Exception):
+    pass
+
+
+def test_poisoned_request_fails_alone(monkeypatch):
+    server = scic_server.ExtractionServer(max_wait=0.5, cache_size=0, engine="regex")
+    extract_batch = server.extract_batch
+
+    def failing_extract_batch(pairs):
+        # an unexpected error, raised by any batch holding the poisoned record
+        if ("POISONED", "PIPE") in pairs:
+            raise Poisoned()
+        return extract_batch(pairs)
+
+    monkeypatch.setattr(server, "extract_batch", failing_extract_batch)
+    valid = [("ANCHOR BOLT 20MM DIA", "ANCHOR BOLT")]
+    poisoned = [("POISONED", "PIPE")]
+    valid_rows, poisoned_rows = asyncio.run(extract_together(server, [valid, poisoned]))
+
+    assert isinstance(poisoned_rows, Poisoned)
+    assert valid_rows == [scic.extract_description(*valid[0])]
+    assert valid_rows[0]["diameter"] == "20MM"
+    assert server.failed_requests == 1
+
+
+def test_batch_without_errors_is_one_pass():
+    server = scic_server.ExtractionServer(max_wait=0.5, cache_size=0, engine="regex")
+    requests = [[("LAMP P/N 1092629700", "LAMP")], [("ANCHOR BOLT 20MM DIA", "ANCHOR BOLT"), ("BULB P/N 1092805900", "BULB")]]
+    results = asyncio.run(extract_together(server, requests))
+
+    assert [len(rows) for rows in results] == [1, 2]
+    assert results[0][0]["P/N"] == "1092629700"
+    assert server.batches == 1 and server.failed_requests == 0
+
+
+@pytest.mark.parametrize("payload", [{"records": "nope"}, {"records": [42]}, [{"description": 3}]])
+def test_parse_records_rejects_bad_payloads(payload):
+    with pytest.raises(ValueError):
+        scic_server.parse_records(payload)
+
+
+async def exchange(server, request):
+    """
+    Sends raw request bytes to the server's connection handler; returns the response bytes (until the server closes)
+    """
+    listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0, limit=scic_server.max_line_size)
+    async with listener:
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response
+
+
+@pytest.mark.parametrize("request_bytes", [
+    b"POST /extract HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+    b"POST /extract HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+    b"GET /health HTTP/1.1\r\nX-Big: " + b"a" * (scic_server.max_line_size + 10) + b"\r\n\r\n",
+    b"GET /health HTTP/1.1\r\n" + b"X-Header: 1\r\n" * (scic_server.max_headers + 1) + b"\r\n",
+], ids=["content-length not a number", "negative content-length", "header line over the limit", "too many headers"])
+def test_bad_request_head_is_refused_and_closed(request_bytes):
+    server = scic_server.ExtractionServer(engine="regex")
+    response = asyncio.run(exchange(server, request_bytes))
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Connection: close" in response
+
+
+def test_health_keeps_the_connection_usable():
+    server = scic_server.ExtractionServer(engine="regex")
+    response = asyncio.run(exchange(server, b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"))
+    assert response.startswith(b"HTTP/1.1 200 ")
+
+
+def test_latency_percentiles_follow_the_window():
+    stats = scic_server.LatencyStats(window_size=100)
+    for milliseconds in range(1, 201):
+        stats.record(milliseconds / 1000)
+    # the window holds 101-200 ms
+    assert stats.percentile(0.50) == pytest.approx(0.151, rel=0.02)
+    assert stats.percentile(0.99) == pytest.approx(0.200, rel=0.02)
+    assert sum(stats.counts) == 100
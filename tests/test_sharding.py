@@ -0,0 +1,64 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def read_bytes(path):
+    with open(path, 'rb') as output_file:
+        return output_file.read()
+
+
+@pytest.fixture
+def serial_output(tmp_path, sample_csv):
+    output_path = str(tmp_path / "serial.csv")
+    scic.run(sample_csv, output_path)
+    return read_bytes(output_path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sharded_output_is_byte_identical(tmp_path, sample_csv, serial_output, workers):
+    output_path = str(tmp_path / "sharded.csv")
+    # about 5 shards of the 450 row input
+    scic.run_sharded(sample_csv, output_path, workers=workers, shard_size=6000)
+    assert read_bytes(output_path) == serial_output
+
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as text_file:
+        text_file.write(text)
+    return path
+
+
+# unquoted inch marks (taken literally by csv) flip the quote parity, then the quoted multi-line fields
+# put candidate boundaries inside records
+inch_mark_records = {
+    "multi-line description": 'ITM{0},PIPE,PIPE 1/2" DIA SCH 40,PC\nITM{0}B,CABLE,"CABLE 3C 2.0MM\nSPARE {0}",M\n',
+    "multi-line first column": 'ITM{0},PIPE,PIPE 3/4" DIA,PC\n"ITM{0}\nB",CABLE,CABLE 3C 2.0MM,M\n',
+}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("records", sorted(inch_mark_records))
+def test_inch_marks_and_multi_line_fields(tmp_path, capsys, records, workers):
+    input_path = write_text(str(tmp_path / "masterlist.csv"),
+                            "No.,Item Category,Item Description,UOM\n" + "".join(inch_mark_records[records].format(number) for number in range(200)))
+    header, ranges = scic.csv_shard_ranges(input_path, 500)
+    assert ranges is None
+
+    expected_path, output_path = str(tmp_path / "serial.csv"), str(tmp_path / "sharded.csv")
+    scic.run(input_path, expected_path)
+    capsys.readouterr()
+    scic.run_sharded(input_path, output_path, workers=workers, shard_size=500)
+    assert "reading it serially" in capsys.readouterr().out
+    assert read_bytes(output_path) == read_bytes(expected_path)
+
+
+def test_multi_line_fields_are_sharded(tmp_path):
+    input_path = write_text(str(tmp_path / "masterlist.csv"), "No.,Item Category,Item Description,UOM\n"
+                            + "".join(f'ITM{number},CABLE,"CABLE 3C\n""SPARE"" {number}",M\n' for number in range(200)))
+    header, ranges = scic.csv_shard_ranges(input_path, 500)
+    assert len(ranges) > 5
+    expected_path, output_path = str(tmp_path / "serial.csv"), str(tmp_path / "sharded.csv")
+    scic.run(input_path, expected_path)
+    scic.run_sharded(input_path, output_path, workers=2, shard_size=500)
+    assert read_bytes(output_path) == read_bytes(expected_path)
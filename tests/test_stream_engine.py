@@ -0,0 +1,21 @@
+import pytest
+
+import scic_data_cleanup as scic
+
+
+@pytest.fixture(scope="module", params=sorted(scic.extraction_engines))
+def extractor(request):
+    return scic.extraction_engines[request.param]()
+
+
+@pytest.mark.parametrize("category, description, expected", [
+    ("ANCHOR BOLT", "ANCHOR BOLT 20MM DIA X 500MM", {"diameter": "20MM", "units": [["length", "500MM"]]}),
+    ("LAMP", "LAMP P/N 1092629700", {"properties": [["P/N", "1092629700"]]}),
+    ("STEEL PLATE", "STEEL PLATE 6MM THK", {"thickness": "6MM"}),
+    ("ELECTRICAL WIRE", "THHN WIRE 12 AWG RED", {"color": "red", "wire type": ["THHN"], "info": "12 AWG"}),
+    ("CIRCUIT BREAKER", "CIRCUIT BREAKER 3 POLE 60A 240V",
+     {"units": [["pole", "3 POLE"], ["current", "60A"], ["voltage rating", "240V"]]}),
+])
+def test_fixed_rows(extractor, category, description, expected):
+    fields = extractor.extract_fields(category, scic.normalize_description(description))
+    assert {field: value for field, value in fields.items() if value} == expected
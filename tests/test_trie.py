@@ -0,0 +1,60 @@
+import random
+import re
+
+import pytest
+
+import scic_data_cleanup as scic
+
+
+def alternation(values):
+    """
+    The per-row pattern the trie replaced: longest values first, whole words, case-insensitive
+    """
+    return re.compile(r'\b(?:' + '|'.join(re.escape(value) for value in sorted(values, key=len, reverse=True)) + r')\b', re.IGNORECASE)
+
+
+@pytest.mark.parametrize("vocabulary", ["wire types", "brands"])
+def test_findall_equals_the_alternation(vocabulary):
+    values = scic.wire_types if vocabulary == "wire types" else scic.keywords_known["brand"]
+    trie, pattern = scic.VocabularyTrie(values), alternation(values)
+    rng = random.Random(0)
+    noise = ["X", "12", "MM", "-", "2", "THE", "CABLE", "/", "PVC-"]
+    for _ in range(500):
+        words = [rng.choice(values) if rng.random() < 0.4 else rng.choice(noise) for _ in range(rng.randint(1, 8))]
+        words = [word.lower() if rng.random() < 0.3 else word for word in words]
+        text = rng.choice([" ", "", "-", ", "]).join(words)
+        assert trie.findall(text) == pattern.findall(text), text
+
+
+@pytest.mark.parametrize("engine", sorted(scic.extraction_engines))
+@pytest.mark.parametrize("description, units", [
+    ("PIPE 1/2INCH X 3/4IN X 1 1/2INCHES", [["length", "1/2INCH"], ["length", "3/4IN"], ["length", "1 1/2INCHES"]]),
+    ("WIRE 2.5 MM SQ 3/8KVA 1/2 MM SQ", [["apparent power rating", "3/8KVA"], ["cross-sectional area", "1/2 MM SQ"],
+                                        ["cross-sectional area", "2.5 MM SQ"]]),
+    ("ROD 10KVA 5KV 6MM", [["length", "6MM"], ["apparent power rating", "10KVA"], ["voltage rating", "5KV"]]),
+])
+def test_longest_unit_wins(engine, description, units):
+    fields = scic.extraction_engines[engine]().extract_fields("", description)
+    assert sorted(fields["units"]) == sorted(units)
+
+
+def test_pattern_matches_the_vocabulary_only():
+    trie = scic.VocabularyTrie(scic.unit_property_map)
+    pattern = re.compile(trie.pattern(), re.IGNORECASE)
+    assert all(pattern.fullmatch(unit) for unit in scic.unit_property_map)
+    assert all(pattern.fullmatch(unit.upper()) for unit in scic.unit_property_map)
+    assert not any(pattern.fullmatch(text) for text in ["mm s", "inc", "kilogram", ""])
+
+
+def test_saved_tries_are_reused(tmp_path):
+    automaton_path = str(tmp_path / "vocabulary.json")
+    built = scic.DescriptionExtractor(automaton_path=automaton_path)
+    assert built.load_vocabulary_tries(automaton_path) == built.build_vocabulary_tries()
+    loaded = scic.DescriptionExtractor(automaton_path=automaton_path)
+    description = "THHN WIRE 3.5 MM SQ PANASONIC 600V"
+    assert loaded.extract_fields("WIRE", description) == built.extract_fields("WIRE", description)
+
+    # another vocabulary does not load them (and saves its own)
+    other = scic.DescriptionExtractor(wire_types_vocab=["THHN"], automaton_path=automaton_path)
+    assert other.wire_types_trie.findall("THW THHN") == ["THHN"]
+    assert built.load_vocabulary_tries(automaton_path) is None
@@ -0,0 +1,47 @@
+import json
+
+import scic_data_cleanup as scic
+
+description = "STEEL PLATE 6MM THK 1200MM X 2400MM GRADE A36 " + " ".join(f"{number} X" for number in range(40))
+
+
+def expected_fields(category="STEEL PLATE"):
+    return scic.DescriptionExtractor().extract_fields(category, description)
+
+
+def test_long_row_goes_to_the_bounded_engine():
+    extractor = scic.DescriptionExtractor()
+    watchdog = scic.set_watchdog(extractor, token_limit=16)
+    assert scic.extract_fields("STEEL PLATE", description, extractor) == expected_fields()
+    assert watchdog.counts["guard"][:2] == [1, 1]
+    assert scic.extract_fields("STEEL PLATE", "STEEL PLATE 6MM THK", extractor)["thickness"] == "6MM"
+    assert watchdog.slow_rows() == 1
+
+
+def test_row_over_budget_is_re_extracted_with_fallback():
+    extractor = scic.DescriptionExtractor()
+    watchdog = scic.set_watchdog(extractor, budget=1e-9, fallback=True)
+    assert scic.extract_fields("STEEL PLATE", description, extractor) == expected_fields()
+    assert watchdog.slow_rows() == 1
+    assert sum(entry[1] for entry in watchdog.counts.values()) == 1
+
+
+def test_row_over_budget_is_flagged_without_fallback(tmp_path):
+    log_path = str(tmp_path / "slow_rows.jsonl")
+    extractor = scic.DescriptionExtractor()
+    watchdog = scic.set_watchdog(extractor, budget=1e-9, log_path=log_path)
+    assert scic.extract_fields("STEEL PLATE", description, extractor) == expected_fields()
+    watchdog.close()
+    with open(log_path, 'r', encoding='utf-8') as log_file:
+        [entry] = [json.loads(line) for line in log_file]
+    assert entry["action"] == "flagged" and entry["description"] == description
+    assert sum(entry[1] for entry in watchdog.counts.values()) == 0
+
+
+def test_guard_is_on_by_default(tmp_path, capsys):
+    input_path, output_path = str(tmp_path / "masterlist.csv"), str(tmp_path / "extracted.csv")
+    with open(input_path, 'w', encoding='utf-8', newline='') as input_file:
+        input_file.write(f"Item Category,Item Description\nSTEEL PLATE,{description} {description}\nSTEEL PLATE,STEEL PLATE 6MM THK\n")
+    scic.main([input_path, output_path])
+    assert f"guard {scic.row_token_limit} tokens" in capsys.readouterr().out
+    assert scic.get_extractor().watchdog.counts["guard"][:2] == [1, 1]
@@ -0,0 +1,51 @@
+import csv
+
+import pytest
+
+import scic_data_cleanup as scic
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+        return list(csv.reader(csv_file))
+
+
+def test_xlsx_input_equals_csv_input(tmp_path, sample_csv, sample_rows):
+    """
+    Same output from the .xlsx sheet as from the .csv export (a blank row, another sheet first, an empty header cell)
+    """
+    input_path = str(tmp_path / "masterlist.xlsx")
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "notes"
+    sheet = workbook.create_sheet("masterlist")
+    sheet.append(list(sample_rows[0]) + [None])
+    for number, row in enumerate(sample_rows + sample_rows[::2]):
+        values = list(row.values())
+        sheet.append(values)
+        if number == 10:
+            sheet.append([None] * len(values))
+    workbook.save(input_path)
+
+    expected_path, output_path = str(tmp_path / "from_csv.csv"), str(tmp_path / "from_xlsx.csv")
+    scic.run(sample_csv, expected_path)
+    scic.run(input_path, output_path, input_sheet_name="masterlist")
+    assert read_csv(output_path) == read_csv(expected_path)
+
+
+@pytest.mark.parametrize("value, text", [(None, ''), (12.0, "12"), (12.5, "12.5"), (7, "7"), ("7 MM", "7 MM")])
+def test_cell_text_matches_a_csv_export(value, text):
+    assert scic.cell_text(value) == text
+
+
+def test_xlsx_output_equals_csv_output(tmp_path, sample_csv):
+    expected_path, output_path = str(tmp_path / "extracted.csv"), str(tmp_path / "extracted.xlsx")
+    scic.run(sample_csv, expected_path)
+    scic.run(sample_csv, output_path)
+    workbook = openpyxl.load_workbook(output_path, read_only=True)
+    rows = [[scic.cell_text(value) for value in values] for values in workbook["extracted"].iter_rows(values_only=True)]
+    workbook.close()
+    expected = read_csv(expected_path)
+    # read-only sheets leave the trailing empty cells of a row out
+    assert [row + [''] * (len(expected[0]) - len(row)) for row in rows] == expected